@@ -0,0 +1,327 @@
+# Standard library imports
+import math
+import time
+
+# Third-party imports
+from asgiref.sync import sync_to_async
+
+# Django imports
+from django.http import HttpResponse
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+# Django REST Framework imports
+from rest_framework import status
+from rest_framework.exceptions import NotAcceptable, Throttled, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+# Application-specific imports
+from . import cache, metrics, views
+from .conditional import conditional_get
+from .models import UserProfile
+from .services.UserProfileService import UserProfileService
+from .services.TransactionService import TransactionService
+from .services.TransactionsByWeekService import TransactionsByWeekService
+from .services.ExpensesByCategoriesService import ExpensesByCategoriesService
+from .services.CategoriesService import CategoriesService
+from .services.DashboardService import DashboardService
+from .serializers import TransactionListSerializer
+from .pagination import parse_limit
+from .views import parse_transaction_filters, validation_error_message
+
+
+# AsyncBaseView is the async counterpart of views.BaseView for the read endpoints. DRF's
+# APIView has no async support, so these are plain Django views applying the same content
+# negotiation, renderers and throttle.
+class AsyncBaseView(View):
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = "global"
+    # The browsable API renders through a DRF view, so it is left out here
+    renderer_classes = [
+        renderer_class
+        for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer_class.format != "api"
+    ]
+    content_negotiation_class = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = await self.negotiate_and_dispatch(request, *args, **kwargs)
+        # Every response may differ by Accept, including 304s and errors
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    async def negotiate_and_dispatch(self, request, *args, **kwargs):
+        renderers = [renderer_class() for renderer_class in self.renderer_classes]
+        negotiation = self.content_negotiation_class()
+        try:
+            self.renderer, self.accepted_media_type = negotiation.select_renderer(
+                Request(request), renderers
+            )
+        except NotAcceptable as e:
+            # Like DRF, the error goes out in the default format
+            self.renderer, self.accepted_media_type = renderers[0], None
+            return self.render({"detail": e.detail}, status=e.status_code)
+
+        # DRF throttles read the cache and the session user synchronously
+        wait = await sync_to_async(self.check_throttles)(request)
+        if wait is not False:
+            throttled = Throttled(wait)
+            response = self.render(
+                {"detail": throttled.detail}, status=throttled.status_code
+            )
+            if wait is not None:
+                response["Retry-After"] = str(math.ceil(wait))
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    def render(self, data, status=status.HTTP_200_OK):
+        """
+        Renders a payload with the negotiated renderer, so the async endpoints return
+        byte-identical bodies to the sync ones.
+        """
+        renderer = self.renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        started = time.perf_counter()
+        content = renderer.render(data, self.accepted_media_type, {})
+        metrics.add_render_time(self.request, time.perf_counter() - started)
+        return HttpResponse(content, status=status, content_type=content_type)
+
+    def check_throttles(self, request):
+        """
+        Returns False if the request is allowed, otherwise the seconds to wait (or None).
+        """
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                return throttle.wait()
+        return False
+
+
+class BudgetView(AsyncBaseView):
+    """
+    Async version of views.BudgetView.
+    """
+
+    @conditional_get(dated=True)
+    async def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return self.render(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        user_profile_service = UserProfileService()
+        try:
+            data = await cache.aget_or_compute(
+                user_id,
+                "budget",
+                lambda: user_profile_service.aget_user_budget(user_id),
+                dated=True,
+            )
+            return self.render(data)
+        except UserProfile.DoesNotExist:
+            return self.render(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+
+class TransactionsView(AsyncBaseView):
+    """
+    Async version of views.TransactionsView.
+    """
+
+    @conditional_get()
+    async def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return self.render(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        try:
+            params = request.GET
+            name, start_date, end_date = parse_transaction_filters(params)
+            cursor = params.get("cursor")
+            limit = params.get("limit")
+
+            transaction_service = TransactionService()
+
+            # Clients that don't ask for a page keep the legacy full list during the migration
+            if (
+                cursor is None
+                and limit is None
+                and not settings.TRANSACTIONS_PAGINATION_REQUIRED
+            ):
+                transactions = await transaction_service.aget_user_transactions(
+                    user_id, name, start_date, end_date
+                )
+                serializer = TransactionListSerializer(transactions)
+                return self.render(serializer.data)
+
+            transactions, next_cursor = (
+                await transaction_service.aget_user_transactions_page(
+                    user_id, parse_limit(limit), cursor, name, start_date, end_date
+                )
+            )
+            serializer = TransactionListSerializer(transactions)
+            return self.render({"results": serializer.data, "next": next_cursor})
+
+        except ValidationError as e:
+            return self.render(
+                {"error": validation_error_message(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return self.render(
+                {"error": "An unexpected error occurred: " + str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class ExpensesByCategoriesView(AsyncBaseView):
+    """
+    Async version of views.ExpensesByCategoriesView.
+    """
+
+    @conditional_get(dated=True)
+    async def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return self.render(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        service = ExpensesByCategoriesService()
+        try:
+            expenses_data = await cache.aget_or_compute(
+                user_id,
+                "expenses_by_categories",
+                lambda: service.aget_expenses_by_categories(user_id),
+                dated=True,
+            )
+            return self.render(expenses_data)
+        except UserProfile.DoesNotExist:
+            return self.render(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return self.render(
+                {"error": f"An unexpected error occurred: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class TransactionsByWeekView(AsyncBaseView):
+    """
+    Async version of views.TransactionsByWeekView.
+    """
+
+    @conditional_get(dated=True)
+    async def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return self.render(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        transactions_by_week_service = TransactionsByWeekService()
+        try:
+            data = await cache.aget_or_compute(
+                user_id,
+                "transactions_by_week",
+                lambda: transactions_by_week_service.aget_transactions_by_week(user_id),
+                dated=True,
+            )
+            return self.render(data)
+        except UserProfile.DoesNotExist:
+            return self.render(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return self.render(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class DashboardView(AsyncBaseView):
+    """
+    Async version of views.DashboardView.
+    """
+
+    @conditional_get(dated=True)
+    async def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return self.render(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        raw_sections = request.GET.get("sections")
+        if raw_sections:
+            sections = sorted({section.strip() for section in raw_sections.split(",")})
+        else:
+            sections = list(DashboardService.SECTIONS)
+        unknown = [name for name in sections if name not in DashboardService.SECTIONS]
+        if unknown:
+            return self.render(
+                {"error": f"Unknown sections: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        dashboard_service = DashboardService()
+        try:
+            data = await cache.aget_or_compute(
+                user_id,
+                "dashboard:" + ",".join(sections),
+                lambda: dashboard_service.aget_dashboard(user_id, sections),
+                dated=True,
+            )
+            return self.render(data)
+        except UserProfile.DoesNotExist:
+            return self.render(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return self.render(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CategoriesView(AsyncBaseView):
+    """
+    Async version of views.CategoriesView.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        categories_service = CategoriesService()
+        try:
+            categories = await cache.aget_or_compute(
+                None, "categories", categories_service.aget_all_categories
+            )
+        except Exception as e:
+            return self.render(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return self.render(categories)
+
+
+class ExportTransactionsView(views.ExportTransactionsView):
+    """
+    views.ExportTransactionsView streaming the export as an async iterator. An ASGI
+    server consumes a sync iterator only after collecting it whole.
+    """
+
+    asynchronous = True
@@ -0,0 +1,156 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from . import metrics
+
+# Version shared by every key; bumped when data that all users see (categories) changes.
+GLOBAL_VERSION_KEY = "finances:version:global"
+
+
+def _version_key(user_id):
+    return f"finances:version:user:{user_id}"
+
+
+def _get_cache():
+    return caches[settings.FINANCES_CACHE_ALIAS]
+
+
+def _count(name, result):
+    # Exported by the internal metrics endpoint (api/metrics.py)
+    metrics.count("finances_cache_requests_total", payload=name, result=result)
+
+
+def _current_versions(cache, keys):
+    """
+    Reads version counters in one cache round trip, initialising missing ones.
+
+    A missing version starts from the current time rather than 0, so entries written under
+    an older version can never be served again after the version key was evicted.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _payload_key(user_id, name, versions, dated):
+    key_parts = ["finances", name, str(user_id)]
+    key_parts += [str(version) for version in versions]
+    if dated:
+        key_parts.append(timezone.localdate().isoformat())
+    return ":".join(key_parts)
+
+
+def _version_keys(user_id):
+    version_keys = [GLOBAL_VERSION_KEY]
+    if user_id is not None:
+        version_keys.append(_version_key(user_id))
+    return version_keys
+
+
+def get_or_compute(user_id, name, compute, dated=False):
+    """
+    Returns a cached read-endpoint payload, computing and storing it on a miss.
+
+    Args:
+        user_id (str): The user the payload belongs to, or None for payloads shared by all users.
+        name (str): The name of the payload, e.g. the endpoint it is served by.
+        compute (callable): Builds the payload; exceptions propagate and nothing is cached.
+        dated (bool): Whether the payload depends on the current date (week/month windows).
+
+    Returns:
+        The cached or freshly computed payload.
+    """
+    if not settings.FINANCES_CACHE_ENABLED:
+        return compute()
+
+    cache = _get_cache()
+    versions = _current_versions(cache, _version_keys(user_id))
+    key = _payload_key(user_id, name, versions, dated)
+
+    data = cache.get(key)
+    if data is not None:
+        _count(name, "hit")
+        return data
+
+    _count(name, "miss")
+    data = compute()
+    cache.set(key, data, timeout=settings.FINANCES_CACHE_TIMEOUT)
+    return data
+
+
+async def _acurrent_versions(cache, keys):
+    # Async version of `_current_versions`
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_or_compute(user_id, name, compute, dated=False):
+    """
+    Async version of `get_or_compute`, using the async cache API.
+
+    Args:
+        user_id (str): The user the payload belongs to, or None for payloads shared by all users.
+        name (str): The name of the payload, e.g. the endpoint it is served by.
+        compute (callable): Returns an awaitable building the payload; exceptions propagate
+            and nothing is cached.
+        dated (bool): Whether the payload depends on the current date (week/month windows).
+
+    Returns:
+        The cached or freshly computed payload.
+    """
+    if not settings.FINANCES_CACHE_ENABLED:
+        return await compute()
+
+    cache = _get_cache()
+    versions = await _acurrent_versions(cache, _version_keys(user_id))
+    key = _payload_key(user_id, name, versions, dated)
+
+    data = await cache.aget(key)
+    if data is not None:
+        _count(name, "hit")
+        return data
+
+    _count(name, "miss")
+    data = await compute()
+    await cache.aset(key, data, timeout=settings.FINANCES_CACHE_TIMEOUT)
+    return data
+
+
+def _bump(key):
+    cache = _get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version was evicted (or never set); any fresh value invalidates old entries.
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Invalidates every cached payload of a user once the current transaction commits.
+
+    Bumping after the commit guarantees that a payload computed from the old data can only
+    be stored under the old version, which is never read again.
+
+    Args:
+        user_id (str): The unique identifier of the user whose data changed.
+    """
+    db_transaction.on_commit(lambda: _bump(_version_key(user_id)))
+
+
+def invalidate_all():
+    """
+    Invalidates the cached payloads of all users once the current transaction commits.
+    """
+    db_transaction.on_commit(lambda: _bump(GLOBAL_VERSION_KEY))
@@ -0,0 +1,167 @@
+import datetime
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, urlencode
+
+from .models import UserProfile
+
+
+def mark_user_changed(user_id):
+    """
+    Bumps the change marker of a user, invalidating the ETags of their read endpoints.
+
+    Call it inside the database transaction of the write, so the marker and the data
+    change together, and before touching any rows: the UPDATE locks the user's profile
+    row until commit, which keeps the writes of a user from interleaving.
+
+    Args:
+        user_id (str): The unique identifier of the user whose data changed.
+
+    Returns:
+        int: 1, or 0 if the user does not exist.
+    """
+    return UserProfile.objects.filter(user_id=user_id).update(
+        data_version=F("data_version") + 1, updated_at=timezone.now()
+    )
+
+
+def mark_all_changed():
+    """
+    Bumps the change marker of every user, for data that all users see (categories).
+    """
+    UserProfile.objects.update(
+        data_version=F("data_version") + 1, updated_at=timezone.now()
+    )
+
+
+def _marker_query(user_id):
+    return UserProfile.objects.filter(user_id=user_id).values_list(
+        "data_version", "updated_at"
+    )
+
+
+def _variant(request, user_id):
+    """
+    Returns a digest of what selects the payload besides the user's data: the user, the
+    query string (filters, page, format) with its parameters sorted, and the Accept
+    header. Change markers start at 0 for every user, so without it two users, or two
+    pages of the same user, could share an ETag.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    accept = request.headers.get("Accept", "")
+    return hashlib.sha256(f"{user_id}\x1f{query}\x1f{accept}".encode()).hexdigest()[:16]
+
+
+def _validators(marker, variant, dated):
+    """
+    Returns the ETag and Last-Modified timestamp of a user's data. The timestamp is
+    truncated to seconds, the precision of HTTP dates, so it is None while the data
+    changed within the current second: another write in that second would not move it,
+    and an If-Modified-Since of the earlier copy would get a wrong 304.
+
+    Payloads of the current week/month also change at midnight, so `dated` ones carry
+    the date in their ETag and are never older than the start of the day.
+    """
+    data_version, updated_at = marker
+    if not dated:
+        etag, last_modified = f'W/"{variant}-{data_version}"', updated_at
+    else:
+        today = timezone.localdate()
+        start_of_day = timezone.make_aware(
+            datetime.datetime.combine(today, datetime.time())
+        )
+        etag = f'W/"{variant}-{data_version}-{today.isoformat()}"'
+        last_modified = max(updated_at, start_of_day)
+
+    last_modified = int(last_modified.timestamp())
+    if last_modified >= int(timezone.now().timestamp()):
+        return etag, None
+    return etag, last_modified
+
+
+def _check(request, user_id, marker, dated):
+    # Returns the validators and the 304/412 response when the client's copy is current
+    if marker is None:
+        return None, None
+    etag, last_modified = validators = _validators(
+        marker, _variant(request, user_id), dated
+    )
+    if "if-none-match" in request.headers:
+        # If-Modified-Since is ignored when an ETag is sent (RFC 9110, 13.1.3)
+        last_modified = None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return validators, response
+
+
+def _finish(response, validators):
+    # The payload is the user's, in the negotiated format: caches must not hand it to
+    # another user, nor revalidate another user's copy with its validators
+    patch_vary_headers(response, ["user-id", "Accept"])
+    # Only successful payloads are tagged; errors are never served from a client cache
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Clients may keep the payload but must revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(dated=False):
+    """
+    Adds ETag and Last-Modified validators to a per-user read endpoint.
+
+    The validators come from the change marker on the UserProfile of the `user-id`
+    header, read with one primary key lookup, and the ETag also identifies the user,
+    query string and Accept header it was issued for. A matching If-None-Match (or,
+    without one, an If-Modified-Since that is not older) gets a 304 before the view
+    runs, so neither the service query nor the serializer executes. Requests for
+    unknown users fall through to the view and its 404.
+
+    The marker is read before the payload is built; a write landing in between tags the
+    new payload with the old ETag, which only costs the client one extra full response.
+
+    Args:
+        dated (bool): Whether the payload depends on the current date (week/month windows).
+
+    Returns:
+        callable: A decorator for the `get` method of a sync (DRF) or async view.
+    """
+
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+
+            @functools.wraps(view_method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                user_id = request.headers.get("user-id")
+                marker = await _marker_query(user_id).afirst() if user_id else None
+                validators, response = _check(request, user_id, marker, dated)
+                if response is None:
+                    response = await view_method(view, request, *args, **kwargs)
+                return _finish(response, validators)
+
+            return async_wrapper
+
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            user_id = request.headers.get("user-id")
+            marker = _marker_query(user_id).first() if user_id else None
+            validators, response = _check(request, user_id, marker, dated)
+            if response is None:
+                response = view_method(view, request, *args, **kwargs)
+            return _finish(response, validators)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,72 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+_stats_lock = threading.Lock()
+_connections_opened = {}
+
+
+def record_connection_opened(alias):
+    """
+    Counts a new database connection of this process (connection_created signal).
+    """
+    with _stats_lock:
+        _connections_opened[alias] = _connections_opened.get(alias, 0) + 1
+
+
+def pool_stats(alias="default"):
+    """
+    Returns the connection usage of this worker process.
+
+    In "pool" mode these are the psycopg pool counters: connections in use and idle,
+    requests waiting for a connection, the total and average time spent waiting, and
+    the borrows that failed because no connection freed up within SQL_POOL_TIMEOUT.
+    Every mode reports how many connections the process has opened, which shows
+    whether connections are being reused.
+
+    Args:
+        alias (str): The database alias.
+
+    Returns:
+        dict: The statistics of the connections to the database.
+    """
+    with _stats_lock:
+        stats = {
+            "mode": settings.SQL_POOL,
+            "pid": os.getpid(),
+            "connections_opened": _connections_opened.get(alias, 0),
+        }
+    if settings.SQL_POOL == "persistent":
+        stats["conn_max_age"] = connections[alias].settings_dict["CONN_MAX_AGE"]
+
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return stats
+
+    counters = pool.get_stats()
+    borrows = counters.get("requests_num", 0)
+    wait_ms = counters.get("requests_wait_ms", 0)
+    stats.update(
+        {
+            # Django signals connection_created on every borrow, so use the pool's count
+            "connections_opened": counters.get("connections_num", 0),
+            "min_size": counters["pool_min"],
+            "max_size": counters["pool_max"],
+            "size": counters["pool_size"],
+            "in_use": counters["pool_size"] - counters["pool_available"],
+            "idle": counters["pool_available"],
+            "waiting": counters.get("requests_waiting", 0),
+            "borrows": borrows,
+            "borrows_queued": counters.get("requests_queued", 0),
+            "wait_ms_total": wait_ms,
+            "wait_ms_avg": round(wait_ms / borrows, 3) if borrows else 0.0,
+            # psycopg counts the borrows that raised PoolTimeout here (no max_waiting set)
+            "borrow_timeouts": counters.get("requests_errors", 0),
+            "bad_returns": counters.get("returns_bad", 0),
+            "connections_lost": counters.get("connections_lost", 0),
+            "connection_errors": counters.get("connections_errors", 0),
+        }
+    )
+    return stats
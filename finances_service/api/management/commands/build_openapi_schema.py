@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.schemas.docs import generate_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the OpenAPI schema and writes it to OPENAPI_SCHEMA_FILE, "
+        "where /api/finances/openapi.json serves it from."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Write the schema to this path instead of OPENAPI_SCHEMA_FILE.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS_ENABLED:
+            # The views are only annotated for the schema while drf_yasg is loaded
+            raise CommandError("Building the schema requires API_DOCS_ENABLED=true.")
+
+        output = options["output"] or settings.OPENAPI_SCHEMA_FILE
+        schema = generate_schema()
+
+        # Replace the file atomically so a running server never reads half a schema
+        directory = os.path.dirname(os.path.abspath(output))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(schema)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, output)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote the OpenAPI schema ({len(schema)} bytes) to {output}."
+            )
+        )
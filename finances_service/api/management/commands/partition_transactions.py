@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintains the monthly partitions of the transactions table (PostgreSQL): "
+        "creates the partitions of the coming months and, with --retain-months, "
+        "detaches the old ones. --convert partitions the table first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Replace the plain transactions table with a partitioned one. "
+            "Locks the table while its rows are copied.",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Months after the current one to create partitions for.",
+        )
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help="Detach the partitions older than this many months, the current "
+            "one included. Their rollups are deleted.",
+        )
+        parser.add_argument(
+            "--archive-schema",
+            help="Move detached partitions to this schema instead of leaving them "
+            "next to the table.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning requires PostgreSQL.")
+        if options["months_ahead"] < 0:
+            raise CommandError("--months-ahead must not be negative.")
+        retain_months = options["retain_months"]
+        if retain_months is not None and retain_months < 1:
+            raise CommandError("--retain-months must be at least 1.")
+        if options["archive_schema"] and retain_months is None:
+            raise CommandError("--archive-schema requires --retain-months.")
+
+        if options["convert"]:
+            if partitions.is_partitioned():
+                raise CommandError(f"{partitions.TABLE} is already partitioned.")
+            created = partitions.convert_table(options["months_ahead"])
+            self.stdout.write(
+                f"Partitioned {partitions.TABLE} into {len(created)} monthly partitions."
+            )
+        elif not partitions.is_partitioned():
+            raise CommandError(
+                f"{partitions.TABLE} is not partitioned; run with --convert first."
+            )
+        else:
+            for name in partitions.create_partitions(options["months_ahead"]):
+                self.stdout.write(f"Created {name}.")
+
+        if retain_months is not None:
+            detached = partitions.detach_partitions(
+                retain_months, options["archive_schema"]
+            )
+            for name in detached:
+                self.stdout.write(f"Detached {name}.")
+
+        months = list(partitions.monthly_partitions())
+        default_rows = partitions.default_partition_rows()
+        if default_rows:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{default_rows} rows are outside the monthly partitions, "
+                    f"in {partitions.DEFAULT_PARTITION}."
+                )
+            )
+        if months:
+            span = f"from {months[0]:%Y-%m} to {months[-1]:%Y-%m}"
+        else:
+            span = "none"
+        self.stdout.write(
+            self.style.SUCCESS(f"Monthly partitions of {partitions.TABLE}: {span}.")
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.RollupService import RollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the TransactionRollup table from the transactions table, "
+        "or with --check only reports rollups that drifted from it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare rollups with transactions; exit non-zero on drift.",
+        )
+        parser.add_argument(
+            "--user", help="Restrict the rebuild or check to a single user ID."
+        )
+
+    def handle(self, *args, **options):
+        rollup_service = RollupService()
+
+        if not options["check"]:
+            created = rollup_service.rebuild(options["user"])
+            self.stdout.write(f"Rebuilt {created} rollup rows.")
+
+        drift = rollup_service.find_drift(options["user"])
+        for user_id, (day, category_id, type), expected, actual in drift:
+            self.stderr.write(
+                f"{user_id} {day} category={category_id} {type}: "
+                f"expected (total, count) {expected}, found {actual}"
+            )
+        if drift:
+            raise CommandError(
+                f"Rollups drifted from transactions for {len(drift)} keys."
+            )
+        self.stdout.write(self.style.SUCCESS("Rollups match transactions."))
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.seeding import WRITE_METHODS, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic dataset of users, categories and transactions "
+        "(see api/seeding.py) for load tests and capacity rehearsals. The data only "
+        "depends on the options and the current date. Transactions are written with "
+        "COPY on PostgreSQL and bulk_create elsewhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--transactions",
+            type=int,
+            default=1000,
+            help="Transactions per user.",
+        )
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument(
+            "--days", type=int, default=365, help="How many days back dates go."
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=3.0,
+            help="How much dates crowd towards today; 1 spreads them evenly.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the random generator."
+        )
+        parser.add_argument(
+            "--user-prefix",
+            default="seed-user-",
+            help="Prefix of the generated user IDs, followed by 0, 1, ...",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per INSERT with bulk_create.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=WRITE_METHODS,
+            default="auto",
+            help="How transactions are written; auto uses COPY on PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        if options["method"] == "copy" and connection.vendor != "postgresql":
+            raise CommandError("--method copy requires PostgreSQL.")
+        for option in ("users", "transactions", "categories", "batch_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive.")
+
+        started = time.perf_counter()
+        result = seed_dataset(
+            users=options["users"],
+            transactions_per_user=options["transactions"],
+            categories=options["categories"],
+            days=options["days"],
+            skew=options["skew"],
+            seed=options["seed"],
+            user_prefix=options["user_prefix"],
+            batch_size=options["batch_size"],
+            method=options["method"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for phase, rows, seconds in result["timings"]:
+            self.stdout.write(
+                f"{phase}: {rows:,} rows in {seconds:.2f}s "
+                f"({rows / max(seconds, 1e-9):,.0f} rows/s)"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(result['user_ids']):,} users and "
+                f"{result['transactions']:,} transactions in {elapsed:.2f}s "
+                f"({result['transactions'] / elapsed:,.0f} transactions/s)."
+            )
+        )
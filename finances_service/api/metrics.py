@@ -0,0 +1,418 @@
+"""
+Per-request timings and the per-route histograms of this worker process.
+
+RequestMetricsMiddleware (api/middleware.py) measures a sample of the requests: the
+number of SQL queries and their total time, the time spent in the view and the time
+spent rendering the response. It reports them in a Server-Timing header and records them
+here, where the internal metrics endpoint exports them in the Prometheus text format.
+
+Each worker process counts in its own store, and a scrape reaches whichever worker
+accepts it. With METRICS_DIR set (gunicorn.conf.py sets it for several workers), every
+worker keeps its values in a memory-mapped file of that directory, and the export sums
+the files of all the workers, the exited ones included so counters never go down. The
+layout is the one of prometheus_client's multiprocess mode: appending a value and
+updating one are plain memory writes, and readers never take a lock.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+# Upper bounds of the histogram buckets; +Inf is implied
+DURATION_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Counters: help text
+COUNTERS = {
+    "finances_requests_total": "Sampled requests by route, method and status.",
+    "finances_cache_requests_total": "Response cache lookups by payload and result.",
+}
+# Histograms recorded per route and method: (help text, buckets)
+HISTOGRAMS = {
+    "finances_request_duration_seconds": (
+        "Time spent in the application per request.",
+        DURATION_BUCKETS,
+    ),
+    "finances_request_view_seconds": (
+        "Time spent in the view per request, rendering excluded.",
+        DURATION_BUCKETS,
+    ),
+    "finances_request_render_seconds": (
+        "Time spent rendering the response per request.",
+        DURATION_BUCKETS,
+    ),
+    "finances_request_db_seconds": (
+        "Time spent executing SQL queries per request.",
+        DURATION_BUCKETS,
+    ),
+    "finances_request_queries": (
+        "SQL queries executed per request.",
+        QUERY_BUCKETS,
+    ),
+}
+
+# The measurements of the sampled request handled in the current context. Context
+# variables follow a request into the threads sync_to_async runs its queries in.
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+_lock = threading.Lock()
+# The store of this process, opened on first use after the fork
+_store = None
+
+
+class RequestMetrics:
+    """
+    The measurements of one sampled request, in seconds. While the request is handled
+    (see `measuring`), `execute_wrapper` passes every query to it.
+    """
+
+    __slots__ = ("started", "queries", "sql", "view_started", "view", "render")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.view_started = None
+        self.view = None
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def view_finished(self):
+        # Views that render their own response (the async views) report the rendering
+        # separately, so it is taken out of the view time
+        if self.view is None and self.view_started is not None:
+            self.view = time.perf_counter() - self.view_started - self.render
+
+    def server_timing(self, total):
+        """
+        Returns the Server-Timing header value of the request, in milliseconds.
+        """
+        queries = "query" if self.queries == 1 else "queries"
+        return (
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} {queries}", '
+            f"view;dur={(self.view or 0.0) * 1000:.2f}, "
+            f"render;dur={self.render * 1000:.2f}, "
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+@contextlib.contextmanager
+def measuring(request_metrics):
+    """
+    Makes the queries executed in the block count for a request.
+
+    Args:
+        request_metrics (RequestMetrics): The measurements of the request.
+    """
+    token = _current.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        _current.reset(token)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing the queries of the sampled requests.
+    """
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    return request_metrics(execute, sql, params, many, context)
+
+
+def install(connection):
+    """
+    Adds `execute_wrapper` to a database connection (connection_created signal).
+
+    It is installed on every connection rather than around each request with
+    `connection.execute_wrapper`, as the async views query from worker threads that
+    have their own connections. Pooled connections signal every borrow, hence the check.
+
+    Args:
+        connection (BaseDatabaseWrapper): The new connection.
+    """
+    if settings.METRICS_ENABLED and execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def add_render_time(request, seconds):
+    """
+    Records the rendering time of a response rendered inside its view.
+
+    Args:
+        request (HttpRequest): The request, which carries the metrics when sampled.
+        seconds (float): The time spent rendering.
+    """
+    metrics = getattr(request, "metrics", None)
+    if metrics is not None:
+        metrics.render += seconds
+
+
+class MemoryStore:
+    """
+    The values of a single process, in a dict keyed by sample.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def inc(self, key, amount):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def items(self):
+        return list(self.values.items())
+
+
+class FileStore:
+    """
+    The values of one worker process in a memory-mapped file, readable by the others.
+
+    The file starts with the number of bytes in use (8 bytes), followed by one entry per
+    key: its length (4 bytes), the key as UTF-8 padded to a multiple of 8 bytes with the
+    length, then the value as a double. An entry is complete before the used size covers
+    it, so readers only ever see whole entries.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.file = open(path, "a+b")
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(self.INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = struct.unpack_from("q", self.map, 0)[0] or 8
+        # A restarted worker with a reused PID keeps counting in the same file
+        self.positions = {key: position for key, _, position in read_entries(self.map)}
+
+    def inc(self, key, amount):
+        position = self.positions.get(key)
+        if position is None:
+            position = self.positions[key] = self._append(key)
+        (value,) = struct.unpack_from("d", self.map, position)
+        struct.pack_into("d", self.map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(len(encoded) + 4) % 8)
+        size = 4 + padded + 8
+        while self.used + size > len(self.map):
+            capacity = 2 * len(self.map)
+            self.map.close()
+            self.file.truncate(capacity)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        struct.pack_into(
+            f"i{padded}sd", self.map, self.used, len(encoded), encoded, 0.0
+        )
+        self.used += size
+        struct.pack_into("q", self.map, 0, self.used)
+        return self.used - 8
+
+    def items(self):
+        return [(key, value) for key, value, _ in read_entries(self.map)]
+
+
+def read_entries(buffer):
+    """
+    Yields the (key, value, value position) entries of a FileStore file.
+    """
+    used = min(struct.unpack_from("q", buffer, 0)[0], len(buffer))
+    position = 8
+    while position + 4 <= used:
+        (length,) = struct.unpack_from("i", buffer, position)
+        value_position = position + 4 + length + (-(length + 4) % 8)
+        if value_position + 8 > used:
+            break
+        key = bytes(buffer[position + 4 : position + 4 + length]).decode()
+        (value,) = struct.unpack_from("d", buffer, value_position)
+        yield key, value, value_position
+        position = value_position + 8
+
+
+def _get_store():
+    # Called with _lock held. Workers forked from a preloaded master open their own.
+    global _store
+    if _store is None or _store[0] != os.getpid():
+        pid = os.getpid()
+        if settings.METRICS_DIR:
+            path = os.path.join(settings.METRICS_DIR, f"worker_{pid}.db")
+            _store = (pid, FileStore(path))
+        else:
+            _store = (pid, MemoryStore())
+    return _store[1]
+
+
+def _key(name, **labels):
+    return json.dumps([name, labels], separators=(",", ":"))
+
+
+def count(name, amount=1, **labels):
+    """
+    Adds to a counter exported by `export` (see COUNTERS).
+
+    Args:
+        name (str): The metric name.
+        amount (float): The increment.
+        **labels: The label values of the series.
+    """
+    key = _key(name, **labels)
+    with _lock:
+        _get_store().inc(key, amount)
+
+
+def record(route, method, status, metrics, total):
+    """
+    Adds a sampled request to the histograms of its route.
+
+    Args:
+        route (str): The URL name of the view, or "unmatched".
+        method (str): The HTTP method.
+        status (int): The response status code.
+        metrics (RequestMetrics): The measurements of the request.
+        total (float): The time spent in the application, in seconds.
+    """
+    values = {
+        "finances_request_duration_seconds": total,
+        "finances_request_view_seconds": metrics.view or 0.0,
+        "finances_request_render_seconds": metrics.render,
+        "finances_request_db_seconds": metrics.sql,
+        "finances_request_queries": metrics.queries,
+    }
+    samples = [
+        (
+            _key("finances_requests_total", route=route, method=method, status=status),
+            1,
+        )
+    ]
+    for name, value in values.items():
+        # A value equal to a bound belongs to that bucket ("le"); one count per bucket,
+        # made cumulative by the export
+        bucket = bisect.bisect_left(HISTOGRAMS[name][1], value)
+        samples.append((_key(name, route=route, method=method, bucket=bucket), 1))
+        samples.append((_key(name, route=route, method=method, sum=True), value))
+    with _lock:
+        store = _get_store()
+        for key, amount in samples:
+            store.inc(key, amount)
+
+
+def _collect():
+    # The summed values of every worker, by metric name, then labels
+    if settings.METRICS_DIR:
+        stores = []
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, "worker_*.db")):
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    # Created by a worker that hasn't sized it yet
+                    continue
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    stores.append(
+                        [(key, value) for key, value, _ in read_entries(buffer)]
+                    )
+    else:
+        with _lock:
+            stores = [_get_store().items()]
+
+    collected = {}
+    for items in stores:
+        for key, value in items:
+            name, labels = json.loads(key)
+            series = collected.setdefault(name, {})
+            # Labels keep the order they were given in
+            labels = tuple(labels.items())
+            series[labels] = series.get(labels, 0) + value
+    return collected
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    # Counts are stored as doubles; print them as integers
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def export():
+    """
+    Returns the metrics of all the worker processes in the Prometheus text exposition
+    format (version 0.0.4).
+
+    With METRICS_SAMPLE_RATE below 1 the request counts only cover the sampled
+    requests; divide them by the exported finances_metrics_sample_rate to estimate the
+    totals.
+
+    Returns:
+        str: The exposition text.
+    """
+    collected = _collect()
+    lines = [
+        "# HELP finances_metrics_sample_rate Share of the requests that are measured.",
+        "# TYPE finances_metrics_sample_rate gauge",
+        f"finances_metrics_sample_rate {float(settings.METRICS_SAMPLE_RATE)}",
+    ]
+    for name, help_text in COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(collected.get(name, {}).items()):
+            lines.append(f"{name}{_labels(**dict(labels))} {_number(value)}")
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        # (route, method) -> [count per bucket, sum]
+        histograms = {}
+        for labels, value in collected.get(name, {}).items():
+            labels = dict(labels)
+            histogram = histograms.setdefault(
+                (labels["route"], labels["method"]), [[0] * (len(buckets) + 1), 0.0]
+            )
+            if "sum" in labels:
+                histogram[1] += value
+            else:
+                histogram[0][labels["bucket"]] += value
+        for (route, method), (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip([*buckets, "+Inf"], counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else float(bound)
+                labels = _labels(route=route, method=method, le=le)
+                lines.append(f"{name}_bucket{labels} {_number(cumulative)}")
+            labels = _labels(route=route, method=method)
+            lines.append(f"{name}_sum{labels} {total}")
+            lines.append(f"{name}_count{labels} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that also runs natively under ASGI.
+
+    WhiteNoise's own middleware is sync-only, which makes Django run every ASGI request
+    (not just static files) through a thread and calls async views back through
+    async_to_sync. The static file lookup is an in-memory dict read, so it is safe to do
+    on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures a sample of the requests (METRICS_SAMPLE_RATE): SQL queries and their time,
+    view time and render time, recorded per route in api.metrics and reported in a
+    Server-Timing header (unless METRICS_SERVER_TIMING is false).
+
+    Queries are timed by the execute wrapper api.metrics installs on every database
+    connection while a sampled request is handled. The view time starts at
+    `process_view`. DRF responses are rendered after the view returns, between
+    `process_template_response` and their post-render callback; the async views report
+    their own rendering. Streamed bodies (the export) are produced after the response
+    leaves the middleware and are not measured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Checked on every request, so not through iscoroutinefunction (inspect)
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Sync hooks would be run through sync_to_async, a thread hop per request
+            self.process_view = self._aprocess_view
+            self.process_template_response = self._aprocess_template_response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        request.metrics = metrics.RequestMetrics()
+        with metrics.measuring(request.metrics):
+            response = self.get_response(request)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        request.metrics = metrics.RequestMetrics()
+        with metrics.measuring(request.metrics):
+            response = await self.get_response(request)
+        return self._finish(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_metrics = getattr(request, "metrics", None)
+        if request_metrics is not None:
+            request_metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request_metrics = getattr(request, "metrics", None)
+        if request_metrics is not None:
+            request_metrics.view_finished()
+            started = time.perf_counter()
+
+            def rendered(response):
+                request_metrics.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def _aprocess_view(self, *args):
+        return RequestMetricsMiddleware.process_view(self, *args)
+
+    async def _aprocess_template_response(self, *args):
+        return RequestMetricsMiddleware.process_template_response(self, *args)
+
+    def _sampled(self):
+        rate = settings.METRICS_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def _finish(self, request, response):
+        request_metrics = request.metrics
+        request_metrics.view_finished()
+        total = time.perf_counter() - request_metrics.started
+        match = request.resolver_match
+        route = (match.url_name or match.route) if match else "unmatched"
+        metrics.record(
+            route, request.method, response.status_code, request_metrics, total
+        )
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = request_metrics.server_timing(total)
+        return response
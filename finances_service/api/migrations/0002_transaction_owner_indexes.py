@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', '-date', 'id'], name='api_txn_owner_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'type', 'date'], name='api_txn_owner_type_date_idx'),
+        ),
+    ]
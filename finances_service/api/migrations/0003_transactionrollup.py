@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model("api", "Transaction")
+    TransactionRollup = apps.get_model("api", "TransactionRollup")
+    totals = (
+        Transaction.objects.values("owner_id", "date", "category_id", "type")
+        .annotate(total=models.Sum("amount"), count=models.Count("id"))
+        .order_by()
+    )
+    TransactionRollup.objects.bulk_create(
+        (
+            TransactionRollup(
+                owner_id=row["owner_id"],
+                day=row["date"],
+                category_id=row["category_id"],
+                type=row["type"],
+                total=row["total"],
+                count=row["count"],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_transaction_owner_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='The date of the summed transactions.')),
+                ('type', models.CharField(choices=[('Income', 'Income'), ('Expense', 'Expense')], help_text='The type of the summed transactions, either Income or Expense.', max_length=7)),
+                ('total', models.DecimalField(decimal_places=2, default=0, help_text='The sum of the transaction amounts.', max_digits=14)),
+                ('count', models.IntegerField(default=0, help_text='The number of transactions.')),
+                ('category', models.ForeignKey(help_text='The category of the summed transactions.', null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.category')),
+                ('owner', models.ForeignKey(help_text='The user profile whose transactions are summed.', on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='api.userprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'day', 'category', 'type'), name='api_rollup_owner_day_category_type_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_transactionrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="import_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Content hash of the imported row, used to skip re-imported rows.",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "import_hash"), name="api_txn_owner_import_hash_uniq"
+            ),
+        ),
+    ]
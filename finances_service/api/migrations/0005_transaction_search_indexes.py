@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from api.search import install_search_indexes, uninstall_search_indexes
+
+
+def forwards(apps, schema_editor):
+    install_search_indexes(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    uninstall_search_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_transaction_import_hash"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
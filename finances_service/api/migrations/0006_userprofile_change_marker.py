@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_transaction_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="data_version",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
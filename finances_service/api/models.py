@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
 
 
@@ -25,6 +26,12 @@ class UserProfile(models.Model):
     budget_limit = models.DecimalField(
         max_digits=10, decimal_places=2, default=0.0
     )  # The user's budget limit.
+    data_version = models.BigIntegerField(
+        default=0
+    )  # Bumped on every change to the user's data; the ETag of the read endpoints.
+    updated_at = models.DateTimeField(
+        default=timezone.now
+    )  # When the user's data last changed; the Last-Modified of the read endpoints.
 
     def __str__(self):
         # String representation of the UserProfile model.
@@ -63,7 +70,74 @@ class Transaction(models.Model):
     note = models.TextField(
         blank=True, null=True, help_text="Additional notes about the transaction."
     )
+    import_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Content hash of the imported row, used to skip re-imported rows.",
+    )
+
+    class Meta:
+        constraints = [
+            # Makes re-uploading the same import file a no-op for rows already imported.
+            models.UniqueConstraint(
+                fields=["owner", "import_hash"], name="api_txn_owner_import_hash_uniq"
+            ),
+        ]
+        indexes = [
+            # Serves the per-user transaction list ordered by (-date, -id) and its keyset pages.
+            models.Index(
+                fields=["owner", "-date", "-id"], name="api_txn_owner_date_id_idx"
+            ),
+            # Serves the monthly/weekly analytics filtered by owner, type and a date window.
+            models.Index(
+                fields=["owner", "type", "date"], name="api_txn_owner_type_date_idx"
+            ),
+        ]
 
     def __str__(self):
         # String representation of the Transaction model.
         return self.name
+
+
+# Per-user daily totals of transactions, maintained alongside every write so that
+# dashboard reads scan O(categories) rows instead of every transaction.
+class TransactionRollup(models.Model):
+    owner = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name="rollups",
+        help_text="The user profile whose transactions are summed.",
+    )
+    day = models.DateField(help_text="The date of the summed transactions.")
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        help_text="The category of the summed transactions.",
+    )
+    type = models.CharField(
+        max_length=7,
+        choices=TransactionType.choices,
+        help_text="The type of the summed transactions, either Income or Expense.",
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="The sum of the transaction amounts.",
+    )
+    count = models.IntegerField(default=0, help_text="The number of transactions.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "day", "category", "type"],
+                name="api_rollup_owner_day_category_type_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        # String representation of the TransactionRollup model.
+        return f"{self.owner_id} {self.day} {self.type}"
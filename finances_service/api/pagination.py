@@ -0,0 +1,92 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+class KeysetCursor:
+    """
+    Opaque cursor for keyset pagination over transactions ordered by (-date, -id), or by
+    (-rank, -date, -id) for search results.
+
+    The cursor encodes the (date, id) pair, and the search rank if any, of the last row
+    of a page, so the next page is fetched with a plain range predicate instead of an
+    OFFSET scan.
+    """
+
+    def __init__(self, date, id, rank=None):
+        self.date = date
+        self.id = id
+        self.rank = rank
+
+    def encode(self):
+        """
+        Encodes the cursor into an URL-safe string.
+
+        Returns:
+            str: The opaque cursor value to hand back to the client.
+        """
+        values = [self.date.isoformat(), self.id]
+        if self.rank is not None:
+            values.append(self.rank)
+        payload = json.dumps(values, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value):
+        """
+        Decodes a cursor previously produced by `encode`.
+
+        Args:
+            value (str): The opaque cursor value received from the client.
+
+        Raises:
+            ValidationError: If the cursor is malformed.
+        """
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            raw_date, raw_id, *raw_rank = json.loads(base64.urlsafe_b64decode(padded))
+            rank = int(raw_rank[0]) if raw_rank else None
+            return cls(datetime.date.fromisoformat(raw_date), int(raw_id), rank)
+        except (ValueError, TypeError, binascii.Error):
+            raise ValidationError("Invalid cursor")
+
+    def as_filter(self):
+        """
+        Builds the predicate selecting rows that come after this cursor.
+
+        Returns:
+            Q: A filter matching rows strictly after this cursor in the page order.
+        """
+        after = Q(date__lt=self.date) | Q(date=self.date, id__lt=self.id)
+        if self.rank is None:
+            return after
+        return Q(rank__lt=self.rank) | (Q(rank=self.rank) & after)
+
+
+def parse_limit(value):
+    """
+    Validates the `limit` query parameter for paginated endpoints.
+
+    Args:
+        value (str): The raw query parameter, or None to use the default page size.
+
+    Returns:
+        int: The page size, clamped to TRANSACTIONS_PAGE_MAX_SIZE.
+
+    Raises:
+        ValidationError: If the value is not a positive integer.
+    """
+    if value is None:
+        return settings.TRANSACTIONS_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValidationError("limit must be a positive integer")
+    if limit < 1:
+        raise ValidationError("limit must be a positive integer")
+    return min(limit, settings.TRANSACTIONS_PAGE_MAX_SIZE)
@@ -0,0 +1,316 @@
+"""
+Monthly range partitioning of api_transaction by `date` (PostgreSQL only).
+
+Partitioning is an optional deployment mode: `manage.py partition_transactions --convert`
+switches to it once, and running the command regularly keeps partitions ahead of the
+calendar and detaches old ones (see readme.md). The partitioned table keeps the columns,
+indexes and constraints of the plain one, except that PostgreSQL requires the primary
+key and the unique constraints to include `date`. The import hash covers the date of the
+row, so (owner, import hash) stays unique all the same.
+
+Every month has its own partition named api_transaction_yYYYYmMM. Rows dated outside of
+them (old imports, dates far ahead) go to api_transaction_default, and are moved out of
+it when the partition of their month is created.
+
+Queries filtering on a date range only scan the partitions of that range (partition
+pruning), which covers the per-month and per-week reads of the services.
+"""
+
+import datetime
+import re
+
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from . import cache, conditional
+from .models import Transaction, TransactionRollup
+
+TABLE = Transaction._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+# Name of the partitioned table while --convert fills it
+NEW_TABLE = f"{TABLE}_partitioned"
+PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def partition_name(month):
+    """
+    Returns the name of the partition holding a month.
+
+    Args:
+        month (date): Any day within the month.
+
+    Returns:
+        str: The partition name, e.g. api_transaction_y2024m05.
+    """
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _months(first, last):
+    # The first days of the months from `first` to `last`, both included
+    month = first
+    while month <= last:
+        yield month
+        month = _add_months(month, 1)
+
+
+def _check_vendor():
+    if connection.vendor != "postgresql":
+        raise ValueError("Partitioning requires PostgreSQL")
+
+
+def is_partitioned():
+    """
+    Returns whether api_transaction is a partitioned table.
+    """
+    _check_vendor()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions():
+    """
+    Returns the monthly partitions attached to api_transaction.
+
+    Returns:
+        dict: Maps the first day of each month to its partition name, in month order.
+    """
+    _check_vendor()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    months = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months[datetime.date(int(match[1]), int(match[2]), 1)] = name
+    return dict(sorted(months.items()))
+
+
+def default_partition_rows():
+    """
+    Returns the number of rows in the default partition, the ones no monthly partition
+    covers.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        return cursor.fetchone()[0]
+
+
+def convert_table(months_ahead=3):
+    """
+    Replaces api_transaction with a partitioned table holding the same rows.
+
+    Partitions are created for every month from the oldest transaction to `months_ahead`
+    months after the current one. The table is locked while the rows are copied and its
+    indexes rebuilt, so run this in a maintenance window.
+
+    Args:
+        months_ahead (int): The number of months after the current one to create
+            partitions for.
+
+    Returns:
+        list: The names of the created monthly partitions.
+
+    Raises:
+        ValueError: If the database is not PostgreSQL or the table is already partitioned.
+    """
+    _check_vendor()
+    quote = connection.ops.quote_name
+    this_month = timezone.localdate().replace(day=1)
+
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        # Checks the deferred foreign keys of rows written earlier in the transaction,
+        # which would keep the old table from being dropped
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        if is_partitioned():
+            raise ValueError(f"{TABLE} is already partitioned")
+
+        # The indexes that don't back a constraint, recreated as they are
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT EXISTS "
+            "(SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid) "
+            "ORDER BY i.indexrelid",
+            [TABLE],
+        )
+        indexes = [sql for (sql,) in cursor.fetchall()]
+        # Primary key, unique, foreign key and check constraints with their columns
+        cursor.execute(
+            "SELECT c.conname, c.contype, pg_get_constraintdef(c.oid), "
+            "ARRAY(SELECT a.attname FROM unnest(c.conkey) WITH ORDINALITY k(attnum, n) "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum "
+            "ORDER BY k.n) "
+            "FROM pg_constraint c WHERE c.conrelid = %s::regclass "
+            "AND c.contype IN ('p', 'u', 'f', 'c') ORDER BY c.contype DESC, c.conname",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT last_value, is_called FROM {sequence}")
+        last_value, is_called = cursor.fetchone()
+        cursor.execute(f"SELECT min(date), max(date) FROM {TABLE}")
+        first_date, last_date = cursor.fetchone()
+
+        cursor.execute(
+            f"CREATE TABLE {NEW_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS "
+            "INCLUDING IDENTITY INCLUDING STORAGE INCLUDING COMMENTS) "
+            "PARTITION BY RANGE (date)"
+        )
+        first = min(first_date.replace(day=1), this_month) if first_date else this_month
+        last = _add_months(this_month, months_ahead)
+        if last_date:
+            last = max(last, last_date.replace(day=1))
+        created = []
+        for month in _months(first, last):
+            created.append(partition_name(month))
+            cursor.execute(
+                f"CREATE TABLE {created[-1]} PARTITION OF {NEW_TABLE} "
+                f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            )
+        cursor.execute(
+            f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {NEW_TABLE} DEFAULT"
+        )
+
+        # Rows are copied before the indexes exist, which is faster than maintaining them
+        cursor.execute(
+            f"INSERT INTO {NEW_TABLE} OVERRIDING SYSTEM VALUE SELECT * FROM {TABLE}"
+        )
+        # Nothing references transactions, so the old table goes without cascading
+        cursor.execute(f"DROP TABLE {TABLE}")
+        cursor.execute(f"ALTER TABLE {NEW_TABLE} RENAME TO {TABLE}")
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        cursor.execute(
+            f"ALTER SEQUENCE {cursor.fetchone()[0]} "
+            f"RENAME TO {sequence.rsplit('.', 1)[-1]}"
+        )
+        # IDs keep going from the old sequence, never reusing one
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, last_value, is_called])
+
+        for sql in indexes:
+            cursor.execute(sql)
+        for name, type, definition, columns in constraints:
+            if type in ("p", "u"):
+                if "date" not in columns:
+                    columns.append("date")
+                keyword = "PRIMARY KEY" if type == "p" else "UNIQUE"
+                definition = f"{keyword} ({', '.join(map(quote, columns))})"
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD CONSTRAINT {quote(name)} {definition}"
+            )
+        cursor.execute(f"ANALYZE {TABLE}")
+    return created
+
+
+def create_partitions(months_ahead=3):
+    """
+    Creates the missing monthly partitions up to `months_ahead` months after the current
+    one, starting after the newest existing partition if it is in the past.
+
+    Each partition is filled with the rows of its month waiting in the default partition
+    before it is attached, which only briefly locks api_transaction.
+
+    Args:
+        months_ahead (int): The number of months after the current one to create
+            partitions for.
+
+    Returns:
+        list: The names of the created partitions.
+
+    Raises:
+        ValueError: If the database is not PostgreSQL.
+    """
+    existing = monthly_partitions()
+    first = this_month = timezone.localdate().replace(day=1)
+    if existing:
+        first = min(first, _add_months(max(existing), 1))
+
+    created = []
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        for month in _months(first, _add_months(this_month, months_ahead)):
+            if month in existing:
+                continue
+            name = partition_name(month)
+            bounds = f"FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            cursor.execute(
+                f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING STORAGE)"
+            )
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE date >= '{month}' AND date < '{_add_months(month, 1)}' "
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            )
+            # Attaching creates the partition's indexes and foreign keys
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"
+            )
+            created.append(name)
+    return created
+
+
+def detach_partitions(retain_months, archive_schema=None):
+    """
+    Detaches the monthly partitions older than the `retain_months` most recent months,
+    the current one included.
+
+    A detached partition is left as a plain table, moved to `archive_schema` if given,
+    without foreign keys so that deleting users and categories doesn't depend on it. The
+    rollups of its month are deleted, keeping them in step with the transactions the API
+    still serves, and the cached payloads and ETags of every user are invalidated.
+
+    Args:
+        retain_months (int): The number of recent months whose partitions are kept.
+        archive_schema (str, optional): The schema to move detached partitions to,
+            created if missing.
+
+    Returns:
+        list: The names of the detached partitions.
+
+    Raises:
+        ValueError: If the database is not PostgreSQL.
+    """
+    quote = connection.ops.quote_name
+    cutoff = _add_months(timezone.localdate().replace(day=1), 1 - retain_months)
+
+    detached = []
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        for month, name in monthly_partitions().items():
+            if month >= cutoff:
+                break
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [name],
+            )
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(
+                    f"ALTER TABLE {name} DROP CONSTRAINT {quote(constraint)}"
+                )
+            if archive_schema:
+                cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(archive_schema)}")
+                cursor.execute(f"ALTER TABLE {name} SET SCHEMA {quote(archive_schema)}")
+            TransactionRollup.objects.filter(
+                day__gte=month, day__lt=_add_months(month, 1)
+            ).delete()
+            detached.append(name)
+
+        if detached:
+            conditional.mark_all_changed()
+            cache.invalidate_all()
+    return detached
@@ -0,0 +1,72 @@
+"""
+Response renderers, chosen per request by DRF's content negotiation (the Accept header
+or the `format` query parameter).
+
+- ORJSONRenderer: application/json encoded with orjson instead of the stdlib `json`
+  module, producing the same bytes as DRF's JSONRenderer.
+- MessagePackRenderer: application/msgpack, a compact binary encoding of the same data
+  for the mobile clients.
+
+REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] lists the enabled ones; see JSON_RENDERER and
+MSGPACK_RENDERER_ENABLED in the settings.
+"""
+
+import decimal
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# DRF's encoder, for the types orjson and msgpack don't format the way DRF does
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimals become numbers like with DRF's JSONEncoder (serializer fields already
+    # render amounts as strings); dates, datetimes and the rest are formatted by DRF.
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson. The output is compact UTF-8 like JSONRenderer's.
+    Dates and datetimes are passed to DRF's encoder, so they keep its format (datetimes
+    in milliseconds, UTC as "Z").
+
+    Requests for indented output (`Accept: application/json; indent=4`) fall back to
+    JSONRenderer, as orjson only indents by two spaces.
+    """
+
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=self.OPTIONS)
+        # Escaped by JSONRenderer too, keeping the output a strict JavaScript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders responses as MessagePack. Values have the same types as in the JSON
+    responses: decimals are floats, dates and datetimes are strings.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
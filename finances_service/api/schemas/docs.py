@@ -0,0 +1,216 @@
+"""
+API documentation: the OpenAPI schema and the Swagger UI / Redoc pages.
+
+Generating the schema walks every view and serializer, so it is built once by the
+`build_openapi_schema` command (run after `collectstatic` in the Dockerfile) and served
+from that file with long cache headers and an ETag.
+
+With API_DOCS_ENABLED off, drf_yasg is never imported: `swagger_auto_schema` becomes a
+no-op decorator, the swagger parameter definitions are None and the UI pages are not
+mounted. The prebuilt schema file is still served.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.urls import path
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
+
+API_INFO = {
+    "title": "Finances Service API",
+    "default_version": "v1",
+    "description": "This service allows users to manage their financial transactions and budgets, categorize transactions, and view financial analytics.",
+}
+API_LICENSE = "MIT License"
+
+if settings.API_DOCS_ENABLED:
+    from drf_yasg.utils import swagger_auto_schema
+    from .swagger_schemas import (
+        add_transaction_request_body,
+        add_transactions_request_body,
+        add_transactions_params,
+        delete_transactions_request_body,
+        recategorize_transactions_request_body,
+        transaction_query_params,
+        delete_transaction_params,
+        update_user_profile_budget_limit_schema,
+        import_transactions_params,
+        export_transactions_params,
+        dashboard_query_params,
+    )
+else:
+
+    def swagger_auto_schema(*args, **kwargs):
+        # Documentation is off; leave the view method untouched
+        def decorator(view_method):
+            return view_method
+
+        return decorator
+
+    add_transaction_request_body = None
+    add_transactions_request_body = None
+    add_transactions_params = None
+    delete_transactions_request_body = None
+    recategorize_transactions_request_body = None
+    transaction_query_params = None
+    delete_transaction_params = None
+    update_user_profile_budget_limit_schema = None
+    import_transactions_params = None
+    export_transactions_params = None
+    dashboard_query_params = None
+
+
+def _service_url():
+    # Without SERVICE_URL clients resolve the API against the host serving the schema
+    return os.environ.get("SERVICE_URL") or None
+
+
+def generate_schema():
+    """
+    Generates the OpenAPI schema of the whole API.
+
+    The schema has no host or scheme: it is usually built into an image that runs under
+    different URLs, so `with_service_url` adds them where it is served.
+
+    Returns:
+        bytes: The schema as JSON.
+    """
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    info = openapi.Info(**API_INFO, license=openapi.License(name=API_LICENSE))
+    generator = OpenAPISchemaGenerator(info)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def with_service_url(body):
+    """
+    Adds the host and scheme of the running service's SERVICE_URL to a schema.
+
+    Args:
+        body (bytes): The schema as JSON, as written by `generate_schema`.
+
+    Returns:
+        bytes: The schema as JSON, unchanged while SERVICE_URL is not set.
+    """
+    service_url = _service_url()
+    if service_url is None:
+        return body
+    url = urlsplit(service_url)
+    schema = {}
+    # Keep drf_yasg's key order, which puts them after "info"
+    for key, value in json.loads(body).items():
+        if key not in ("host", "schemes"):
+            schema[key] = value
+        if key == "info":
+            schema["host"] = url.netloc
+            schema["schemes"] = [url.scheme]
+    return json.dumps(schema, ensure_ascii=False).encode()
+
+
+class OpenAPISchemaView(View):
+    """
+    Serves the schema written by `build_openapi_schema`, with the SERVICE_URL of this
+    deployment. When the file has not been built and the docs are enabled (development),
+    the schema is generated once per process.
+    """
+
+    _lock = threading.Lock()
+    # (file mtime or None for a generated schema, body, etag)
+    _cached = None
+
+    def get(self, request, *args, **kwargs):
+        schema = self._load()
+        if schema is None:
+            return JsonResponse(
+                {"error": "The OpenAPI schema has not been built"}, status=404
+            )
+        _, body, etag = schema
+
+        if etag in parse_etags(request.headers.get("if-none-match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE
+        )
+        return response
+
+    @classmethod
+    def _load(cls):
+        try:
+            mtime = os.stat(settings.OPENAPI_SCHEMA_FILE).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+            if not settings.API_DOCS_ENABLED:
+                return None
+
+        with cls._lock:
+            # Reread the file only when a new build replaced it
+            if cls._cached is None or cls._cached[0] != mtime:
+                if mtime is None:
+                    body = generate_schema()
+                else:
+                    with open(settings.OPENAPI_SCHEMA_FILE, "rb") as schema_file:
+                        body = schema_file.read()
+                body = with_service_url(body)
+                etag = quote_etag(hashlib.sha256(body).hexdigest()[:32])
+                cls._cached = (mtime, body, etag)
+            return cls._cached
+
+
+def docs_urlpatterns(prefix):
+    """
+    Builds the documentation URL patterns.
+
+    Args:
+        prefix (str): The URL prefix of the API, e.g. "api/finances/".
+
+    Returns:
+        list: The schema file pattern and, with API_DOCS_ENABLED, the Swagger UI and
+        Redoc pages.
+    """
+    urlpatterns = [
+        path(
+            f"{prefix}openapi.json",
+            OpenAPISchemaView.as_view(),
+            name="openapi-schema",
+        )
+    ]
+    if not settings.API_DOCS_ENABLED:
+        return urlpatterns
+
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(
+        openapi.Info(**API_INFO, license=openapi.License(name=API_LICENSE)),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+        url=_service_url(),
+    )
+    # The pages load the schema from openapi.json (SPEC_URL), so rendering them does
+    # not generate it
+    return urlpatterns + [
+        path(
+            f"{prefix}swagger/",
+            schema_view.with_ui("swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+        path(
+            f"{prefix}redoc/",
+            schema_view.with_ui("redoc", cache_timeout=0),
+            name="schema-redoc",
+        ),
+    ]
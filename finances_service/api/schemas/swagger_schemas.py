@@ -28,6 +28,40 @@ update_user_profile_budget_limit_schema = openapi.Schema(
     },
 )
 
+# Filters selecting the transactions of a bulk delete or recategorisation
+transaction_filter_properties = {
+    "ids": openapi.Schema(
+        type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)
+    ),
+    "start_date": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
+    "end_date": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
+    "name": openapi.Schema(
+        type=openapi.TYPE_STRING,
+        description="Matched like the name search of the transactions list",
+    ),
+    "category_id": openapi.Schema(
+        type=openapi.TYPE_INTEGER,
+        x_nullable=True,
+        description="null selects the uncategorised transactions",
+    ),
+}
+
+delete_transactions_request_body = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties=transaction_filter_properties,
+    description="At least one filter is required; all given filters must match",
+)
+
+recategorize_transactions_request_body = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["new_category_id"],
+    properties={
+        **transaction_filter_properties,
+        "new_category_id": openapi.Schema(type=openapi.TYPE_INTEGER),
+    },
+    description="At least one filter is required; all given filters must match",
+)
+
 # Define the schema for the transaction creation request
 transaction_query_params = [
     openapi.Parameter(
@@ -80,6 +114,44 @@ transaction_query_params = [
         format="date",
         required=False,
     ),
+    openapi.Parameter(
+        "limit",
+        openapi.IN_QUERY,
+        description="Page size; when set the response is a page with a `next` cursor",
+        type=openapi.TYPE_INTEGER,
+        required=False,
+    ),
+    openapi.Parameter(
+        "cursor",
+        openapi.IN_QUERY,
+        description="Opaque cursor returned as `next` by the previous page",
+        type=openapi.TYPE_STRING,
+        required=False,
+    ),
+]
+
+export_transactions_params = transaction_query_params[:3] + [
+    openapi.Parameter(
+        "file_format",
+        openapi.IN_QUERY,
+        description="Export format, csv (default) or ndjson",
+        type=openapi.TYPE_STRING,
+        enum=["csv", "ndjson"],
+        required=False,
+    ),
+]
+
+dashboard_query_params = [
+    openapi.Parameter(
+        "sections",
+        openapi.IN_QUERY,
+        description=(
+            "Comma-separated sections to return: budget, expenses_by_categories, "
+            "transactions_by_week (default: all)"
+        ),
+        type=openapi.TYPE_STRING,
+        required=False,
+    ),
 ]
 
 delete_transaction_params = [
@@ -91,3 +163,36 @@ delete_transaction_params = [
         required=True,
     ),
 ]
+
+add_transactions_request_body = openapi.Schema(
+    type=openapi.TYPE_ARRAY,
+    items=add_transaction_request_body,
+    description="The transactions to add",
+)
+
+add_transactions_params = [
+    openapi.Parameter(
+        "mode",
+        openapi.IN_QUERY,
+        description=(
+            "atomic (default): any invalid transaction rejects the whole batch; "
+            "best_effort: invalid transactions are skipped and reported"
+        ),
+        type=openapi.TYPE_STRING,
+        enum=["atomic", "best_effort"],
+        required=False,
+    ),
+]
+
+import_transactions_params = [
+    openapi.Parameter(
+        "file",
+        openapi.IN_FORM,
+        description=(
+            "CSV (header: name,date,amount,type,category_id,from_account,note) or NDJSON "
+            "file; the raw body with Content-Type text/csv or application/x-ndjson also works"
+        ),
+        type=openapi.TYPE_FILE,
+        required=False,
+    ),
+]
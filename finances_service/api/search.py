@@ -0,0 +1,195 @@
+from django.db import OperationalError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+# Columns covered by transaction search.
+SEARCH_FIELDS = ["name", "note", "from_account"]
+
+# The FTS5 trigram tokenizer indexes 3-character sequences, so shorter terms can't use it.
+MIN_INDEXED_TERM_LENGTH = 3
+
+# PostgreSQL: trigram GIN indexes on the exact expressions Django's `icontains` compiles to
+# (UPPER(column::text) LIKE UPPER(%s)), so the planner can use them for substring search.
+POSTGRES_INSTALL_SQL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS api_txn_{field}_trgm_idx ON api_transaction "
+    f"USING gin ((UPPER({field}::text)) gin_trgm_ops)"
+    for field in SEARCH_FIELDS
+]
+POSTGRES_UNINSTALL_SQL = [
+    f"DROP INDEX IF EXISTS api_txn_{field}_trgm_idx" for field in SEARCH_FIELDS
+]
+
+# SQLite: an external-content FTS5 shadow table over api_transaction kept in sync by triggers.
+SQLITE_FTS_TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_transaction_fts USING fts5("
+    "name, note, from_account, content='api_transaction', content_rowid='id', "
+    "tokenize='trigram')"
+)
+SQLITE_FTS_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_transaction_fts_insert
+    AFTER INSERT ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(rowid, name, note, from_account)
+        VALUES (new.id, new.name, new.note, new.from_account);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_transaction_fts_delete
+    AFTER DELETE ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, name, note, from_account)
+        VALUES ('delete', old.id, old.name, old.note, old.from_account);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_transaction_fts_update
+    AFTER UPDATE OF name, note, from_account ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, name, note, from_account)
+        VALUES ('delete', old.id, old.name, old.note, old.from_account);
+        INSERT INTO api_transaction_fts(rowid, name, note, from_account)
+        VALUES (new.id, new.name, new.note, new.from_account);
+    END
+    """,
+]
+SQLITE_UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS api_transaction_fts_insert",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_update",
+    "DROP TABLE IF EXISTS api_transaction_fts",
+]
+
+# Whether the FTS table exists, per SQLite database file. Filled in when a connection
+# opens (see `record_sqlite_fts`), so building a search filter never queries the
+# database, which async views can't do from the event loop.
+_sqlite_fts_available = {}
+
+
+def install_search_indexes(schema_editor):
+    """
+    Creates the search indexes supported by the database backend.
+
+    On SQLite builds without FTS5 or its trigram tokenizer nothing is created and search
+    falls back to plain substring matching.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sql in POSTGRES_INSTALL_SQL:
+            schema_editor.execute(sql)
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(SQLITE_FTS_TABLE_SQL)
+        except OperationalError:
+            return
+        _sqlite_fts_available[_database_name(schema_editor.connection)] = True
+        ensure_sqlite_fts_triggers(schema_editor.connection)
+        schema_editor.execute(
+            "INSERT INTO api_transaction_fts(api_transaction_fts) VALUES ('rebuild')"
+        )
+
+
+def uninstall_search_indexes(schema_editor):
+    """
+    Drops the search indexes created by `install_search_indexes`.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = POSTGRES_UNINSTALL_SQL
+    elif vendor == "sqlite":
+        statements = SQLITE_UNINSTALL_SQL
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+    _sqlite_fts_available.clear()
+
+
+def ensure_sqlite_fts_triggers(db_connection):
+    """
+    (Re)creates the triggers that keep the FTS table in sync with api_transaction.
+
+    SQLite drops a table's triggers when Django rebuilds it during a migration, so this
+    also runs after every `migrate`.
+    """
+    if db_connection.vendor != "sqlite" or not _has_sqlite_fts(db_connection):
+        return
+    with db_connection.cursor() as cursor:
+        for sql in SQLITE_FTS_TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def record_sqlite_fts(db_connection):
+    """
+    Records whether the FTS table exists in the database of a new SQLite connection.
+    """
+    if db_connection.vendor == "sqlite":
+        _has_sqlite_fts(db_connection)
+
+
+def _database_name(db_connection):
+    return str(db_connection.settings_dict["NAME"])
+
+
+def _has_sqlite_fts(db_connection):
+    name = _database_name(db_connection)
+    if name not in _sqlite_fts_available:
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = 'api_transaction_fts'"
+            )
+            _sqlite_fts_available[name] = cursor.fetchone() is not None
+    return _sqlite_fts_available[name]
+
+
+def search_filter(term):
+    """
+    Builds the filter matching transactions whose name, note or account contains `term`.
+
+    On SQLite terms of at least three characters are looked up in the FTS5 trigram
+    table; everywhere else the case-insensitive substring match is served by the trigram
+    GIN indexes on PostgreSQL, or scans the user's rows for short terms. Until a
+    connection has recorded that the FTS table exists, SQLite uses the substring match.
+
+    Args:
+        term (str): The text to search for.
+
+    Returns:
+        Q: The filter to apply to a Transaction queryset.
+    """
+    if (
+        connection.vendor == "sqlite"
+        and len(term) >= MIN_INDEXED_TERM_LENGTH
+        and _sqlite_fts_available.get(_database_name(connection), False)
+    ):
+        # Quote the term as an FTS5 phrase so its characters are matched literally
+        phrase = '"' + term.replace('"', '""') + '"'
+        return Q(
+            id__in=RawSQL(
+                "SELECT rowid FROM api_transaction_fts WHERE api_transaction_fts MATCH %s",
+                [phrase],
+            )
+        )
+
+    query = Q()
+    for field in SEARCH_FIELDS:
+        query |= Q(**{f"{field}__icontains": term})
+    return query
+
+
+def search_rank(term):
+    """
+    Builds the relevance of a matched transaction: exact name, name prefix, name
+    substring, then a match in the note or account only.
+
+    Args:
+        term (str): The text that was searched for.
+
+    Returns:
+        Case: An integer expression, higher for more relevant transactions.
+    """
+    return Case(
+        When(name__iexact=term, then=Value(4)),
+        When(name__istartswith=term, then=Value(3)),
+        When(name__icontains=term, then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
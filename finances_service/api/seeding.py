@@ -0,0 +1,302 @@
+"""
+Synthetic datasets for benchmarks and load tests.
+
+Every user gets the same number of transactions, dated over the last `days` days with a
+skew towards recent days (the current month of a real account is the busiest) and spread
+unevenly over categories named after the ones inserted by basic_db.sql. The data only
+depends on the random seed and the date, so two runs with the same parameters produce the
+same dataset.
+"""
+
+import datetime
+import itertools
+import random
+import re
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache
+from .models import Category, Transaction, TransactionType, UserProfile
+from .services.RollupService import RollupService
+
+# The sample data of the repository, whose categories are the first generated ones
+BASIC_DB_SQL = Path(settings.BASE_DIR).parent / "basic_db.sql"
+DEFAULT_CATEGORY_NAMES = ["Groceries", "Digital", "Others"]
+
+NAMES = {
+    TransactionType.EXPENSE: [
+        "McDonalds",
+        "Internet",
+        "Shops",
+        "Supermarket",
+        "Rent",
+        "Electricity",
+        "Taxi",
+        "Pharmacy",
+        "Cinema",
+        "Coffee",
+    ],
+    TransactionType.INCOME: ["Salary", "Freelance", "Refund", "Interest"],
+}
+ACCOUNTS = ["Savings", "Checking", "Credit card", "Cash"]
+NOTES = [None, None, None, "Groceries", "Monthly", "Shared with a friend"]
+# Share of income transactions
+INCOME_RATIO = 0.15
+TWO_PLACES = Decimal("0.01")
+# The columns COPY fills, in the order of its rows
+COPY_COLUMNS = (
+    "owner_id",
+    "name",
+    "date",
+    "amount",
+    "type",
+    "category_id",
+    "from_account",
+    "note",
+)
+WRITE_METHODS = ("auto", "copy", "bulk_create")
+# Users whose rollups are rebuilt per query, keeping the IN lists short enough for SQLite
+USER_CHUNK_SIZE = 500
+
+
+def category_names(count, path=BASIC_DB_SQL):
+    """
+    Returns category names for a dataset: the ones basic_db.sql inserts, then numbered
+    ones.
+
+    Args:
+        count (int): The number of names.
+        path (Path, optional): The SQL file to read the names from.
+
+    Returns:
+        list: `count` distinct category names.
+    """
+    names = DEFAULT_CATEGORY_NAMES
+    try:
+        sql = path.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    else:
+        insert = re.search(
+            r"INSERT INTO api_category \(name\) VALUES(.*?);", sql, re.I | re.S
+        )
+        if insert:
+            names = [
+                name.replace("''", "'")
+                for name in re.findall(r"'((?:[^']|'')*)'", insert.group(1))
+            ]
+    names = names[:count]
+    return names + [f"Category {i}" for i in range(len(names) + 1, count + 1)]
+
+
+def create_categories(count):
+    """
+    Creates the categories of a dataset, reusing existing ones with the same names.
+
+    Args:
+        count (int): The number of categories.
+
+    Returns:
+        list: The category IDs, in the order of `category_names`.
+    """
+    names = category_names(count)
+    existing = dict(
+        Category.objects.filter(name__in=names)
+        .order_by("-id")
+        .values_list("name", "id")
+    )
+    # One by one so the category signals invalidate the cached category list
+    return [
+        existing.get(name) or Category.objects.create(name=name).id for name in names
+    ]
+
+
+def transaction_rows(user_ids, per_user, category_ids, days=365, skew=3.0, seed=0):
+    """
+    Generates the field values of synthetic transactions, user by user.
+
+    Args:
+        user_ids (list): The owners of the transactions.
+        per_user (int): The number of transactions of each user.
+        category_ids (list): The categories to spread the transactions over; the first
+            ones are used the most.
+        days (int): How many days back the dates go.
+        skew (float): How much the dates crowd towards today; 1 spreads them evenly.
+        seed (int): The seed of the random generator.
+
+    Yields:
+        dict: The field values of one transaction.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    # Zipf-like weights: the first category is used twice as often as the second, ...
+    weights = [1 / rank for rank in range(1, len(category_ids) + 1)]
+    for user_id in user_ids:
+        categories = rng.choices(category_ids, weights, k=per_user)
+        for category_id in categories:
+            type = (
+                TransactionType.INCOME
+                if rng.random() < INCOME_RATIO
+                else TransactionType.EXPENSE
+            )
+            # Mostly small amounts with a long tail, like card payments
+            amount = min(rng.lognormvariate(3, 1.2), 99999)
+            yield {
+                "owner_id": user_id,
+                "name": rng.choice(NAMES[type]),
+                "date": today
+                - datetime.timedelta(days=int(days * rng.random() ** skew)),
+                "amount": Decimal(amount).quantize(TWO_PLACES),
+                "type": type,
+                "category_id": category_id,
+                "from_account": rng.choice(ACCOUNTS),
+                "note": rng.choice(NOTES),
+            }
+
+
+def write_transactions(rows, batch_size=5000, method="auto"):
+    """
+    Inserts transactions, with COPY on PostgreSQL and bulk_create elsewhere.
+
+    The rollups are not updated; rebuild them afterwards (see `seed_dataset`).
+
+    Args:
+        rows (iterable): The field values of each transaction, as from `transaction_rows`.
+        batch_size (int): The number of rows per INSERT with bulk_create.
+        method (str): "copy", "bulk_create" or "auto" to pick by database.
+
+    Returns:
+        int: The number of inserted transactions.
+
+    Raises:
+        ValueError: If the method is unknown, or "copy" on a database other than
+            PostgreSQL.
+    """
+    if method not in WRITE_METHODS:
+        raise ValueError(f"Unknown write method: {method}")
+    if method == "auto":
+        method = "copy" if connection.vendor == "postgresql" else "bulk_create"
+    if method == "copy":
+        return copy_transactions(rows)
+
+    rows = iter(rows)
+    count = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        Transaction.objects.bulk_create([Transaction(**row) for row in batch])
+        count += len(batch)
+    return count
+
+
+def copy_transactions(rows):
+    """
+    Inserts transactions with one COPY FROM STDIN (PostgreSQL), streaming the rows to
+    the server as they are generated, so memory use does not depend on their number.
+
+    Args:
+        rows (iterable): The field values of each transaction, as from `transaction_rows`.
+
+    Returns:
+        int: The number of inserted transactions.
+
+    Raises:
+        ValueError: If the database is not PostgreSQL.
+    """
+    if connection.vendor != "postgresql":
+        raise ValueError("COPY requires PostgreSQL")
+
+    sql = f"COPY {Transaction._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+    count = 0
+    with connection.cursor() as cursor, cursor.copy(sql) as copy:
+        for row in rows:
+            copy.write_row([row[column] for column in COPY_COLUMNS])
+            count += 1
+    return count
+
+
+def seed_dataset(
+    users=10,
+    transactions_per_user=1000,
+    categories=3,
+    days=365,
+    skew=3.0,
+    seed=0,
+    user_prefix="seed-user-",
+    batch_size=5000,
+    method="auto",
+):
+    """
+    Creates a synthetic dataset: users, their transactions and rollups.
+
+    Existing users with the same IDs are kept and receive the new transactions on top of
+    their own.
+
+    Args:
+        users (int): The number of users.
+        transactions_per_user (int): The number of transactions of each user.
+        categories (int): The number of categories.
+        days (int): How many days back the transaction dates go.
+        skew (float): How much the dates crowd towards today; 1 spreads them evenly.
+        seed (int): The seed of the random generator.
+        user_prefix (str): The prefix of the user IDs, followed by 0, 1, ...
+        batch_size (int): The number of rows per INSERT with bulk_create.
+        method (str): How transactions are written (see `write_transactions`).
+
+    Returns:
+        dict: The user IDs, the category IDs, the number of created transactions and
+        the (phase, rows, seconds) timings of writing users, transactions and rollups.
+    """
+    user_ids = [f"{user_prefix}{i}" for i in range(users)]
+    category_ids = create_categories(categories)
+    rng = random.Random(seed)
+    timings = []
+
+    with db_transaction.atomic():
+        started = time.perf_counter()
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user_id=user_id,
+                    budget_limit=Decimal(rng.randrange(500, 5000, 50)),
+                )
+                for user_id in user_ids
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        timings.append(("users", users, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        created = write_transactions(
+            transaction_rows(
+                user_ids, transactions_per_user, category_ids, days, skew, seed
+            ),
+            batch_size,
+            method,
+        )
+        timings.append(("transactions", created, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        rollup_service = RollupService()
+        rollups = 0
+        for start in range(0, len(user_ids), USER_CHUNK_SIZE):
+            chunk = user_ids[start : start + USER_CHUNK_SIZE]
+            rollups += rollup_service.rebuild_users(chunk)
+            UserProfile.objects.filter(user_id__in=chunk).update(
+                data_version=F("data_version") + 1, updated_at=timezone.now()
+            )
+        timings.append(("rollups", rollups, time.perf_counter() - started))
+
+    for user_id in user_ids:
+        cache.invalidate_user(user_id)
+    return {
+        "user_ids": user_ids,
+        "category_ids": category_ids,
+        "transactions": created,
+        "timings": timings,
+    }
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.db.models import QuerySet
 from rest_framework import serializers
 from .models import Transaction, Category, TransactionType, UserProfile
 
@@ -49,6 +51,165 @@ class TransactionSerializer(serializers.ModelSerializer):
         return Transaction.objects.create(**validated_data)
 
 
+class TransactionListSerializer:
+    """
+    Read-only fast path for lists of transactions, producing the same JSON as
+    `TransactionSerializer(many=True).data`.
+
+    The rows are read with `values_list` and the category name joined in the same query,
+    so no model instances are built, no per-field serializer runs and no category is
+    looked up per row.
+
+    Args:
+        transactions (QuerySet | list): A Transaction QuerySet, which is projected here,
+            or rows already read with `project`.
+    """
+
+    FIELDS = [
+        "id",
+        "name",
+        "date",
+        "amount",
+        "type",
+        "category_name",
+        "from_account",
+        "note",
+    ]
+    # The column of each field, in the same order
+    COLUMNS = [
+        "id",
+        "name",
+        "date",
+        "amount",
+        "type",
+        "category__name",
+        "from_account",
+        "note",
+    ]
+
+    def __init__(self, transactions):
+        if isinstance(transactions, QuerySet):
+            transactions = self.project(transactions)
+        self.rows = transactions
+
+    @classmethod
+    def project(cls, transactions, *extra):
+        """
+        Selects the columns of the list payload, followed by any `extra` ones.
+
+        Args:
+            transactions (QuerySet): A Transaction QuerySet.
+            *extra (str): Further columns or annotations, e.g. the keyset ones.
+
+        Returns:
+            QuerySet: A `values_list` QuerySet of tuples.
+        """
+        return transactions.values_list(*cls.COLUMNS, *extra)
+
+    @property
+    def data(self):
+        fields = self.FIELDS
+        data = []
+        for row in self.rows:
+            item = dict(zip(fields, row))
+            # Formatted like DRF's DateField and DecimalField (coerced to string); the
+            # database hands back amounts with their two decimal places
+            item["date"] = item["date"].isoformat()
+            item["amount"] = format(item["amount"], "f")
+            data.append(item)
+        return data
+
+
+class CachedCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Category ID field checked against the `category_names` map ({id: name}) in the
+    serializer context instead of a query. IDs missing from the map, e.g. categories
+    created since it was cached, are still looked up in the database.
+    """
+
+    def to_internal_value(self, data):
+        category_names = self.context.get("category_names")
+        if category_names is None:
+            return super().to_internal_value(data)
+
+        # Same conversions and errors as the queryset lookup of PrimaryKeyRelatedField
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        name = category_names.get(pk)
+        if name is None:
+            name = (
+                self.get_queryset().filter(pk=pk).values_list("name", flat=True).first()
+            )
+            if name is None:
+                self.fail("does_not_exist", pk_value=data)
+        # Carries the name for `category_name` so the response doesn't query it either
+        return Category(pk=pk, name=name)
+
+
+class TransactionCreateSerializer(TransactionSerializer):
+    """
+    Validates a new transaction without database queries. The owner is not part of the
+    input; the caller passes it to `save` after checking it, and the category is checked
+    against `context["category_names"]`.
+    """
+
+    owner_id = None
+    category_id = CachedCategoryField(
+        queryset=Category.objects.all(), source="category", write_only=True
+    )
+
+    class Meta(TransactionSerializer.Meta):
+        fields = [
+            field for field in TransactionSerializer.Meta.fields if field != "owner_id"
+        ]
+
+
+class TransactionFilterSerializer(serializers.Serializer):
+    """
+    Selects a user's transactions for a bulk operation. The given filters must all match,
+    and at least one is required so that an empty body can't select every transaction.
+    A null `category_id` selects the uncategorised transactions.
+    """
+
+    FILTERS = ("ids", "start_date", "end_date", "name", "category_id")
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    name = serializers.CharField(required=False)
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_ids(self, ids):
+        if len(ids) > settings.TRANSACTION_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {settings.TRANSACTION_BATCH_MAX_SIZE} elements."
+            )
+        return ids
+
+    def validate(self, data):
+        if not any(field in data for field in self.FILTERS):
+            raise serializers.ValidationError(
+                f"At least one filter is required: {', '.join(self.FILTERS)}."
+            )
+        return data
+
+
+class TransactionRecategorizeSerializer(TransactionFilterSerializer):
+    """
+    Selects a user's transactions like TransactionFilterSerializer and the category to
+    move them to, checked against `context["category_names"]` when given.
+    """
+
+    new_category_id = CachedCategoryField(queryset=Category.objects.all())
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
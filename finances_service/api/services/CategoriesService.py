@@ -1,3 +1,4 @@
+from .. import cache
 from ..models import Category
 
 
@@ -19,3 +20,26 @@ class CategoriesService:
         # Convert the queryset of Category objects into a list of dictionaries,
         # simplifying the structure for consumers of this service.
         return [{"id": category.id, "name": category.name} for category in categories]
+
+    def get_category_names(self):
+        """
+        Maps every category ID to its name, using the payload cached for the categories
+        endpoint, so validating a category usually needs no query.
+
+        Returns:
+            dict: The category names by ID.
+        """
+        categories = cache.get_or_compute(None, "categories", self.get_all_categories)
+        return {category["id"]: category["name"] for category in categories}
+
+    async def aget_all_categories(self):
+        """
+        Async version of `get_all_categories`, using the async ORM API.
+
+        Returns:
+            list: A list of dictionaries where each dictionary represents a category with its 'id' and 'name'.
+        """
+        categories = Category.objects.all().order_by("name")
+        return [
+            {"id": category.id, "name": category.name} async for category in categories
+        ]
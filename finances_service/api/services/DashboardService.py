@@ -0,0 +1,140 @@
+import datetime
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from ..models import Transaction, TransactionRollup, TransactionType, UserProfile
+from ..utils import month_bounds, week_bounds
+from .ExpensesByCategoriesService import ExpensesByCategoriesService
+from .TransactionsByWeekService import TransactionsByWeekService
+from .UserProfileService import UserProfileService
+
+
+class DashboardService:
+    """
+    Service class for building the home screen payloads (budget, expenses by categories and
+    transactions by week) from a single shared read of the user's transactions.
+    """
+
+    SECTIONS = ("budget", "expenses_by_categories", "transactions_by_week")
+
+    def get_dashboard(self, user_id, sections=SECTIONS):
+        """
+        Retrieves the requested dashboard sections for a user.
+
+        Each section is identical to the response of its standalone endpoint. All of them
+        are built from one profile lookup and one query grouping the user's transactions
+        (or rollups) by day, type and category over the union of the month and week windows.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            sections (iterable): The names of the sections to build, from SECTIONS.
+
+        Returns:
+            dict: The payload of every requested section, keyed by section name.
+        """
+        user_profile = UserProfile.objects.get(user_id=user_id)
+        bounds = self._bounds()
+        totals = self._daily_totals(user_profile, sections, bounds)
+        rows = [] if totals is None else [self._row(row) for row in totals]
+        return self._build(user_profile, sections, bounds, rows)
+
+    async def aget_dashboard(self, user_id, sections=SECTIONS):
+        """
+        Async version of `get_dashboard`, using the async ORM API.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            sections (iterable): The names of the sections to build, from SECTIONS.
+
+        Returns:
+            dict: The payload of every requested section, keyed by section name.
+        """
+        user_profile = await UserProfile.objects.aget(user_id=user_id)
+        bounds = self._bounds()
+        totals = self._daily_totals(user_profile, sections, bounds)
+        rows = [] if totals is None else [self._row(row) async for row in totals]
+        return self._build(user_profile, sections, bounds, rows)
+
+    def _bounds(self):
+        # Month window, start of the week and the end of the week-to-date window
+        today = timezone.localdate()
+        month_start, next_month_start = month_bounds(today)
+        week_start, _ = week_bounds(today)
+        return (
+            month_start,
+            next_month_start,
+            week_start,
+            today + datetime.timedelta(days=1),
+        )
+
+    def _build(self, user_profile, sections, bounds, rows):
+        month_start, next_month_start, week_start, tomorrow = bounds
+        month_expenses = [
+            (category_name, total)
+            for day, type, category_name, total in rows
+            if type == TransactionType.EXPENSE and month_start <= day < next_month_start
+        ]
+
+        dashboard = {}
+        if "budget" in sections:
+            monthly_expenses = (
+                sum(total for _, total in month_expenses) if month_expenses else None
+            )
+            dashboard["budget"] = UserProfileService().build_budget(
+                user_profile, monthly_expenses
+            )
+        if "expenses_by_categories" in sections:
+            dashboard[
+                "expenses_by_categories"
+            ] = ExpensesByCategoriesService().build_expenses_by_categories(
+                month_expenses
+            )
+        if "transactions_by_week" in sections:
+            dashboard["transactions_by_week"] = TransactionsByWeekService().build_days(
+                (
+                    day.isoweekday(),
+                    total if type == TransactionType.INCOME else None,
+                    total if type == TransactionType.EXPENSE else None,
+                )
+                for day, type, category_name, total in rows
+                if week_start <= day < tomorrow
+            )
+        return dashboard
+
+    def _daily_totals(self, user_profile, sections, bounds):
+        month_start, next_month_start, week_start, tomorrow = bounds
+
+        # Only read the days the requested sections need
+        windows = []
+        if "budget" in sections or "expenses_by_categories" in sections:
+            windows.append((month_start, next_month_start))
+        if "transactions_by_week" in sections:
+            windows.append((week_start, tomorrow))
+        if not windows:
+            return None
+        start = min(window_start for window_start, _ in windows)
+        end = max(window_end for _, window_end in windows)
+
+        # One grouped query: at most (days x types x categories) rows
+        if settings.TRANSACTION_ROLLUPS_ENABLED:
+            return (
+                TransactionRollup.objects.filter(
+                    owner=user_profile, day__gte=start, day__lt=end
+                )
+                .values("day", "type", "category__name")
+                .annotate(value=Sum("total"), transactions=Sum("count"))
+                .filter(transactions__gt=0)
+                .order_by()
+            )
+        return (
+            Transaction.objects.filter(
+                owner=user_profile, date__gte=start, date__lt=end
+            )
+            .annotate(day=F("date"))
+            .values("day", "type", "category__name")
+            .annotate(value=Sum("amount"))
+            .order_by()
+        )
+
+    def _row(self, row):
+        return row["day"], row["type"], row["category__name"], row["value"]
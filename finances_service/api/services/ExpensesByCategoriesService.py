@@ -1,7 +1,8 @@
-from decimal import Decimal
+from django.conf import settings
+from django.db.models import Sum
 from django.utils import timezone
-from collections import defaultdict
-from ..models import Transaction, UserProfile, TransactionType
+from ..models import Transaction, TransactionRollup, UserProfile, TransactionType
+from ..utils import month_bounds
 
 
 class ExpensesByCategoriesService:
@@ -9,6 +10,9 @@ class ExpensesByCategoriesService:
     Service for handling operations related to retrieving user expenses categorized by categories.
     """
 
+    # Name shown for the bucket of expenses without a category.
+    UNCATEGORIZED = "Uncategorized"
+
     def get_expenses_by_categories(self, user_id):
         """
         Retrieves and aggregates expenses by categories for the user specified by user_id for the current month.
@@ -22,32 +26,94 @@ class ExpensesByCategoriesService:
         # Ensure the user profile exists
         user_profile = UserProfile.objects.get(user_id=user_id)
 
-        # Get today's date using the correct timezone method
-        today = timezone.now().date()
+        # Sum the user's expenses for the current month per category in a single query
+        totals = self._monthly_totals(user_profile)
+        return self.build_expenses_by_categories(
+            (row["category__name"], row["value"]) for row in totals
+        )
+
+    async def aget_expenses_by_categories(self, user_id):
+        """
+        Async version of `get_expenses_by_categories`, using the async ORM API.
+
+        Args:
+            user_id (str): Unique identifier of the user.
 
-        # Fetch user's expenses for the current month
-        expenses = Transaction.objects.filter(
-            owner=user_profile,
-            type=TransactionType.EXPENSE,
-            date__year=today.year,
-            date__month=today.month,
+        Returns:
+            list: A list of dictionaries with each dictionary containing details of expenses for a category.
+        """
+        user_profile = await UserProfile.objects.aget(user_id=user_id)
+        totals = self._monthly_totals(user_profile)
+        return self.build_expenses_by_categories(
+            [(row["category__name"], row["value"]) async for row in totals]
         )
 
-        # Group expenses by categories and sum their amounts
-        expenses_by_category = defaultdict(lambda: Decimal("0.00"))
-        for expense in expenses:
-            expenses_by_category[expense.category.name] += expense.amount
+    def _monthly_totals(self, user_profile):
+        # Get the current month's bounds in the project timezone
+        month_start, next_month_start = month_bounds(timezone.localdate())
+
+        if settings.TRANSACTION_ROLLUPS_ENABLED:
+            # Rollup rows left at zero by deletions are dropped by the count filter
+            return (
+                TransactionRollup.objects.filter(
+                    owner=user_profile,
+                    type=TransactionType.EXPENSE,
+                    day__gte=month_start,
+                    day__lt=next_month_start,
+                )
+                .values("category__name")
+                .annotate(value=Sum("total"), transactions=Sum("count"))
+                .filter(transactions__gt=0)
+                .order_by()
+            )
+        return (
+            Transaction.objects.filter(
+                owner=user_profile,
+                type=TransactionType.EXPENSE,
+                date__gte=month_start,
+                date__lt=next_month_start,
+            )
+            .values("category__name")
+            .annotate(value=Sum("amount"))
+            .order_by()
+        )
+
+    def build_expenses_by_categories(self, totals):
+        """
+        Builds the expenses-by-categories payload from per-category totals.
+
+        Args:
+            totals (iterable): (category name, total) pairs, with None as the name of
+                expenses without a category; a name may appear more than once.
+
+        Returns:
+            list: A list of dictionaries with each dictionary containing details of expenses for a category.
+        """
+        # Expenses whose category was deleted (SET_NULL) are kept under None, apart from
+        # a category that happens to be named like the uncategorised bucket
+        expenses_by_category = {}
+        for name, value in totals:
+            expenses_by_category[name] = expenses_by_category.get(name, 0) + value
+
+        # Sorting by name keeps the colour assigned to each category stable between calls,
+        # with the uncategorised bucket last so it doesn't shift the named categories.
+        ordered = sorted(
+            expenses_by_category.items(),
+            key=lambda item: (item[0] is None, item[0] or ""),
+        )
 
         # Generate color shades for each category (for UI representation, perhaps)
-        categories_count = len(expenses_by_category)
+        categories_count = len(ordered)
         color_shades = self.generate_purple_shades(categories_count)
 
         # Prepare the response data
         response = [
-            {"name": category, "value": total, "color": color}
-            for (category, total), color in zip(
-                expenses_by_category.items(), color_shades
-            )
+            {
+                "name": self.UNCATEGORIZED if category is None else category,
+                "value": total,
+                "color": color,
+            }
+            for (category, total), color in zip(ordered, color_shades)
         ]
 
         return response
@@ -0,0 +1,230 @@
+# Django imports
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum
+
+# Application-specific imports
+from ..models import Transaction, TransactionRollup, UserProfile
+
+
+class RollupService:
+    """
+    Service class for maintaining the per-user daily TransactionRollup totals.
+    """
+
+    # Number of rollup rows written per INSERT when rebuilding.
+    BATCH_SIZE = 1000
+
+    def record(self, transaction, sign=1):
+        """
+        Adds a single transaction to (or, with sign=-1, removes it from) the rollups.
+
+        Must run inside the same database transaction as the write it mirrors.
+
+        Args:
+            transaction (Transaction): The transaction that was created or deleted.
+            sign (int): 1 when the transaction was created, -1 when it was deleted.
+        """
+        self.apply(
+            transaction.owner_id,
+            {
+                (transaction.date, transaction.category_id, transaction.type): (
+                    sign * transaction.amount,
+                    sign,
+                )
+            },
+        )
+
+    def apply(self, owner_id, deltas):
+        """
+        Applies aggregated deltas to a user's rollups using F() expressions.
+
+        Must run inside the same database transaction as the write it mirrors.
+
+        Args:
+            owner_id (str): The unique identifier of the user.
+            deltas (dict): Maps (day, category_id, type) to a (total, count) delta.
+        """
+        for (day, category_id, type), (total, count) in deltas.items():
+            rows = TransactionRollup.objects.filter(
+                owner_id=owner_id, day=day, category_id=category_id, type=type
+            )
+            if category_id is None:
+                # Deleting a category (SET_NULL) can leave several uncategorised rows for the
+                # same day and type, so only adjust one of them; readers sum them anyway.
+                rows = TransactionRollup.objects.filter(pk__in=rows.values("pk")[:1])
+
+            changes = {"total": F("total") + total, "count": F("count") + count}
+            if rows.update(**changes):
+                continue
+            try:
+                # The savepoint keeps the outer transaction usable if a concurrent writer
+                # created the row first.
+                with db_transaction.atomic():
+                    TransactionRollup.objects.create(
+                        owner_id=owner_id,
+                        day=day,
+                        category_id=category_id,
+                        type=type,
+                        total=total,
+                        count=count,
+                    )
+            except IntegrityError:
+                rows.update(**changes)
+
+    def apply_bulk(self, owner_id, deltas):
+        """
+        Applies many aggregated deltas to a user's rollups with a constant number of queries.
+
+        The affected rollup rows are locked and rewritten with bulk_update/bulk_create. A
+        concurrent writer creating one of the missing rows makes this raise IntegrityError,
+        which rolls back the surrounding write as a whole.
+
+        Must run inside the same database transaction as the write it mirrors.
+
+        Args:
+            owner_id (str): The unique identifier of the user.
+            deltas (dict): Maps (day, category_id, type) to a (total, count) delta.
+        """
+        if not deltas:
+            return
+        days = [day for day, _, _ in deltas]
+        existing = {}
+        for rollup in (
+            TransactionRollup.objects.select_for_update()
+            .filter(owner_id=owner_id, day__gte=min(days), day__lte=max(days))
+            .order_by("pk")
+        ):
+            # Keep the first row of any duplicated uncategorised key, like `apply` does.
+            existing.setdefault((rollup.day, rollup.category_id, rollup.type), rollup)
+
+        to_update = []
+        to_create = []
+        for (day, category_id, type), (total, count) in deltas.items():
+            rollup = existing.get((day, category_id, type))
+            if rollup is None:
+                to_create.append(
+                    TransactionRollup(
+                        owner_id=owner_id,
+                        day=day,
+                        category_id=category_id,
+                        type=type,
+                        total=total,
+                        count=count,
+                    )
+                )
+            else:
+                rollup.total += total
+                rollup.count += count
+                to_update.append(rollup)
+
+        TransactionRollup.objects.bulk_update(
+            to_update, ["total", "count"], batch_size=self.BATCH_SIZE
+        )
+        TransactionRollup.objects.bulk_create(to_create, batch_size=self.BATCH_SIZE)
+
+    def expected_totals(self, user_id=None):
+        """
+        Aggregates raw transactions into the shape of the rollup table.
+
+        Args:
+            user_id (str, optional): Restricts the aggregation to a single user.
+
+        Returns:
+            generator: Dictionaries with owner_id, day, category_id, type, total and count.
+        """
+        return self._totals([user_id] if user_id else None)
+
+    def _totals(self, user_ids):
+        transactions = Transaction.objects.all()
+        if user_ids is not None:
+            transactions = transactions.filter(owner_id__in=user_ids)
+        totals = (
+            transactions.values("owner_id", "date", "category_id", "type")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        for row in totals.iterator():
+            row["day"] = row.pop("date")
+            yield row
+
+    def rebuild(self, user_id=None):
+        """
+        Recomputes the rollups from scratch from the transactions table.
+
+        Args:
+            user_id (str, optional): Restricts the rebuild to a single user.
+
+        Returns:
+            int: The number of rollup rows written.
+        """
+        return self.rebuild_users([user_id] if user_id else None)
+
+    def rebuild_users(self, user_ids=None):
+        """
+        Recomputes the rollups of several users from the transactions table, with one
+        aggregate query for all of them.
+
+        Args:
+            user_ids (list, optional): The users to rebuild; every user when None.
+
+        Returns:
+            int: The number of rollup rows written.
+        """
+        with db_transaction.atomic():
+            rollups = TransactionRollup.objects.all()
+            if user_ids is not None:
+                rollups = rollups.filter(owner_id__in=user_ids)
+            rollups.delete()
+
+            created = 0
+            batch = []
+            for row in self._totals(user_ids):
+                batch.append(TransactionRollup(**row))
+                if len(batch) >= self.BATCH_SIZE:
+                    created += len(TransactionRollup.objects.bulk_create(batch))
+                    batch = []
+            if batch:
+                created += len(TransactionRollup.objects.bulk_create(batch))
+            return created
+
+    def find_drift(self, user_id=None):
+        """
+        Compares the rollups with the transactions they summarise, one user at a time.
+
+        Args:
+            user_id (str, optional): Restricts the check to a single user.
+
+        Returns:
+            list: Tuples of (user_id, (day, category_id, type), expected, actual) for every
+            key whose (total, count) differs; a missing side is reported as None.
+        """
+        owners = UserProfile.objects.order_by("user_id").values_list(
+            "user_id", flat=True
+        )
+        if user_id:
+            owners = owners.filter(user_id=user_id)
+
+        drift = []
+        for owner_id in owners.iterator():
+            expected = {
+                (row["day"], row["category_id"], row["type"]): (
+                    row["total"],
+                    row["count"],
+                )
+                for row in self.expected_totals(owner_id)
+            }
+            actual = {
+                (row["day"], row["category_id"], row["type"]): (
+                    row["sum_total"],
+                    row["sum_count"],
+                )
+                for row in TransactionRollup.objects.filter(owner_id=owner_id)
+                .values("day", "category_id", "type")
+                .annotate(sum_total=Sum("total"), sum_count=Sum("count"))
+                .filter(sum_count__gt=0)
+                .order_by()
+            }
+            for key in expected.keys() | actual.keys():
+                if expected.get(key) != actual.get(key):
+                    drift.append((owner_id, key, expected.get(key), actual.get(key)))
+        return drift
@@ -0,0 +1,250 @@
+# Standard library imports
+import codecs
+import csv
+import datetime
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+# Django imports
+from django.conf import settings
+from django.db import transaction as db_transaction
+from rest_framework.exceptions import ValidationError
+
+# Application-specific imports
+from .. import cache, conditional
+from ..models import Category, Transaction, TransactionType, UserProfile
+from .RollupService import RollupService
+
+
+class TransactionImportService:
+    """
+    Service class for importing many transactions at once from CSV or NDJSON uploads.
+    """
+
+    FORMATS = ("csv", "ndjson")
+    TYPES = frozenset(TransactionType.values)
+
+    # Largest absolute amount that fits Transaction.amount (max_digits=10, decimal_places=2).
+    MAX_AMOUNT = Decimal("99999999.99")
+    TWO_PLACES = Decimal("0.01")
+
+    def import_transactions(self, user_id, lines, format):
+        """
+        Imports transactions for a user from an iterable of raw upload lines.
+
+        Rows are parsed and validated one at a time and written with bulk_create in batches
+        of TRANSACTION_IMPORT_BATCH_SIZE inside a single database transaction. Rows that were
+        already imported for this user (same content and position among identical rows) are
+        skipped, so uploading the same file twice does not create duplicates. The errors of
+        the first TRANSACTION_IMPORT_MAX_ERRORS invalid rows are reported; `invalid` counts
+        all of them.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            lines (iterable): The upload as an iterable of byte lines.
+            format (str): Either "csv" or "ndjson".
+
+        Returns:
+            dict: The number of created, duplicate and invalid rows and the errors of
+            invalid rows.
+
+        Raises:
+            ValidationError: If the format is unknown, the upload has too many rows, is
+                not UTF-8 or is not well-formed CSV. Nothing is imported then.
+        """
+        if format not in self.FORMATS:
+            raise ValidationError(f'Unsupported import format "{format}".')
+
+        category_ids = set(Category.objects.values_list("id", flat=True))
+        batch_size = settings.TRANSACTION_IMPORT_BATCH_SIZE
+
+        report = {"created": 0, "duplicates": 0, "invalid": 0, "errors": []}
+        rollup_deltas = {}
+        # Occurrences of each row content so far, so identical rows within a file stay
+        # distinct while their hashes are still reproducible on a re-upload.
+        occurrences = {}
+
+        with db_transaction.atomic():
+            # Lock the user's profile row first, like the other transaction writes do
+            UserProfile.objects.select_for_update().get(user_id=user_id)
+            batch = []
+            for number, row in enumerate(self._parse(lines, format), start=1):
+                if number > settings.TRANSACTION_IMPORT_MAX_ROWS:
+                    raise ValidationError(
+                        f"Imports are limited to {settings.TRANSACTION_IMPORT_MAX_ROWS} rows."
+                    )
+                data, errors = self.validate_row(row, category_ids)
+                if errors:
+                    report["invalid"] += 1
+                    if len(report["errors"]) < settings.TRANSACTION_IMPORT_MAX_ERRORS:
+                        report["errors"].append({"row": number, "errors": errors})
+                    continue
+
+                content_hash = self._content_hash(data)
+                occurrences[content_hash] = occurrences.get(content_hash, 0) + 1
+                data["import_hash"] = hashlib.sha256(
+                    f"{content_hash}:{occurrences[content_hash]}".encode()
+                ).hexdigest()
+                batch.append(Transaction(owner_id=user_id, **data))
+
+                if len(batch) >= batch_size:
+                    self._write_batch(user_id, batch, report, rollup_deltas)
+                    batch = []
+            if batch:
+                self._write_batch(user_id, batch, report, rollup_deltas)
+
+            RollupService().apply_bulk(user_id, rollup_deltas)
+            if report["created"]:
+                conditional.mark_user_changed(user_id)
+                cache.invalidate_user(user_id)
+
+        return report
+
+    def _write_batch(self, user_id, batch, report, rollup_deltas):
+        # Skip rows whose hash is already stored for this user (a previous upload). The
+        # hash covers the date, so the date bounds only let a partitioned table skip
+        # the months outside the batch.
+        dates = [transaction.date for transaction in batch]
+        already_imported = set(
+            Transaction.objects.filter(
+                owner_id=user_id,
+                date__range=(min(dates), max(dates)),
+                import_hash__in=[transaction.import_hash for transaction in batch],
+            ).values_list("import_hash", flat=True)
+        )
+        new_transactions = [
+            transaction
+            for transaction in batch
+            if transaction.import_hash not in already_imported
+        ]
+        Transaction.objects.bulk_create(new_transactions)
+
+        report["created"] += len(new_transactions)
+        report["duplicates"] += len(batch) - len(new_transactions)
+        for transaction in new_transactions:
+            key = (transaction.date, transaction.category_id, transaction.type)
+            total, count = rollup_deltas.get(key, (Decimal("0.00"), 0))
+            rollup_deltas[key] = (total + transaction.amount, count + 1)
+
+    def _parse(self, lines, format):
+        # Decode incrementally so the upload is never held in memory as a whole
+        text_lines = codecs.iterdecode(lines, "utf-8-sig")
+        if format == "csv":
+            rows = csv.DictReader(text_lines)
+        else:
+            rows = self._parse_json_lines(text_lines)
+
+        # Undecodable bytes and broken CSV quoting make the rest of the upload
+        # unreadable, so they fail the whole import at the row they are found in
+        number = 0
+        try:
+            for number, row in enumerate(rows, start=1):
+                yield row
+        except UnicodeDecodeError:
+            raise ValidationError(f"Row {number + 1}: the upload is not UTF-8 text.")
+        except csv.Error as e:
+            raise ValidationError(
+                f"Row {number + 1}: the upload is not valid CSV ({e})."
+            )
+
+    def _parse_json_lines(self, text_lines):
+        for line in text_lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else {"__invalid__": True}
+
+    def _content_hash(self, data):
+        values = [
+            data["name"],
+            data["date"].isoformat(),
+            str(data["amount"]),
+            data["type"],
+            str(data["category_id"]),
+            data["from_account"],
+            data["note"] or "",
+        ]
+        return hashlib.sha256("\x1f".join(values).encode()).hexdigest()
+
+    def validate_row(self, row, category_ids):
+        """
+        Validates and converts one raw row without going through the DRF serializer.
+
+        Args:
+            row (dict): The raw field values of the row.
+            category_ids (set): The ids of all existing categories.
+
+        Returns:
+            tuple: The cleaned field values and a dictionary of errors (empty when valid).
+        """
+        if row.get("__invalid__"):
+            return None, {"non_field_errors": ["Row is not a valid JSON object."]}
+
+        data = {}
+        errors = {}
+
+        def text(field, required=True, max_length=255):
+            value = row.get(field)
+            value = "" if value is None else str(value).strip()
+            if not value:
+                if required:
+                    errors[field] = ["This field is required."]
+                return None
+            if max_length and len(value) > max_length:
+                errors[field] = [
+                    f"Ensure this field has no more than {max_length} characters."
+                ]
+            return value
+
+        data["name"] = text("name")
+        data["from_account"] = text("from_account")
+        data["note"] = text("note", required=False, max_length=None)
+
+        raw_date = text("date")
+        if raw_date is not None:
+            try:
+                data["date"] = datetime.date.fromisoformat(raw_date)
+            except ValueError:
+                errors["date"] = ["Date has wrong format. Use YYYY-MM-DD."]
+
+        raw_amount = text("amount")
+        if raw_amount is not None:
+            try:
+                amount = Decimal(raw_amount)
+            except InvalidOperation:
+                amount = None
+            if amount is None or not amount.is_finite():
+                errors["amount"] = ["A valid number is required."]
+            elif amount.as_tuple().exponent < -2:
+                # Rejected like the API serializer does, rather than rounded
+                errors["amount"] = [
+                    "Ensure that there are no more than 2 decimal places."
+                ]
+            elif abs(amount) > self.MAX_AMOUNT:
+                errors["amount"] = [
+                    "Ensure that there are no more than 10 digits in total."
+                ]
+            else:
+                data["amount"] = amount.quantize(self.TWO_PLACES)
+
+        data["type"] = text("type", max_length=None)
+        if data["type"] is not None and data["type"] not in self.TYPES:
+            errors["type"] = [f'"{data["type"]}" is not a valid choice.']
+
+        raw_category = text("category_id", max_length=None)
+        if raw_category is not None:
+            try:
+                data["category_id"] = int(raw_category)
+            except ValueError:
+                errors["category_id"] = ["Incorrect type. Expected pk value."]
+            else:
+                if data["category_id"] not in category_ids:
+                    errors["category_id"] = [
+                        f'Invalid pk "{raw_category}" - object does not exist.'
+                    ]
+
+        return data, errors
@@ -1,7 +1,20 @@
+# Standard library imports
+import csv
+import io
+import json
+
 # Application-specific imports
-from ..models import Transaction, UserProfile
-from ..serializers import TransactionSerializer
-from django.db.models import Q
+from .. import cache, conditional
+from ..models import Category, Transaction, UserProfile
+from ..pagination import KeysetCursor
+from ..search import search_filter, search_rank
+from ..serializers import TransactionCreateSerializer, TransactionListSerializer
+from .CategoriesService import CategoriesService
+from .RollupService import RollupService
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import Count, Q, Sum
+from rest_framework.exceptions import ValidationError
 
 
 class TransactionService:
@@ -9,13 +22,19 @@ class TransactionService:
     Service class for handling Transaction-related operations.
     """
 
+    # The fields returned by deleting a transaction: what its rollup needs
+    _DELETE_RETURNING_FIELDS = ("id", "owner", "date", "amount", "type", "category")
+
     def get_user_transactions(self, user_id, name=None, start_date=None, end_date=None):
         """
         Retrieves transactions for a specific user, optionally filtered by name and date range.
 
+        The name filter searches the name, note and account of the transactions using the
+        search indexes of the database, and orders the matches by relevance, then date.
+
         Args:
             user_id (str): The unique identifier of the user.
-            name (str, optional): A name to filter the transactions by.
+            name (str, optional): A text to search the transactions for.
             start_date (date, optional): The start date for the transactions filter.
             end_date (date, optional): The end date for the transactions filter.
 
@@ -24,43 +43,594 @@ class TransactionService:
         """
         transactions_query = Q(owner__user_id=user_id)
 
-        if name:
-            transactions_query &= Q(name__icontains=name)
         if start_date and end_date:
             transactions_query &= Q(date__range=[start_date, end_date])
-        return Transaction.objects.filter(transactions_query).order_by("-date")
+        if not name:
+            # The id tie-breaker keeps the order stable between requests, which keyset
+            # pages rely on.
+            return Transaction.objects.filter(transactions_query).order_by(
+                "-date", "-id"
+            )
+
+        transactions_query &= search_filter(name)
+        return (
+            Transaction.objects.filter(transactions_query)
+            .annotate(rank=search_rank(name))
+            .order_by("-rank", "-date", "-id")
+        )
+
+    def get_user_transactions_page(
+        self, user_id, limit, cursor=None, name=None, start_date=None, end_date=None
+    ):
+        """
+        Retrieves a single page of a user's transactions using keyset pagination.
+
+        The rows are read with TransactionListSerializer's projection, for serializing
+        with it.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            limit (int): The maximum number of transactions to return.
+            cursor (str, optional): The opaque cursor returned with the previous page.
+            name (str, optional): A text to search the transactions for.
+            start_date (date, optional): The start date for the transactions filter.
+            end_date (date, optional): The end date for the transactions filter.
+
+        Returns:
+            tuple: A list of rows for TransactionListSerializer and the cursor of the
+            next page, or None when this is the last page.
+        """
+        transactions = self._page_query(
+            user_id, limit, cursor, name, start_date, end_date
+        )
+        return self._paginate(list(transactions), limit)
+
+    async def aget_user_transactions(
+        self, user_id, name=None, start_date=None, end_date=None
+    ):
+        """
+        Async version of `get_user_transactions`, using the async ORM API.
+
+        The rows are read with TransactionListSerializer's projection, which fetches the
+        category names in the same query, since serializing must not hit the database
+        from async code.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            name (str, optional): A text to search the transactions for.
+            start_date (date, optional): The start date for the transactions filter.
+            end_date (date, optional): The end date for the transactions filter.
+
+        Returns:
+            list: The rows of the matching transactions, for TransactionListSerializer.
+        """
+        transactions = TransactionListSerializer.project(
+            self.get_user_transactions(user_id, name, start_date, end_date)
+        )
+        return [row async for row in transactions]
+
+    async def aget_user_transactions_page(
+        self, user_id, limit, cursor=None, name=None, start_date=None, end_date=None
+    ):
+        """
+        Async version of `get_user_transactions_page`, using the async ORM API.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            limit (int): The maximum number of transactions to return.
+            cursor (str, optional): The opaque cursor returned with the previous page.
+            name (str, optional): A text to search the transactions for.
+            start_date (date, optional): The start date for the transactions filter.
+            end_date (date, optional): The end date for the transactions filter.
+
+        Returns:
+            tuple: A list of rows for TransactionListSerializer and the cursor of the
+            next page, or None when this is the last page.
+        """
+        transactions = self._page_query(
+            user_id, limit, cursor, name, start_date, end_date
+        )
+        return self._paginate([row async for row in transactions], limit)
+
+    def _page_query(self, user_id, limit, cursor, name, start_date, end_date):
+        transactions = self.get_user_transactions(user_id, name, start_date, end_date)
+        if cursor:
+            keyset = KeysetCursor.decode(cursor)
+            # A cursor only continues the listing it was issued for (search or not)
+            if (keyset.rank is None) != (not name):
+                raise ValidationError("Invalid cursor")
+            transactions = transactions.filter(keyset.as_filter())
+
+        # The search rank is part of the keyset of search results
+        transactions = TransactionListSerializer.project(
+            transactions, *(["rank"] if name else [])
+        )
+        # Fetch one extra row to find out whether another page follows without a COUNT query.
+        return transactions[: limit + 1]
+
+    def _paginate(self, page, limit):
+        if len(page) <= limit:
+            return page, None
+
+        page = page[:limit]
+        last = dict(zip(TransactionListSerializer.COLUMNS + ["rank"], page[-1]))
+        return (
+            page,
+            KeysetCursor(last["date"], last["id"], last.get("rank")).encode(),
+        )
+
+    # Columns of an export, matching the fields of the transactions list.
+    EXPORT_COLUMNS = [
+        "id",
+        "name",
+        "date",
+        "amount",
+        "type",
+        "category_name",
+        "from_account",
+        "note",
+    ]
+    # The fields read for EXPORT_COLUMNS
+    EXPORT_FIELDS = [
+        "id",
+        "name",
+        "date",
+        "amount",
+        "type",
+        "category__name",
+        "from_account",
+        "note",
+    ]
+
+    def export_user_transactions(
+        self,
+        user_id,
+        file_format,
+        name=None,
+        start_date=None,
+        end_date=None,
+        asynchronous=False,
+    ):
+        """
+        Streams a user's transactions as CSV or NDJSON text, newest first.
+
+        Rows are read with a chunked iterator (a server-side cursor on PostgreSQL) and
+        yielded as one string per chunk, so memory use stays flat for any number of rows.
+        Under ASGI the export is an async iterator reading the rows with aiterator(),
+        which the server streams as it is produced instead of collecting it in a list.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            file_format (str): Either "csv" or "ndjson".
+            name (str, optional): A name to filter the transactions by.
+            start_date (date, optional): The start date for the transactions filter.
+            end_date (date, optional): The end date for the transactions filter.
+            asynchronous (bool, optional): Whether to return an async iterator.
+
+        Returns:
+            iterator: Consecutive pieces of the export (str), as an async iterator if
+            `asynchronous` is set.
+
+        Raises:
+            UserProfile.DoesNotExist: If the user does not exist.
+        """
+        if not UserProfile.objects.filter(user_id=user_id).exists():
+            raise UserProfile.DoesNotExist(f"UserProfile {user_id} does not exist")
+
+        transactions = self.get_user_transactions(user_id, name, start_date, end_date)
+        if asynchronous:
+            # values_list() can't be read with aiterator(), which runs its query in the
+            # event loop, so the async export reads dictionaries in the same order
+            return self._aexport(transactions.values(*self.EXPORT_FIELDS), file_format)
+        return self._export(transactions.values_list(*self.EXPORT_FIELDS), file_format)
+
+    def _export(self, rows, file_format):
+        chunk_size = settings.TRANSACTION_EXPORT_CHUNK_SIZE
+        buffer, write_row = self._export_writer(file_format)
+        for count, row in enumerate(rows.iterator(chunk_size=chunk_size), start=1):
+            write_row(row)
+            if count % chunk_size == 0:
+                yield self._drain(buffer)
+        yield buffer.getvalue()
+
+    async def _aexport(self, rows, file_format):
+        chunk_size = settings.TRANSACTION_EXPORT_CHUNK_SIZE
+        buffer, write_row = self._export_writer(file_format)
+        count = 0
+        async for row in rows.aiterator(chunk_size=chunk_size):
+            write_row(tuple(row.values()))
+            count += 1
+            if count % chunk_size == 0:
+                yield self._drain(buffer)
+        yield buffer.getvalue()
+
+    def _export_writer(self, file_format):
+        # A buffer holding the export text of the current chunk, and the function
+        # writing one row to it
+        buffer = io.StringIO()
+        if file_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(self.EXPORT_COLUMNS)
+            return buffer, writer.writerow
+
+        def write_row(row):
+            record = dict(zip(self.EXPORT_COLUMNS, row))
+            record["date"] = record["date"].isoformat()
+            record["amount"] = str(record["amount"])
+            buffer.write(json.dumps(record) + "\n")
+
+        return buffer, write_row
+
+    def _drain(self, buffer):
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
 
     def delete_transaction(self, transaction_id, user_id):
         """
         Deletes a transaction for a specific user if the user is the owner of the transaction.
 
+        The row is deleted with a single DELETE ... RETURNING, which hands back the values
+        the rollups need, on databases that support it.
+
         Args:
             transaction_id (int): The unique identifier of the transaction to be deleted.
             user_id (str): The unique identifier of the user attempting to delete the transaction.
 
+        Raises:
+            Transaction.DoesNotExist: If the user has no transaction with this ID.
+        """
+        with db_transaction.atomic():
+            # Bumped first: the UPDATE locks the user's profile row, which orders this
+            # write against the bulk operations on the same user
+            conditional.mark_user_changed(user_id)
+            if self._can_return_from_delete():
+                # Nothing references transactions and they have no delete signals, so
+                # bypassing the ORM's delete collector skips nothing.
+                transaction = self._delete_returning(transaction_id, user_id)
+                if transaction is None:
+                    raise Transaction.DoesNotExist(
+                        "Transaction matching query does not exist."
+                    )
+            else:
+                transaction = Transaction.objects.get(
+                    id=transaction_id, owner__user_id=user_id
+                )
+                transaction.delete()
+            RollupService().record(transaction, sign=-1)
+            cache.invalidate_user(user_id)
+
+    def _can_return_from_delete(self):
+        # DELETE ... RETURNING: PostgreSQL, SQLite 3.35+ and MariaDB, but not MySQL
+        if connection.vendor == "postgresql":
+            return True
+        if connection.vendor == "sqlite":
+            return connection.Database.sqlite_version_info >= (3, 35)
+        if connection.vendor == "mysql":
+            return connection.mysql_is_mariadb
+        return False
+
+    def _delete_returning(self, transaction_id, user_id):
+        # Deletes the transaction and builds it from the returned row, or returns None
+        meta = Transaction._meta
+        fields = [meta.get_field(name) for name in self._DELETE_RETURNING_FIELDS]
+        quote_name = connection.ops.quote_name
+        sql = "DELETE FROM {} WHERE {} = %s AND {} = %s RETURNING {}".format(
+            quote_name(meta.db_table),
+            quote_name(meta.pk.column),
+            quote_name(meta.get_field("owner").column),
+            ", ".join(quote_name(field.column) for field in fields),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [transaction_id, user_id])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+
+        # Convert the values like a query would, e.g. SQLite's dates and decimals
+        values = []
+        for field, value in zip(fields, row):
+            column = field.get_col(meta.db_table)
+            converters = connection.ops.get_db_converters(column)
+            converters += column.get_db_converters(connection)
+            for converter in converters:
+                value = converter(value, column, connection)
+            values.append(value)
+        return Transaction.from_db(
+            connection.alias, [field.attname for field in fields], values
+        )
+
+    def _check_categories_now(self, transactions):
+        # Inside a caller's transaction the deferred foreign keys are only checked at
+        # its commit, past the IntegrityError handling of the writes. Check them before
+        # leaving the write's savepoint instead.
+        if connection.vendor == "postgresql":
+            # Runs the pending checks, which lock the categories until commit
+            connection.check_constraints()
+            return
+        category_ids = {transaction.category_id for transaction in transactions}
+        category_ids.discard(None)
+        if Category.objects.filter(pk__in=category_ids).count() != len(category_ids):
+            raise IntegrityError("A transaction references a missing category.")
+
+    def delete_transactions(self, user_id, filters):
+        """
+        Deletes every transaction of a user matching the filters.
+
+        The rows are deleted with one DELETE whose WHERE clause includes the owner, and the
+        rollups are updated from one aggregate over the same rows, so the number of
+        queries doesn't depend on the number of rows.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            filters (dict): Data validated by TransactionFilterSerializer.
+
+        Returns:
+            int: The number of deleted transactions.
+
+        Raises:
+            UserProfile.DoesNotExist: If the user does not exist.
+        """
+        with db_transaction.atomic():
+            self._lock_user(user_id)
+            transactions = self._filter_transactions(user_id, filters)
+            rollup_deltas = self._rollup_deltas(transactions, sign=-1)
+            if not rollup_deltas:
+                # Nothing matched; keep the change marker (and the clients' ETags)
+                db_transaction.set_rollback(True)
+                return 0
+
+            # Nothing references transactions and they have no delete signals, so this is
+            # a single DELETE statement
+            deleted, _ = transactions.delete()
+            RollupService().apply_bulk(user_id, rollup_deltas)
+            cache.invalidate_user(user_id)
+        return deleted
+
+    def recategorize_transactions(self, user_id, filters, category):
+        """
+        Moves every transaction of a user matching the filters to another category.
+
+        The rows are updated with one UPDATE whose WHERE clause includes the owner, and the
+        rollups are moved from one aggregate over the same rows. Transactions already in
+        the category are left untouched and not counted.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            filters (dict): Data validated by TransactionFilterSerializer.
+            category (Category): The category to move the transactions to.
+
+        Returns:
+            int: The number of updated transactions.
+
+        Raises:
+            UserProfile.DoesNotExist: If the user does not exist.
         """
-        transaction = Transaction.objects.get(id=transaction_id, owner__user_id=user_id)
-        transaction.delete()
+        with db_transaction.atomic():
+            self._lock_user(user_id)
+            transactions = self._filter_transactions(user_id, filters).exclude(
+                category_id=category.pk
+            )
+            rollup_deltas = self._rollup_deltas(transactions, sign=-1)
+            if not rollup_deltas:
+                db_transaction.set_rollback(True)
+                return 0
+
+            # The totals leaving each old category arrive in the new one
+            for (day, _, type), (total, count) in list(rollup_deltas.items()):
+                key = (day, category.pk, type)
+                new_total, new_count = rollup_deltas.get(key, (0, 0))
+                rollup_deltas[key] = (new_total - total, new_count - count)
+
+            updated = transactions.update(category_id=category.pk)
+            RollupService().apply_bulk(user_id, rollup_deltas)
+            cache.invalidate_user(user_id)
+        return updated
+
+    def _lock_user(self, user_id):
+        # The marker UPDATE locks the user's profile row until commit. The transaction
+        # writes of the API all take it before touching rows, so no other write for the
+        # user can commit between the aggregate and the DELETE/UPDATE of a bulk operation.
+        if not conditional.mark_user_changed(user_id):
+            raise UserProfile.DoesNotExist("UserProfile matching query does not exist.")
+
+    def _filter_transactions(self, user_id, filters):
+        transactions = Transaction.objects.filter(owner_id=user_id)
+        if "ids" in filters:
+            transactions = transactions.filter(id__in=filters["ids"])
+        if "start_date" in filters:
+            transactions = transactions.filter(date__gte=filters["start_date"])
+        if "end_date" in filters:
+            transactions = transactions.filter(date__lte=filters["end_date"])
+        if "category_id" in filters:
+            # None selects the uncategorised transactions (IS NULL)
+            transactions = transactions.filter(category_id=filters["category_id"])
+        if filters.get("name"):
+            # Same matching as the name search of the transactions list
+            transactions = transactions.filter(search_filter(filters["name"]))
+        return transactions
+
+    def _rollup_deltas(self, transactions, sign):
+        totals = (
+            transactions.values("date", "category_id", "type")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        return {
+            (row["date"], row["category_id"], row["type"]): (
+                sign * row["total"],
+                sign * row["count"],
+            )
+            for row in totals
+        }
 
     def add_transaction(self, user_id, transaction_data):
         """
         Adds a new transaction for a specific user.
 
+        Valid data is written with three statements in one database transaction: the UPDATE
+        bumping the user's change marker, which also checks that the user exists, the
+        INSERT of the transaction (returning its ID) and the UPDATE of its rollup. The
+        category is checked against the cached category names, which also provide the
+        category name of the response. Inside a caller's transaction one more statement
+        checks that the category still exists, which the commit does otherwise.
+
         Args:
             user_id (str): The unique identifier of the user.
             transaction_data (dict): A dictionary containing data of the transaction.
 
         Returns:
-            tuple: A tuple containing the Transaction instance (or None if validation fails)
-            and None or a dictionary of validation errors.
+            Transaction: The created transaction.
+
+        Raises:
+            UserProfile.DoesNotExist: If the user does not exist.
+            ValidationError: If the transaction data is invalid.
+        """
+        serializer = TransactionCreateSerializer(
+            data=transaction_data,
+            context={"category_names": CategoriesService().get_category_names()},
+        )
+        if not serializer.is_valid():
+            # A missing user takes precedence over invalid data
+            UserProfile.objects.get(user_id=user_id)
+            raise ValidationError(serializer.errors)
+
+        nested = connection.in_atomic_block
+        try:
+            with db_transaction.atomic():
+                if not conditional.mark_user_changed(user_id):
+                    raise UserProfile.DoesNotExist(
+                        "UserProfile matching query does not exist."
+                    )
+                transaction = serializer.save(owner_id=user_id)
+                if nested:
+                    self._check_categories_now([transaction])
+                # Keep the rollups in step with the insert in the same database transaction
+                RollupService().record(transaction)
+                cache.invalidate_user(user_id)
+        except IntegrityError:
+            # The foreign keys are checked at commit (or by `_check_categories_now`); a
+            # category deleted since the names were cached ends up here
+            category_field = serializer.fields["category_id"]
+            raise ValidationError(
+                {
+                    "category_id": [
+                        category_field.error_messages["does_not_exist"].format(
+                            pk_value=transaction_data.get("category_id")
+                        )
+                    ]
+                }
+            )
+        return transaction
+
+    def add_transactions(self, user_id, transactions_data, atomic=True):
+        """
+        Adds many transactions for a specific user in one database transaction.
+
+        The rows are validated in a single pass with one TransactionCreateSerializer, like
+        `TransactionCreateSerializer(many=True)` does, but keeping the errors of each row
+        apart so best-effort batches can write the valid ones. The valid rows are written
+        with one multi-row INSERT (returning their IDs), one bump of the user's change
+        marker and one bulk update of the rollups, whatever the size of the batch.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            transactions_data (list): The data of each transaction, as for `add_transaction`.
+            atomic (bool): Whether one invalid row rejects the whole batch (True) or is
+                skipped while the other rows are written (False).
+
+        Returns:
+            tuple: The created Transaction instances, in request order, and the errors of
+            the invalid rows as a list of {"index": int, "errors": dict}. In atomic mode
+            nothing is created when there are errors.
+
+        Raises:
+            UserProfile.DoesNotExist: If the user does not exist.
+            ValidationError: If the batch is not a list or is too large.
         """
-        UserProfile.objects.get(user_id=user_id)
-        transaction_data["owner_id"] = (
-            user_id  # Correctly assign the user ID to the owner_id field
+        if not isinstance(transactions_data, list):
+            raise ValidationError("Expected a list of transactions.")
+        if len(transactions_data) > settings.TRANSACTION_BATCH_MAX_SIZE:
+            raise ValidationError(
+                f"Batches are limited to {settings.TRANSACTION_BATCH_MAX_SIZE} transactions."
+            )
+
+        serializer = TransactionCreateSerializer(
+            context={"category_names": CategoriesService().get_category_names()}
         )
+        valid = []
+        errors = []
+        for index, transaction_data in enumerate(transactions_data):
+            try:
+                data = serializer.run_validation(transaction_data)
+            except ValidationError as e:
+                errors.append({"index": index, "errors": e.detail})
+                continue
+            valid.append((index, Transaction(owner_id=user_id, **data)))
+
+        while True:
+            if not valid or (errors and atomic):
+                # A missing user takes precedence over invalid data
+                UserProfile.objects.get(user_id=user_id)
+                return [], errors
+
+            transactions = [transaction for _, transaction in valid]
+            try:
+                self._insert_transactions(user_id, transactions)
+                return transactions, errors
+            except IntegrityError:
+                # The foreign keys are checked at commit (or by `_check_categories_now`);
+                # categories deleted since the names were cached fail the whole INSERT. Report the rows using them and,
+                # in best-effort mode, write the others.
+                category_ids = {transaction.category_id for transaction in transactions}
+                gone = category_ids - set(
+                    Category.objects.filter(pk__in=category_ids).values_list(
+                        "pk", flat=True
+                    )
+                )
+                if not gone:
+                    raise
+                message = serializer.fields["category_id"].error_messages[
+                    "does_not_exist"
+                ]
+                for index, transaction in valid:
+                    if transaction.category_id in gone:
+                        errors.append(
+                            {
+                                "index": index,
+                                "errors": {
+                                    "category_id": [
+                                        message.format(pk_value=transaction.category_id)
+                                    ]
+                                },
+                            }
+                        )
+                errors.sort(key=lambda error: error["index"])
+                valid = [
+                    (index, transaction)
+                    for index, transaction in valid
+                    if transaction.category_id not in gone
+                ]
+                for _, transaction in valid:
+                    # IDs handed out by the rolled back INSERT
+                    transaction.pk = None
+
+    def _insert_transactions(self, user_id, transactions):
+        rollup_deltas = {}
+        for transaction in transactions:
+            key = (transaction.date, transaction.category_id, transaction.type)
+            total, count = rollup_deltas.get(key, (0, 0))
+            rollup_deltas[key] = (total + transaction.amount, count + 1)
 
-        serializer = TransactionSerializer(data=transaction_data)
-        if serializer.is_valid(raise_exception=True):
-            return serializer.save()  # Return transaction and None if successful
-        else:
-            return None, serializer.errors  # Return None and errors if validation fails
+        nested = connection.in_atomic_block
+        with db_transaction.atomic():
+            if not conditional.mark_user_changed(user_id):
+                raise UserProfile.DoesNotExist(
+                    "UserProfile matching query does not exist."
+                )
+            Transaction.objects.bulk_create(transactions)
+            if nested:
+                self._check_categories_now(transactions)
+            RollupService().apply_bulk(user_id, rollup_deltas)
+            cache.invalidate_user(user_id)
@@ -1,7 +1,11 @@
 import datetime
-from collections import OrderedDict, defaultdict
 from decimal import Decimal  # Import Decimal for explicit type conversions
-from ..models import Transaction, TransactionType, UserProfile
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+from ..models import Transaction, TransactionRollup, TransactionType, UserProfile
+from ..utils import week_bounds
 
 
 class TransactionsByWeekService:
@@ -9,6 +13,9 @@ class TransactionsByWeekService:
     Service class for handling operations related to Transactions within a specific week.
     """
 
+    # Day labels indexed by ISO weekday - 1, i.e. Monday first.
+    DAYS_ORDER = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
     def get_transactions_by_week(self, user_id):
         """
         Retrieves transactions for a specific user categorized by day within the current week.
@@ -17,40 +24,84 @@ class TransactionsByWeekService:
             user_id (str): The unique identifier of the user.
 
         Returns:
-            list: A list of dictionaries detailing transactions summed by day for the current week.
+            list: A list of dictionaries detailing transactions summed by day for the current week,
+            one entry per weekday from Monday to Sunday.
         """
         # Validate that the user profile exists
         user_profile = UserProfile.objects.get(user_id=user_id)
 
-        # Define the start of the current week
-        today = datetime.date.today()
-        start_week = today - datetime.timedelta(today.weekday())
-
-        # Fetch user transactions from the start of the current week up to today
-        transactions = Transaction.objects.filter(
-            owner=user_profile, date__range=[start_week, today]
+        totals = self._weekly_totals(user_profile)
+        return self.build_days(
+            (row["weekday"], row["income"], row["outcome"]) for row in totals
         )
 
-        # Aggregate transactions by day
-        transactions_by_day = defaultdict(
-            lambda: {"income": Decimal("0.00"), "outcome": Decimal("0.00")}
+    async def aget_transactions_by_week(self, user_id):
+        """
+        Async version of `get_transactions_by_week`, using the async ORM API.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+
+        Returns:
+            list: A list of dictionaries detailing transactions summed by day for the current week,
+            one entry per weekday from Monday to Sunday.
+        """
+        user_profile = await UserProfile.objects.aget(user_id=user_id)
+        totals = self._weekly_totals(user_profile)
+        return self.build_days(
+            [(row["weekday"], row["income"], row["outcome"]) async for row in totals]
         )
-        for trans in transactions:
-            day_name = trans.date.strftime("%a")
-            transaction_type = (
-                "income" if trans.type == TransactionType.INCOME else "outcome"
-            )
-            transactions_by_day[day_name][transaction_type] += Decimal(trans.amount)
 
-        # Sort the transactions by day of the week to maintain the order: Mon, Tue, Wed, etc.
-        days_order = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        sorted_transactions = OrderedDict(
-            sorted(transactions_by_day.items(), key=lambda x: days_order.index(x[0]))
+    def _weekly_totals(self, user_profile):
+        # Define the start of the current week in the project timezone
+        today = timezone.localdate()
+        start_week, _ = week_bounds(today)
+
+        # Sum income and outcome per ISO weekday from the start of the week up to today
+        # in a single aggregate query.
+        if settings.TRANSACTION_ROLLUPS_ENABLED:
+            source = TransactionRollup.objects.filter(
+                owner=user_profile,
+                day__gte=start_week,
+                day__lt=today + datetime.timedelta(days=1),
+            )
+            date_field, amount_field = "day", "total"
+        else:
+            source = Transaction.objects.filter(
+                owner=user_profile,
+                date__gte=start_week,
+                date__lt=today + datetime.timedelta(days=1),
+            )
+            date_field, amount_field = "date", "amount"
+        return (
+            source.annotate(weekday=ExtractIsoWeekDay(date_field))
+            .values("weekday")
+            .annotate(
+                income=Sum(amount_field, filter=Q(type=TransactionType.INCOME)),
+                outcome=Sum(amount_field, filter=Q(type=TransactionType.EXPENSE)),
+            )
+            .order_by()
         )
 
-        # Convert the sorted transactions to a regular list for serialization
-        return [
-            {"day": day, "income": data["income"], "outcome": data["outcome"]}
-            for day, data in sorted_transactions.items()
-            if day in days_order[: today.weekday() + 1]
+    def build_days(self, totals):
+        """
+        Builds the weekly payload from per-weekday totals.
+
+        Args:
+            totals (iterable): (ISO weekday, income, outcome) tuples; income and outcome
+                may be None, and a weekday may appear more than once.
+
+        Returns:
+            list: A list of dictionaries detailing transactions summed by day for the current week,
+            one entry per weekday from Monday to Sunday.
+        """
+        # Zero-fill every day of the week, then add the totals by weekday index
+        days = [
+            {"day": day, "income": Decimal("0.00"), "outcome": Decimal("0.00")}
+            for day in self.DAYS_ORDER
         ]
+        for weekday, income, outcome in totals:
+            day = days[weekday - 1]
+            day["income"] += income or 0
+            day["outcome"] += outcome or 0
+        return days
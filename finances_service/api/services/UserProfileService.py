@@ -2,12 +2,16 @@
 
 
 # Django imports
+from django.conf import settings
 from django.utils import timezone
+from django.db import transaction as db_transaction
 from django.db.models import Sum
 from django.core.exceptions import ValidationError
 
 # Application-specific imports
-from ..models import UserProfile, Transaction, TransactionType
+from .. import cache, conditional
+from ..models import UserProfile, Transaction, TransactionRollup, TransactionType
+from ..utils import month_bounds
 
 
 class UserProfileService:
@@ -40,19 +44,57 @@ class UserProfileService:
             dict: A dictionary containing the user's budget limit and total monthly expenses.
         """
         user_profile = UserProfile.objects.get(user_id=user_id)
-        today = timezone.now().date()
-        total_expenses = (
-            Transaction.objects.filter(
+        expenses, total = self._monthly_expenses(user_profile)
+        return self.build_budget(user_profile, expenses.aggregate(total=total)["total"])
+
+    async def aget_user_budget(self, user_id):
+        """
+        Async version of `get_user_budget`, using the async ORM API.
+
+        Args:
+            user_id (str): The unique identifier for the user.
+
+        Returns:
+            dict: A dictionary containing the user's budget limit and total monthly expenses.
+        """
+        user_profile = await UserProfile.objects.aget(user_id=user_id)
+        expenses, total = self._monthly_expenses(user_profile)
+        aggregate = await expenses.aaggregate(total=total)
+        return self.build_budget(user_profile, aggregate["total"])
+
+    def _monthly_expenses(self, user_profile):
+        # The user's expenses of the current month and the expression summing them
+        month_start, next_month_start = month_bounds(timezone.localdate())
+        if settings.TRANSACTION_ROLLUPS_ENABLED:
+            expenses = TransactionRollup.objects.filter(
                 owner=user_profile,
                 type=TransactionType.EXPENSE,
-                date__year=today.year,
-                date__month=today.month,
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0.00
+                day__gte=month_start,
+                day__lt=next_month_start,
+            )
+            return expenses, Sum("total")
+        expenses = Transaction.objects.filter(
+            owner=user_profile,
+            type=TransactionType.EXPENSE,
+            date__gte=month_start,
+            date__lt=next_month_start,
         )
+        return expenses, Sum("amount")
+
+    def build_budget(self, user_profile, monthly_expenses):
+        """
+        Builds the budget payload of a user.
+
+        Args:
+            user_profile (UserProfile): The profile holding the budget limit.
+            monthly_expenses (Decimal): The user's expenses this month, or None if none.
+
+        Returns:
+            dict: A dictionary containing the user's budget limit and total monthly expenses.
+        """
         return {
             "budgetLimit": user_profile.budget_limit,
-            "monthlyExpenses": total_expenses,
+            "monthlyExpenses": monthly_expenses or 0.00,
         }
 
     def update_user_budget_limit(self, user_id, new_budget_limit):
@@ -66,7 +108,11 @@ class UserProfileService:
         Returns:
             UserProfile: The updated UserProfile instance.
         """
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        user_profile.budget_limit = new_budget_limit
-        user_profile.save()
+        with db_transaction.atomic():
+            user_profile = UserProfile.objects.get(user_id=user_id)
+            user_profile.budget_limit = new_budget_limit
+            user_profile.save(update_fields=["budget_limit"])
+            # The budget is part of the budget and dashboard payloads
+            conditional.mark_user_changed(user_id)
+            cache.invalidate_user(user_id)
         return user_profile
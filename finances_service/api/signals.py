@@ -0,0 +1,38 @@
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import cache, conditional, db_pool, metrics
+from .models import Category
+from .search import ensure_sqlite_fts_triggers, record_sqlite_fts
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_cached_categories(sender, **kwargs):
+    # Category names appear in the payloads of every user, so drop them all.
+    conditional.mark_all_changed()
+    cache.invalidate_all()
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    # Rebuilding api_transaction in a SQLite migration drops its FTS sync triggers.
+    if sender.name == "api":
+        ensure_sqlite_fts_triggers(connections[using])
+
+
+@receiver(connection_created)
+def check_search_index(sender, connection, **kwargs):
+    record_sqlite_fts(connection)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    db_pool.record_connection_opened(connection.alias)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    metrics.install(connection)
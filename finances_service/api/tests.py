@@ -1,3 +1,1470 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import runpy
+import tempfile
+import time
+import unittest
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache as django_cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction as db_transaction
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from finances_service import settings as project_settings, warmup
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import async_views, db_pool, metrics, partitions, renderers, search, seeding
+from .models import (
+    Category,
+    Transaction,
+    TransactionRollup,
+    TransactionType,
+    UserProfile,
+)
+from .pagination import KeysetCursor
+from .schemas.docs import OpenAPISchemaView
+from .serializers import TransactionListSerializer
+from .services.CategoriesService import CategoriesService
+from .services.DashboardService import DashboardService
+from .services.ExpensesByCategoriesService import ExpensesByCategoriesService
+from .services.RollupService import RollupService
+from .services.TransactionService import TransactionService
+from .services.TransactionsByWeekService import TransactionsByWeekService
+from .throttling import CacheSlidingWindowThrottle, LocalTokenBucketThrottle
+from .utils import month_bounds, week_bounds
+
+
+class TransactionIndexUsageTests(TestCase):
+    """
+    Captures the query plans of the per-user transaction queries so that a dropped or
+    unusable index shows up as a failing test instead of a slow endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # A few users with two years of mixed transactions, so the planner has statistics
+        # to choose between the indexes that start with the owner.
+        category = Category.objects.create(name="Food")
+        today = timezone.now().date()
+        transactions = []
+        for owner in ["user", "other-1", "other-2"]:
+            profile = UserProfile.objects.create(user_id=owner)
+            transactions += [
+                Transaction(
+                    owner=profile,
+                    name=f"Transaction {i}",
+                    date=today - datetime.timedelta(days=i % 730),
+                    amount=Decimal("9.99"),
+                    type=TransactionType.EXPENSE if i % 3 else TransactionType.INCOME,
+                    category=category,
+                    from_account="Card",
+                )
+                for i in range(1000)
+            ]
+        Transaction.objects.bulk_create(transactions)
+
+    def explain(self, queryset):
+        # Postgres prefers sequential scans on small tables, so forbid them to see which
+        # index the planner would pick on real data volumes.
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE api_transaction")
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_transaction_list_uses_owner_date_index(self):
+        # A keyset page: the index returns the rows already in page order
+        queryset = Transaction.objects.filter(owner__user_id="user").order_by(
+            "-date", "-id"
+        )[:50]
+        plan = self.explain(queryset)
+        self.assertIn("api_txn_owner_date_id_idx", plan)
+        # ...without sorting them by id within a date (Incremental Sort on Postgres)
+        self.assertNotRegex(plan, r"(?m)^\s*(->\s*)?(Incremental )?Sort |TEMP B-TREE")
+
+    def test_monthly_expenses_use_owner_type_date_index(self):
+        month_start, next_month_start = month_bounds(timezone.now().date())
+        queryset = Transaction.objects.filter(
+            owner_id="user",
+            type=TransactionType.EXPENSE,
+            date__gte=month_start,
+            date__lt=next_month_start,
+        )
+        self.assertIn("api_txn_owner_type_date_idx", self.explain(queryset))
+
+
+class APITestCase(TestCase):
+    """
+    Base class of the endpoint tests. Every test starts with an empty response cache
+    and fresh rate limits, so tests don't depend on the requests of earlier ones.
+    """
+
+    def setUp(self):
+        django_cache.clear()
+        LocalTokenBucketThrottle.reset()
+
+    def get(self, name, user_id, **extra):
+        return self.client.get(reverse(name), HTTP_USER_ID=user_id, **extra)
+
+    def post(self, name, user_id, data, query=""):
+        return self.client.post(
+            reverse(name) + query,
+            data,
+            content_type="application/json",
+            HTTP_USER_ID=user_id,
+        )
+
+
+def transaction_data(category, **fields):
+    """
+    Returns the body of an add-transaction request, an expense dated today by default.
+    """
+    return {
+        "name": "Groceries",
+        "date": timezone.localdate().isoformat(),
+        "amount": "10.00",
+        "type": TransactionType.EXPENSE,
+        "category_id": category.id,
+        "from_account": "Card",
+        **fields,
+    }
+
+
+def rollup_totals(user_id):
+    """
+    Returns the non-empty rollups of a user as {(day, category_id, type): (total, count)}.
+    """
+    return {
+        (rollup.day, rollup.category_id, rollup.type): (rollup.total, rollup.count)
+        for rollup in TransactionRollup.objects.filter(owner_id=user_id, count__gt=0)
+    }
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user-a", budget_limit=Decimal("100"))
+        UserProfile.objects.create(user_id="user-b", budget_limit=Decimal("200"))
+
+    def test_matching_etag_gets_304_without_running_the_view(self):
+        etag = self.get("budget", "user-a")["ETag"]
+        # Only the change marker is read
+        with self.assertNumQueries(1):
+            response = self.get("budget", "user-a", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_of_another_user_does_not_match(self):
+        etag = self.get("budget", "user-a")["ETag"]
+        response = self.get("budget", "user-b", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["budgetLimit"], 200)
+
+    def test_etag_depends_on_query_string_and_accept(self):
+        first = self.get("transactions", "user-a")["ETag"]
+        self.assertNotEqual(
+            self.client.get(
+                reverse("transactions") + "?limit=1", HTTP_USER_ID="user-a"
+            )["ETag"],
+            first,
+        )
+        self.assertNotEqual(
+            self.get("transactions", "user-a", HTTP_ACCEPT="application/msgpack")[
+                "ETag"
+            ],
+            first,
+        )
+
+    def test_responses_vary_by_user_and_accept(self):
+        vary = self.get("budget", "user-a")["Vary"]
+        self.assertIn("user-id", vary)
+        self.assertIn("Accept", vary)
+
+    def test_write_changes_the_etag(self):
+        etag = self.get("budget", "user-a")["ETag"]
+        self.client.patch(
+            reverse("update-user-budget-limit"),
+            {"budget_limit": "150"},
+            content_type="application/json",
+            HTTP_USER_ID="user-a",
+        )
+        response = self.get("budget", "user-a", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_adding_a_transaction_changes_the_etag(self):
+        etag = self.get("transactions", "user-a")["ETag"]
+        category = Category.objects.create(name="Food")
+        self.post("add_transaction", "user-a", transaction_data(category))
+        response = self.get("transactions", "user-a", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def changed_a_minute_ago(self, user_id):
+        UserProfile.objects.filter(user_id=user_id).update(
+            updated_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+    def test_if_modified_since_gets_304(self):
+        self.changed_a_minute_ago("user-a")
+        last_modified = self.get("transactions", "user-a")["Last-Modified"]
+        response = self.get(
+            "transactions", "user-a", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified_in_the_second_of_a_write(self):
+        category = Category.objects.create(name="Food")
+        self.post("add_transaction", "user-a", transaction_data(category))
+        # Another write in this second would not move a Last-Modified
+        response = self.get("transactions", "user-a")
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("ETag", response)
+        response = self.get(
+            "transactions", "user-a", HTTP_IF_MODIFIED_SINCE=http_date(time.time())
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_takes_precedence_over_if_modified_since(self):
+        self.changed_a_minute_ago("user-a")
+        last_modified = self.get("transactions", "user-a")["Last-Modified"]
+        response = self.get(
+            "transactions",
+            "user-a",
+            HTTP_IF_NONE_MATCH='W/"stale"',
+            HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ValidationErrorMessageTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+
+    def test_invalid_cursor_gets_the_plain_message(self):
+        response = self.get("transactions", "user", QUERY_STRING="cursor=abc")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+    async def test_async_view_returns_the_plain_message(self):
+        request = AsyncRequestFactory().get(
+            reverse("transactions"),
+            {"start_date": "yesterday"},
+            headers={"user-id": "user"},
+        )
+        # Set by the authentication middleware, which the view is called without
+        request.user = AnonymousUser()
+        response = await async_views.TransactionsView.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.content),
+            {"error": "Dates must be in YYYY-MM-DD format"},
+        )
+
+    def test_export_returns_the_plain_message(self):
+        response = self.get("export_transactions", "user", QUERY_STRING="end_date=x")
+        self.assertEqual(
+            response.json(), {"error": "Dates must be in YYYY-MM-DD format"}
+        )
+
+
+@override_settings(TRANSACTION_EXPORT_CHUNK_SIZE=2)
+class ExportTransactionsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        profile = UserProfile.objects.create(user_id="user")
+        category = Category.objects.create(name="Food")
+        Transaction.objects.bulk_create(
+            Transaction(
+                owner=profile,
+                name=f"Transaction {i}",
+                date=datetime.date(2024, 1, 1 + i),
+                amount=Decimal("9.99"),
+                type=TransactionType.EXPENSE,
+                category=category,
+                from_account="Card",
+            )
+            for i in range(5)
+        )
+
+    def test_streams_every_row_newest_first(self):
+        response = self.get("export_transactions", "user")
+        self.assertFalse(response.is_async)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(TransactionService.EXPORT_COLUMNS))
+        self.assertEqual(len(lines), 6)
+        self.assertIn("2024-01-05", lines[1])
+
+    async def test_async_view_streams_an_async_iterator(self):
+        request = RequestFactory().get(
+            reverse("export_transactions"),
+            {"file_format": "ndjson"},
+            headers={"user-id": "user"},
+        )
+        view = async_views.ExportTransactionsView.as_view()
+        response = await sync_to_async(view)(request)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # One chunk per TRANSACTION_EXPORT_CHUNK_SIZE rows and the remainder
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b"".join(chunks).count(b"\n"), 5)
+
+    def test_unknown_user_gets_404(self):
+        response = self.get("export_transactions", "nobody")
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportTransactionsTests(APITestCase):
+    HEADER = b"name,date,amount,type,category_id,from_account,note\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+        cls.category = Category.objects.create(name="Food")
+
+    def post_csv(self, body):
+        return self.client.post(
+            reverse("import_transactions"),
+            body,
+            content_type="text/csv",
+            HTTP_USER_ID="user",
+        )
+
+    def row(self, name):
+        return f"{name},2024-01-01,9.99,Expense,{self.category.id},Card,\n".encode()
+
+    def test_non_utf8_upload_gets_400_with_the_row(self):
+        response = self.post_csv(
+            self.HEADER + self.row("Bread") + "Café\n".encode("latin-1")
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"error": "Row 2: the upload is not UTF-8 text."}
+        )
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_malformed_csv_gets_400_with_the_row(self):
+        oversized = b'"' + b"x" * (csv.field_size_limit() + 1) + b'"\n'
+        response = self.post_csv(self.HEADER + self.row("Bread") + oversized)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["error"].startswith("Row 2: "))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_reimport_skips_the_imported_rows(self):
+        body = self.HEADER + self.row("Bread") + self.row("Milk")
+        self.assertEqual(
+            self.post_csv(body).json(),
+            {"created": 2, "duplicates": 0, "invalid": 0, "errors": []},
+        )
+        report = self.post_csv(body + self.row("Eggs")).json()
+        self.assertEqual((report["created"], report["duplicates"]), (1, 2))
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(RollupService().find_drift("user"), [])
+
+    def test_identical_rows_of_a_file_are_all_imported(self):
+        body = self.HEADER + self.row("Bread") + self.row("Bread")
+        self.assertEqual(self.post_csv(body).json()["created"], 2)
+        # Re-uploading the file still finds both
+        self.assertEqual(self.post_csv(body).json()["duplicates"], 2)
+
+    @override_settings(TRANSACTION_IMPORT_BATCH_SIZE=2)
+    def test_queries_per_batch_do_not_depend_on_the_rows(self):
+        def import_queries(names):
+            body = self.HEADER + b"".join(self.row(name) for name in names)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post_csv(body).json()["created"], len(names))
+            return len(queries)
+
+        four = import_queries([f"Row {i}" for i in range(4)])
+        eight = import_queries([f"Row {i}" for i in range(4, 12)])
+        # Each batch of 2 rows adds a duplicate lookup and one INSERT
+        self.assertEqual(eight - four, 4)
+
+    def test_amounts_with_more_than_two_decimal_places_are_rejected(self):
+        body = (
+            self.HEADER
+            + (
+                f"Bread,2024-01-01,9.999,Expense,{self.category.id},Card,\n"
+                f"Milk,2024-01-01,1.50,Expense,{self.category.id},Card,\n"
+            ).encode()
+        )
+        self.assertEqual(
+            self.post_csv(body).json(),
+            {
+                "created": 1,
+                "duplicates": 0,
+                "invalid": 1,
+                "errors": [
+                    {
+                        "row": 1,
+                        "errors": {
+                            "amount": [
+                                "Ensure that there are no more than 2 decimal places."
+                            ]
+                        },
+                    }
+                ],
+            },
+        )
+        # The same message as the add-transaction endpoint
+        response = self.post(
+            "add_transaction", "user", transaction_data(self.category, amount="9.999")
+        )
+        self.assertEqual(
+            response.json()["error"]["amount"],
+            ["Ensure that there are no more than 2 decimal places."],
+        )
+
+    @override_settings(TRANSACTION_IMPORT_MAX_ERRORS=2)
+    def test_errors_are_capped(self):
+        body = self.HEADER + b"".join(self.row("") for _ in range(5)) + self.row("Ok")
+        report = self.post_csv(body).json()
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["invalid"], 5)
+        self.assertEqual([error["row"] for error in report["errors"]], [1, 2])
+
+
+class TransactionRollupTests(APITestCase):
+    """
+    Checks that the transaction writes keep the rollups equal to the transactions they sum.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+        cls.food = Category.objects.create(name="Food")
+        cls.rent = Category.objects.create(name="Rent")
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.ids = [
+            self.post("add_transaction", "user", data).json()["id"]
+            for data in [
+                transaction_data(self.food, amount="10.00"),
+                transaction_data(self.food, amount="2.50"),
+                transaction_data(self.rent, amount="500.00"),
+                transaction_data(self.food, amount="99.00", type="Income"),
+            ]
+        ]
+
+    def assertNoDrift(self):
+        self.assertEqual(RollupService().find_drift("user"), [])
+
+    def test_add_updates_the_rollups(self):
+        self.assertEqual(
+            rollup_totals("user"),
+            {
+                (self.today, self.food.id, "Expense"): (Decimal("12.50"), 2),
+                (self.today, self.rent.id, "Expense"): (Decimal("500.00"), 1),
+                (self.today, self.food.id, "Income"): (Decimal("99.00"), 1),
+            },
+        )
+        self.assertNoDrift()
+
+    def test_delete_updates_the_rollups(self):
+        response = self.client.delete(
+            reverse("delete_transaction", kwargs={"id": self.ids[0]}),
+            HTTP_USER_ID="user",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            rollup_totals("user")[(self.today, self.food.id, "Expense")],
+            (Decimal("2.50"), 1),
+        )
+        self.assertNoDrift()
+
+    def test_bulk_delete_updates_the_rollups(self):
+        response = self.post(
+            "delete_transactions", "user", {"category_id": self.food.id}
+        )
+        self.assertEqual(response.json(), {"deleted": 3})
+        self.assertEqual(
+            rollup_totals("user"),
+            {(self.today, self.rent.id, "Expense"): (Decimal("500.00"), 1)},
+        )
+        self.assertNoDrift()
+
+    def test_recategorize_moves_the_rollups(self):
+        response = self.post(
+            "recategorize_transactions",
+            "user",
+            {"ids": self.ids[:2], "new_category_id": self.rent.id},
+        )
+        self.assertEqual(response.json(), {"updated": 2})
+        self.assertEqual(
+            rollup_totals("user")[(self.today, self.rent.id, "Expense")],
+            (Decimal("512.50"), 3),
+        )
+        self.assertNotIn((self.today, self.food.id, "Expense"), rollup_totals("user"))
+        self.assertNoDrift()
+
+
+@override_settings(FINANCES_CACHE_ENABLED=True)
+class CacheInvalidationTests(APITestCase):
+    """
+    Checks that the cached payloads of a user are replaced once a write commits.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user", budget_limit=Decimal("100"))
+        UserProfile.objects.create(user_id="other", budget_limit=Decimal("100"))
+        cls.food = Category.objects.create(name="Food")
+
+    def monthly_expenses(self, user_id="user"):
+        return Decimal(str(self.get("budget", user_id).json()["monthlyExpenses"]))
+
+    def test_add_and_delete_invalidate_the_users_payloads(self):
+        self.assertEqual(self.monthly_expenses(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction_id = self.post(
+                "add_transaction", "user", transaction_data(self.food)
+            ).json()["id"]
+        self.assertEqual(self.monthly_expenses(), Decimal("10"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse("delete_transaction", kwargs={"id": transaction_id}),
+                HTTP_USER_ID="user",
+            )
+        self.assertEqual(self.monthly_expenses(), 0)
+
+    def test_payload_is_cached_until_the_write_commits(self):
+        self.monthly_expenses()
+        # Not committed yet: the cached payload is still served
+        self.post("add_transaction", "user", transaction_data(self.food))
+        self.assertEqual(self.monthly_expenses(), 0)
+
+    def test_other_users_keep_their_payloads(self):
+        self.monthly_expenses("other")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post("add_transaction", "user", transaction_data(self.food))
+        # Served from the cache: not even the profile is read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.monthly_expenses("other"), 0)
+
+    def test_category_changes_invalidate_every_user(self):
+        self.assertEqual(self.get("categories", "user").json()[0]["name"], "Food")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.name = "Groceries"
+            self.food.save()
+        self.assertEqual(self.get("categories", "user").json()[0]["name"], "Groceries")
+
+
+class TransactionSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        profile = UserProfile.objects.create(user_id="user")
+        other = UserProfile.objects.create(user_id="other")
+        category = Category.objects.create(name="Food")
+        Transaction.objects.bulk_create(
+            Transaction(
+                owner=owner,
+                name=name,
+                date=datetime.date(2024, 1, 1),
+                amount=Decimal("1.00"),
+                type=TransactionType.EXPENSE,
+                category=category,
+                from_account=from_account,
+                note=note,
+            )
+            for owner, name, from_account, note in [
+                (profile, "Rent", "Bank", "Flat share"),
+                (profile, "Bus", "Travelcard", None),
+                (profile, "Tea", "Cash", None),
+                (other, "Shared taxi", "Cash", None),
+            ]
+        )
+
+    def search(self, term):
+        return sorted(
+            transaction.name
+            for transaction in TransactionService().get_user_transactions(
+                "user", term, None, None
+            )
+        )
+
+    def test_note_and_account_are_searched(self):
+        self.assertEqual(self.search("SHARE"), ["Rent"])
+        self.assertEqual(self.search("travel"), ["Bus"])
+
+    def test_terms_shorter_than_three_characters_match_substrings(self):
+        self.assertEqual(self.search("ca"), ["Bus", "Tea"])
+        self.assertEqual(self.search("E"), ["Bus", "Rent", "Tea"])
+
+    async def test_async_search_before_the_index_was_checked(self):
+        # A worker whose connection hasn't recorded the FTS table yet must not query
+        # for it from the event loop
+        with mock.patch.dict(search._sqlite_fts_available, clear=True):
+            transactions = await TransactionService().aget_user_transactions(
+                "user", "share", None, None
+            )
+        rows = TransactionListSerializer(transactions).data
+        self.assertEqual([row["name"] for row in rows], ["Rent"])
+
+    async def test_async_view_search_matches_the_sync_view(self):
+        for query in ({"name": "share"}, {"name": "ca", "limit": 1}):
+            with self.subTest(query=query):
+                expected = await sync_to_async(self.get)(
+                    "transactions", "user", QUERY_STRING=urlencode(query)
+                )
+                request = AsyncRequestFactory().get(
+                    reverse("transactions"), query, headers={"user-id": "user"}
+                )
+                request.user = AnonymousUser()
+                with mock.patch.dict(search._sqlite_fts_available, clear=True):
+                    response = await async_views.TransactionsView.as_view()(request)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite only")
+    def test_new_connections_record_the_search_index(self):
+        with mock.patch.dict(search._sqlite_fts_available, clear=True):
+            search.record_sqlite_fts(connection)
+            self.assertEqual(
+                search._sqlite_fts_available,
+                {search._database_name(connection): True},
+            )
+
+
+class TransactionPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        profile = UserProfile.objects.create(user_id="user")
+        category = Category.objects.create(name="Food")
+        today = timezone.localdate()
+        names = ["Coffee", "Coffee beans", "Iced coffee", "Bread", "Coffee"]
+        # Several rows per date, so the id tie-breaker decides the order within a date
+        Transaction.objects.bulk_create(
+            Transaction(
+                owner=profile,
+                name=names[i % len(names)],
+                date=today - datetime.timedelta(days=i // 3),
+                amount=Decimal("1.00"),
+                type=TransactionType.EXPENSE,
+                category=category,
+                from_account="Card",
+                note="coffee shop" if i % 4 == 0 else None,
+            )
+            for i in range(11)
+        )
+
+    def pages(self, limit, **params):
+        ids = []
+        query = {"limit": limit, **params}
+        while True:
+            response = self.get("transactions", "user", QUERY_STRING=urlencode(query))
+            body = response.json()
+            self.assertLessEqual(len(body["results"]), limit)
+            ids += [row["id"] for row in body["results"]]
+            if body["next"] is None:
+                return ids
+            query["cursor"] = body["next"]
+
+    def test_keyset_pages_cover_the_list_in_order(self):
+        expected = list(
+            Transaction.objects.filter(owner_id="user")
+            .order_by("-date", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(self.pages(3), expected)
+        self.assertEqual(self.pages(11), expected)
+
+    def test_search_pages_follow_the_relevance_order(self):
+        expected = [
+            row["id"]
+            for row in self.get(
+                "transactions", "user", QUERY_STRING="name=coffee"
+            ).json()
+        ]
+        self.assertEqual(len(expected), 10)
+        self.assertEqual(self.pages(2, name="coffee"), expected)
+
+    def test_cursor_of_a_listing_is_rejected_by_a_search(self):
+        cursor = self.get("transactions", "user", QUERY_STRING="limit=2").json()["next"]
+        response = self.get(
+            "transactions",
+            "user",
+            QUERY_STRING=urlencode({"limit": 2, "name": "coffee", "cursor": cursor}),
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class DashboardParityTests(APITestCase):
+    """
+    Checks that every dashboard section equals the response of its standalone endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user", budget_limit=Decimal("300"))
+        cls.food = Category.objects.create(name="Food")
+        cls.gone = Category.objects.create(name="Gone")
+
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        month_start, _ = month_bounds(today)
+        for data in [
+            transaction_data(self.food, amount="12.30"),
+            transaction_data(self.food, amount="7.70", date=month_start.isoformat()),
+            transaction_data(self.gone, amount="5.00"),
+            transaction_data(self.food, amount="100.00", type="Income"),
+            # Last month: outside the month window, and in the week's on some days
+            transaction_data(
+                self.food,
+                amount="40.00",
+                date=(month_start - datetime.timedelta(days=1)).isoformat(),
+            ),
+        ]:
+            self.post("add_transaction", "user", data)
+        # Leaves uncategorised transactions and rollups
+        self.gone.delete()
+
+    def test_sections_match_the_standalone_endpoints(self):
+        for rollups in (True, False):
+            with self.subTest(rollups=rollups), self.settings(
+                TRANSACTION_ROLLUPS_ENABLED=rollups
+            ):
+                dashboard = self.get("dashboard", "user").json()
+                for section, endpoint in [
+                    ("budget", "budget"),
+                    ("expenses_by_categories", "expenses_by_categories"),
+                    ("transactions_by_week", "transactions_by_week"),
+                ]:
+                    self.assertEqual(
+                        dashboard[section], self.get(endpoint, "user").json()
+                    )
+
+    def test_dashboard_reads_the_profile_and_one_grouped_query(self):
+        with self.assertNumQueries(2):
+            DashboardService().get_dashboard("user")
+
+
+class AddTransactionsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+        cls.food = Category.objects.create(name="Food")
+
+    def batch(self, size, invalid=()):
+        return [
+            transaction_data(
+                self.food,
+                name=f"Transaction {i}",
+                amount="abc" if i in invalid else "1.50",
+            )
+            for i in range(size)
+        ]
+
+    def test_atomic_batch_with_an_invalid_row_adds_nothing(self):
+        response = self.post("add_transactions", "user", self.batch(3, invalid={1}))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["error"]], [1])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(rollup_totals("user"), {})
+
+    def test_best_effort_batch_adds_the_valid_rows(self):
+        response = self.post(
+            "add_transactions",
+            "user",
+            self.batch(3, invalid={1}),
+            query="?mode=best_effort",
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(
+            [row["name"] for row in body["created"]],
+            ["Transaction 0", "Transaction 2"],
+        )
+        self.assertEqual([error["index"] for error in body["errors"]], [1])
+        self.assertEqual(
+            rollup_totals("user"),
+            {
+                (timezone.localdate(), self.food.id, "Expense"): (Decimal("3.00"), 2),
+            },
+        )
+
+    def test_queries_do_not_depend_on_the_batch_size(self):
+        def add_queries(size):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post("add_transactions", "user", self.batch(size))
+            self.assertEqual(len(response.json()["created"]), size)
+            return len(queries)
+
+        # The first batch also reads the category names into the cache
+        add_queries(1)
+        self.assertEqual(add_queries(2), add_queries(50))
+
+
+@override_settings(FINANCES_CACHE_ENABLED=True)
+class WriteQueryCountTests(TransactionTestCase):
+    """
+    Counts the statements of the writes as an API request runs them, outside any
+    transaction of the caller.
+    """
+
+    def setUp(self):
+        django_cache.clear()
+        UserProfile.objects.create(user_id="user")
+        self.food = Category.objects.create(name="Food")
+        # The category names are then read from the cache
+        CategoriesService().get_category_names()
+        self.service = TransactionService()
+
+    @contextmanager
+    def assertNumStatements(self, number):
+        # Like assertNumQueries, leaving out the transaction control statements, which
+        # depend on the backend
+        with CaptureQueriesContext(connection) as queries:
+            yield
+        statements = [
+            query["sql"]
+            for query in queries
+            if not re.match(
+                r"(BEGIN|COMMIT|SAVEPOINT|RELEASE SAVEPOINT)\b", query["sql"]
+            )
+        ]
+        self.assertEqual(len(statements), number, "\n".join(statements))
+
+    def test_add_transaction_takes_three_statements(self):
+        # The change marker UPDATE, the INSERT and the rollup UPDATE
+        self.service.add_transaction("user", transaction_data(self.food))
+        with self.assertNumStatements(3):
+            self.service.add_transaction("user", transaction_data(self.food))
+
+    @unittest.skipUnless(
+        TransactionService()._can_return_from_delete(),
+        "DELETE ... RETURNING is not supported",
+    )
+    def test_delete_transaction_takes_three_statements(self):
+        self.service.add_transaction("user", transaction_data(self.food))
+        transaction = self.service.add_transaction("user", transaction_data(self.food))
+        # The change marker UPDATE, the DELETE ... RETURNING and the rollup UPDATE
+        with self.assertNumStatements(3):
+            self.service.delete_transaction(transaction.id, "user")
+        self.assertEqual(
+            rollup_totals("user"),
+            {(timezone.localdate(), self.food.id, "Expense"): (Decimal("10.00"), 1)},
+        )
+
+    def test_bulk_delete_does_not_depend_on_the_rows(self):
+        def delete_queries(size):
+            self.service.add_transactions("user", [transaction_data(self.food)] * size)
+            with CaptureQueriesContext(connection) as queries:
+                deleted = self.service.delete_transactions(
+                    "user", {"category_id": self.food.id}
+                )
+            self.assertEqual(deleted, size)
+            return len(queries)
+
+        self.assertEqual(delete_queries(2), delete_queries(20))
+
+
+class NestedWriteTests(APITestCase):
+    """
+    Checks the writes inside a caller's transaction, where the deferred foreign keys
+    would only be checked at the caller's commit.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+        cls.food = Category.objects.create(name="Food")
+        # Deleted since the category names were cached
+        cls.gone = Category(id=cls.food.id + 1000, name="Gone")
+
+    def setUp(self):
+        super().setUp()
+        category_names = mock.patch.object(
+            CategoriesService,
+            "get_category_names",
+            return_value={self.food.id: "Food", self.gone.id: "Gone"},
+        )
+        category_names.start()
+        self.addCleanup(category_names.stop)
+        self.service = TransactionService()
+
+    def test_add_transaction_reports_a_deleted_category(self):
+        with db_transaction.atomic():
+            with self.assertRaises(ValidationError) as raised:
+                self.service.add_transaction("user", transaction_data(self.gone))
+            self.assertIn("category_id", raised.exception.detail)
+            # The caller's transaction goes on
+            self.service.add_transaction("user", transaction_data(self.food))
+        self.assertEqual(
+            list(Transaction.objects.values_list("category_id", flat=True)),
+            [self.food.id],
+        )
+
+    def test_best_effort_batch_skips_a_deleted_category(self):
+        with db_transaction.atomic():
+            created, errors = self.service.add_transactions(
+                "user",
+                [transaction_data(self.food), transaction_data(self.gone)],
+                atomic=False,
+            )
+        self.assertEqual(len(created), 1)
+        self.assertEqual([error["index"] for error in errors], [1])
+        self.assertEqual(RollupService().find_drift("user"), [])
+
+
+@override_settings(FINANCES_CACHE_ENABLED=True)
+class CacheCountersTests(APITestCase):
+    def cache_requests(self, result):
+        series = f'finances_cache_requests_total{{payload="budget",result="{result}"}} '
+        for line in metrics.export().splitlines():
+            if line.startswith(series):
+                return int(line[len(series) :])
+        return 0
+
+    def test_hits_and_misses_are_exported(self):
+        UserProfile.objects.create(user_id="user")
+        hits, misses = self.cache_requests("hit"), self.cache_requests("miss")
+        self.get("budget", "user")
+        self.get("budget", "user")
+        self.assertEqual(self.cache_requests("miss"), misses + 1)
+        self.assertEqual(self.cache_requests("hit"), hits + 1)
+
+
+class TransactionsByWeekTests(APITestCase):
+    # A Thursday, so the week so far runs from Monday the 10th
+    TODAY = datetime.date(2024, 6, 13)
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create(user_id="user")
+        cls.food = Category.objects.create(name="Food")
+
+    def setUp(self):
+        super().setUp()
+        for date, amount, type in [
+            ("2024-06-10", "10.00", TransactionType.EXPENSE),
+            ("2024-06-10", "2.50", TransactionType.EXPENSE),
+            ("2024-06-10", "100.00", TransactionType.INCOME),
+            ("2024-06-13", "4.00", TransactionType.EXPENSE),
+            # Outside the week so far: the Sunday before and the Friday after
+            ("2024-06-09", "30.00", TransactionType.EXPENSE),
+            ("2024-06-14", "50.00", TransactionType.INCOME),
+        ]:
+            self.post(
+                "add_transaction",
+                "user",
+                transaction_data(self.food, date=date, amount=amount, type=type),
+            )
+
+    def test_days_are_zero_filled_and_split_into_income_and_outcome(self):
+        expected = [
+            {"day": day, "income": Decimal("0.00"), "outcome": Decimal("0.00")}
+            for day in TransactionsByWeekService.DAYS_ORDER
+        ]
+        expected[0].update(income=Decimal("100.00"), outcome=Decimal("12.50"))
+        expected[3].update(outcome=Decimal("4.00"))
+        for rollups in (True, False):
+            with self.subTest(rollups=rollups), self.settings(
+                TRANSACTION_ROLLUPS_ENABLED=rollups
+            ), mock.patch(
+                "api.services.TransactionsByWeekService.timezone.localdate",
+                return_value=self.TODAY,
+            ):
+                self.assertEqual(
+                    TransactionsByWeekService().get_transactions_by_week("user"),
+                    expected,
+                )
+
+
+class ExpensesByCategoriesTests(TestCase):
+    def test_uncategorized_bucket_is_kept_apart_from_a_category_of_that_name(self):
+        expenses = ExpensesByCategoriesService().build_expenses_by_categories(
+            [
+                ("Uncategorized", Decimal("5")),
+                (None, Decimal("7")),
+                ("Food", Decimal("3")),
+                (None, Decimal("1")),
+            ]
+        )
+        self.assertEqual(
+            [(row["name"], row["value"]) for row in expenses],
+            [
+                ("Food", Decimal("3")),
+                ("Uncategorized", Decimal("5")),
+                ("Uncategorized", Decimal("8")),
+            ],
+        )
+
+    @override_settings(TRANSACTION_ROLLUPS_ENABLED=False)
+    def test_expenses_read_the_profile_and_one_grouped_query(self):
+        profile = UserProfile.objects.create(user_id="user")
+        food = Category.objects.create(name="Food")
+        gone = Category.objects.create(name="Gone")
+        today = timezone.localdate()
+        month_start, _ = month_bounds(today)
+        Transaction.objects.bulk_create(
+            Transaction(
+                owner=profile,
+                name="Expense",
+                date=date,
+                amount=Decimal(amount),
+                type=type,
+                category=category,
+                from_account="Card",
+            )
+            for amount, category, date, type in [
+                ("12.30", food, today, TransactionType.EXPENSE),
+                ("7.70", food, month_start, TransactionType.EXPENSE),
+                ("5.00", gone, today, TransactionType.EXPENSE),
+                ("100.00", food, today, TransactionType.INCOME),
+                (
+                    "40.00",
+                    food,
+                    month_start - datetime.timedelta(days=1),
+                    TransactionType.EXPENSE,
+                ),
+            ]
+        )
+        gone.delete()
+        with self.assertNumQueries(2):
+            expenses = ExpensesByCategoriesService().get_expenses_by_categories("user")
+        self.assertEqual(
+            [(row["name"], row["value"]) for row in expenses],
+            [("Food", Decimal("20.00")), ("Uncategorized", Decimal("5.00"))],
+        )
+
+
+class ThrottleTests(TestCase):
+    class View:
+        throttle_scope = "global"
+
+    def setUp(self):
+        django_cache.clear()
+        LocalTokenBucketThrottle.reset()
+
+    def check(self, throttle_class, now):
+        # A new instance per request, as views use them
+        request = Request(RequestFactory().get("/", REMOTE_ADDR="10.0.0.1"))
+        throttle = throttle_class()
+        with mock.patch("api.throttling.time.time", return_value=now), mock.patch(
+            "api.throttling.time.monotonic", return_value=now
+        ):
+            allowed = throttle.allow_request(request, self.View())
+        # Views only ask for the wait of rejected requests
+        return allowed, None if allowed else throttle.wait()
+
+    def rate(self, rate):
+        return mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, {"global": rate})
+
+    def test_changed_rates_apply(self):
+        now = 60_000_030.0
+        for throttle_class in (LocalTokenBucketThrottle, CacheSlidingWindowThrottle):
+            with self.subTest(throttle_class.__name__):
+                with self.rate("0/min"):
+                    self.assertFalse(self.check(throttle_class, now)[0])
+                with self.rate("5/min"):
+                    self.assertTrue(self.check(throttle_class, now)[0])
+                with self.rate(None):
+                    self.assertEqual(self.check(throttle_class, now), (True, None))
+
+    def test_allowance_and_wait(self):
+        now = 60_000_030.0
+        for throttle_class in (LocalTokenBucketThrottle, CacheSlidingWindowThrottle):
+            with self.subTest(throttle_class.__name__), self.rate("5/min"):
+                allowed = [self.check(throttle_class, now)[0] for _ in range(5)]
+                self.assertEqual(allowed, [True] * 5)
+                allowed, wait = self.check(throttle_class, now)
+                self.assertFalse(allowed)
+                self.assertGreater(wait, 0)
+                self.assertTrue(self.check(throttle_class, now + wait + 0.01)[0])
+
+
+class PoolStatsTests(APITestCase):
+    def stats(self, token=None):
+        extra = {} if token is None else {"HTTP_X_INTERNAL_TOKEN": token}
+        return self.client.get(reverse("pool_stats"), **extra)
+
+    def test_hidden_without_a_configured_token(self):
+        self.assertEqual(self.stats("secret").status_code, 404)
+
+    @override_settings(INTERNAL_API_TOKEN="secret")
+    def test_requires_the_token(self):
+        self.assertEqual(self.stats().status_code, 403)
+        self.assertEqual(self.stats("wrong").status_code, 403)
+
+    @override_settings(INTERNAL_API_TOKEN="secret")
+    def test_reports_the_connections_of_the_worker(self):
+        with mock.patch.dict(db_pool._connections_opened, {"default": 3}):
+            stats = self.stats("secret").json()
+        self.assertEqual(stats["pid"], os.getpid())
+        if connection.settings_dict["OPTIONS"].get("pool"):
+            # The pool's own counters replace the signal count
+            self.assertEqual(stats["mode"], "pool")
+            self.assertEqual(stats["in_use"] + stats["idle"], stats["size"])
+        else:
+            self.assertEqual(stats["connections_opened"], 3)
+            self.assertNotIn("in_use", stats)
+
+
+class WarmUpTests(APITestCase):
+    def test_app_warm_up_does_not_touch_the_database(self):
+        # Closing the connection would end the test's transaction
+        with self.assertNumQueries(0), mock.patch.object(
+            warmup.connections, "close_all"
+        ) as close_all:
+            warmup.warm_up_app()
+        # No connection may be inherited by the forked workers
+        close_all.assert_called_once_with()
+
+    def test_worker_warm_up_reaches_every_endpoint(self):
+        statuses = {}
+        client_get = Client.get
+
+        def get(client, path, *args, **kwargs):
+            response = client_get(client, path, *args, **kwargs)
+            statuses[path] = response.status_code
+            return response
+
+        # Closing the connection would end the test's transaction
+        with mock.patch.object(Client, "get", get), mock.patch.object(
+            connections["default"], "close"
+        ), mock.patch.object(warmup.logger, "exception") as log_exception:
+            warmup.warm_up_worker()
+        log_exception.assert_not_called()
+        self.assertEqual(list(statuses), warmup.WARMUP_PATHS)
+        # The warm-up user doesn't exist, so the views answer without data
+        self.assertTrue(all(status < 500 for status in statuses.values()), statuses)
+
+
+class SeedDataCommandTests(TestCase):
+    def seed(self, **options):
+        options = {"users": 3, "transactions": 20, "categories": 4, **options}
+        call_command("seed_data", stdout=io.StringIO(), **options)
+
+    def dataset(self, user_prefix):
+        return [
+            (
+                user.user_id.removeprefix(user_prefix),
+                user.budget_limit,
+                list(
+                    user.transactions.order_by("id").values_list(
+                        "name", "date", "amount", "type", "category__name"
+                    )
+                ),
+            )
+            for user in UserProfile.objects.filter(
+                user_id__startswith=user_prefix
+            ).order_by("user_id")
+        ]
+
+    def test_seeds_users_transactions_and_rollups(self):
+        # Batches smaller than a user's transactions with bulk_create
+        self.seed(batch_size=7)
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)),
+            sorted(seeding.category_names(4)),
+        )
+        for user_id in ("seed-user-0", "seed-user-1", "seed-user-2"):
+            with self.subTest(user_id=user_id):
+                profile = UserProfile.objects.get(user_id=user_id)
+                self.assertEqual(profile.transactions.count(), 20)
+                self.assertEqual(profile.data_version, 1)
+                self.assertNotEqual(rollup_totals(user_id), {})
+                self.assertEqual(RollupService().find_drift(user_id), [])
+
+    def test_same_options_give_the_same_dataset(self):
+        self.seed(user_prefix="first-", seed=1)
+        self.seed(user_prefix="second-", seed=1)
+        self.seed(user_prefix="third-", seed=2)
+        self.assertEqual(self.dataset("first-"), self.dataset("second-"))
+        self.assertNotEqual(self.dataset("first-"), self.dataset("third-"))
+        # The categories are reused rather than created again
+        self.assertEqual(Category.objects.count(), 4)
+
+    @unittest.skipIf(connection.vendor == "postgresql", "Not on PostgreSQL")
+    def test_copy_requires_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "requires PostgreSQL"):
+            self.seed(method="copy")
+        self.assertFalse(UserProfile.objects.exists())
+
+    def test_rejects_non_positive_counts(self):
+        with self.assertRaisesMessage(CommandError, "--batch-size must be positive"):
+            self.seed(batch_size=0)
+
+
+class OpenAPISchemaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = os.path.join(directory.name, "openapi.json")
+        call_command(
+            "build_openapi_schema", output=self.schema_file, stdout=io.StringIO()
+        )
+        self.enterContext(override_settings(OPENAPI_SCHEMA_FILE=self.schema_file))
+        # The view keeps the schema it read last
+        self.enterContext(mock.patch.object(OpenAPISchemaView, "_cached", None))
+
+    def test_built_schema_leaves_the_host_to_the_deployment(self):
+        with open(self.schema_file, "rb") as schema_file:
+            schema = json.load(schema_file)
+        self.assertNotIn("host", schema)
+        self.assertIn("/transactions/", schema["paths"])
+        with mock.patch.dict(os.environ, {"SERVICE_URL": "https://finances.example"}):
+            schema = self.client.get(reverse("openapi-schema")).json()
+        self.assertEqual(schema["host"], "finances.example")
+        self.assertEqual(schema["schemes"], ["https"])
+
+    def test_if_none_match_gets_304(self):
+        response = self.client.get(reverse("openapi-schema"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        response = self.client.get(
+            reverse("openapi-schema"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+
+class SettingsEnvironmentTests(SimpleTestCase):
+    # Variables that may be set to an empty value on purpose
+    EMPTY_ALLOWED = {"SQL_USER", "SQL_PASSWORD", "SQL_HOST", "SQL_PORT"}
+
+    def load_settings(self, environ):
+        # Runs the settings module again with the variables set, or unset for None
+        with mock.patch.dict(os.environ):
+            for name, value in environ.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            return runpy.run_path(project_settings.__file__)
+
+    def test_empty_variables_of_the_env_example_use_the_defaults(self):
+        with open(os.path.join(project_settings.BASE_DIR, ".env.example")) as example:
+            names = [
+                line.split("=", 1)[0]
+                for line in example
+                if "=" in line and not line.startswith("#")
+            ]
+        names = [name for name in names if name not in self.EMPTY_ALLOWED]
+        empty = self.load_settings({name: "" for name in names})
+        unset = self.load_settings({name: None for name in names})
+        for setting in unset:
+            if setting.isupper() and setting != "DATABASES":
+                with self.subTest(setting):
+                    self.assertEqual(empty[setting], unset[setting])
+        for key in ("ENGINE", "NAME"):
+            self.assertEqual(
+                empty["DATABASES"]["default"][key], unset["DATABASES"]["default"][key]
+            )
+
+
+class RendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        profile = UserProfile.objects.create(user_id="user", budget_limit=100)
+        category = Category.objects.create(name="Café ☕")
+        today = timezone.localdate()
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    owner=profile,
+                    name="Crème brûlée 🍮",
+                    date=today,
+                    amount=Decimal("12.35"),
+                    type=TransactionType.EXPENSE,
+                    category=category,
+                    from_account="Card",
+                    note="line\u2028separator\u2029paragraph",
+                ),
+                Transaction(
+                    owner=profile,
+                    name="Salary",
+                    date=today,
+                    amount=Decimal("1000.10"),
+                    type=TransactionType.INCOME,
+                    category=category,
+                    from_account="Bank",
+                ),
+            ]
+        )
+
+    def payloads(self):
+        transactions = TransactionService().get_user_transactions("user")
+        yield "transactions", TransactionListSerializer(transactions).data
+        yield "dashboard", DashboardService().get_dashboard("user")
+        yield "encoder types", {
+            "amount": Decimal("12.35"),
+            "date": datetime.date(2024, 2, 29),
+            "datetime": datetime.datetime(
+                2024, 2, 29, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+            ),
+            "text": 'naïve ☕\u2028\x00\t"quoted"',
+        }
+
+    def test_orjson_output_matches_json_renderer(self):
+        for name, data in self.payloads():
+            with self.subTest(payload=name):
+                self.assertEqual(
+                    renderers.ORJSONRenderer().render(data),
+                    JSONRenderer().render(data),
+                )
+
+    def test_msgpack_output_decodes_to_the_json_data(self):
+        for name, data in self.payloads():
+            with self.subTest(payload=name):
+                self.assertEqual(
+                    msgpack.unpackb(renderers.MessagePackRenderer().render(data)),
+                    json.loads(JSONRenderer().render(data)),
+                )
+
+
+class MetricsStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_export_sums_the_files_of_every_worker(self):
+        # Two workers counting in their own files
+        for name in ("worker_1.db", "worker_2.db"):
+            store = metrics.FileStore(os.path.join(self.directory, name))
+            store.inc(metrics._key("finances_requests_total", route="budget"), 2)
+        with override_settings(METRICS_DIR=self.directory):
+            text = metrics.export()
+        self.assertIn('finances_requests_total{route="budget"} 4', text)
+
+    def test_file_store_grows_and_reopens_with_its_values(self):
+        path = os.path.join(self.directory, "worker_1.db")
+        store = metrics.FileStore(path)
+        keys = [
+            metrics._key("finances_requests_total", route=f"r{i}") for i in range(2000)
+        ]
+        for key in keys:
+            store.inc(key, 1)
+        self.assertGreater(os.path.getsize(path), metrics.FileStore.INITIAL_SIZE)
+
+        store = metrics.FileStore(path)
+        store.inc(keys[0], 1)
+        self.assertEqual(dict(store.items())[keys[0]], 2)
+        self.assertEqual(len(store.items()), 2000)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+@override_settings(TRANSACTION_ROLLUPS_ENABLED=False)
+class TransactionPartitionPruningTests(TestCase):
+    """
+    Checks with EXPLAIN that the date-bounded transaction queries only scan the monthly
+    partitions of their dates once the table is partitioned.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        category = Category.objects.create(name="Food")
+        cls.profile = UserProfile.objects.create(user_id="user")
+        Transaction.objects.bulk_create(
+            Transaction(
+                owner=cls.profile,
+                name=f"Transaction {i}",
+                date=cls.today - datetime.timedelta(days=i),
+                amount=Decimal("9.99"),
+                type=TransactionType.EXPENSE if i % 3 else TransactionType.INCOME,
+                category=category,
+                from_account="Card",
+            )
+            for i in range(400)
+        )
+        partitions.convert_table(months_ahead=1)
+
+    def scanned(self, queryset):
+        # The partitions in the plan, e.g. {"api_transaction_y2024m05"}
+        return set(
+            re.findall(
+                r"\b(api_transaction_(?:y\d{4}m\d{2}|default))\b", queryset.explain()
+            )
+        )
+
+    def months(self, *days):
+        return {partitions.partition_name(day) for day in days}
+
+    def test_monthly_expenses_scan_the_current_month(self):
+        totals = ExpensesByCategoriesService()._monthly_totals(self.profile)
+        self.assertEqual(self.scanned(totals), self.months(self.today))
+
+    def test_weekly_totals_scan_the_months_of_the_week(self):
+        totals = TransactionsByWeekService()._weekly_totals(self.profile)
+        week_start, _ = week_bounds(self.today)
+        self.assertEqual(self.scanned(totals), self.months(week_start, self.today))
+
+    def test_dashboard_scans_the_months_of_its_windows(self):
+        service = DashboardService()
+        bounds = service._bounds()
+        totals = service._daily_totals(self.profile, service.SECTIONS, bounds)
+        self.assertEqual(
+            self.scanned(totals), self.months(min(bounds[0], bounds[2]), self.today)
+        )
+
+    def test_date_range_listing_scans_its_months(self):
+        month_start, next_month_start = month_bounds(
+            self.today - datetime.timedelta(days=100)
+        )
+        transactions = TransactionService().get_user_transactions(
+            "user", None, month_start, next_month_start - datetime.timedelta(days=1)
+        )
+        self.assertEqual(self.scanned(transactions), self.months(month_start))
+
+    def test_keyset_page_skips_newer_months(self):
+        day = self.today - datetime.timedelta(days=100)
+        cursor = KeysetCursor(day, 1, None).encode()
+        page = TransactionService()._page_query("user", 50, cursor, None, None, None)
+        scanned = self.scanned(page)
+        self.assertIn(partitions.partition_name(day), scanned)
+        newer = self.months(self.today, self.today - datetime.timedelta(days=60))
+        self.assertFalse(scanned & newer)
+
+    def test_new_partition_takes_rows_from_the_default_partition(self):
+        # Dated after the last partition, so stored in the default one
+        ahead = month_bounds(self.today)[1] + datetime.timedelta(days=70)
+        transaction = Transaction.objects.create(
+            owner=self.profile,
+            name="Ahead",
+            date=ahead,
+            amount=Decimal("1.00"),
+            type=TransactionType.EXPENSE,
+            from_account="Card",
+        )
+        self.assertEqual(partitions.default_partition_rows(), 1)
+
+        created = partitions.create_partitions(months_ahead=3)
+
+        self.assertIn(partitions.partition_name(ahead), created)
+        self.assertEqual(partitions.default_partition_rows(), 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM api_transaction WHERE id = %s",
+                [transaction.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], partitions.partition_name(ahead))
@@ -0,0 +1,184 @@
+"""
+Rate limiting with O(1) state per client.
+
+DRF's ScopedRateThrottle keeps the timestamp of every request in the window and reads and
+rewrites that whole list in the cache on each call, so its cost grows with the rate. The
+throttles here keep a constant amount of state per client and scope:
+
+- LocalTokenBucketThrottle: a token bucket in process memory, sharded across locks.
+  Nothing leaves the process, so the limit applies per worker process.
+- CacheSlidingWindowThrottle: a sliding window counter in the shared cache, updated
+  with atomic increments, for limits shared by every worker and node.
+
+Both read the scope from the view's `throttle_scope` and the rate from
+DEFAULT_THROTTLE_RATES, like ScopedRateThrottle, and identify clients the same way.
+"""
+
+import threading
+import time
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class _ConstantStateThrottle(ScopedRateThrottle):
+    # Parsed rates, by rate string: (capacity, duration)
+    _parsed_rates = {}
+
+    @property
+    def THROTTLE_RATES(self):
+        # DRF binds the rates to the class at import; read the current settings instead
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        rate = self.get_rate()
+        if rate not in self._parsed_rates:
+            self._parsed_rates[rate] = self.parse_rate(rate)
+        self.num_requests, self.duration = self._parsed_rates[rate]
+        if self.num_requests is None:
+            return True
+        if self.num_requests == 0:
+            self._wait = self.duration
+            return False
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self._wait = self.take(self.key, self.num_requests, self.duration)
+        return self._wait is None
+
+    def take(self, key, capacity, duration):
+        """
+        Takes one request from the client's allowance.
+
+        Args:
+            key (str): The client and scope.
+            capacity (int): The number of requests allowed per `duration`.
+            duration (int): The length of the rate window, in seconds.
+
+        Returns:
+            float: None if the request is allowed, otherwise the seconds to wait.
+        """
+        raise NotImplementedError
+
+    def wait(self):
+        return self._wait
+
+
+class _BucketShard:
+    __slots__ = ("lock", "buckets", "sweep_at")
+
+    def __init__(self, sweep_at):
+        self.lock = threading.Lock()
+        # key -> [tokens, updated, time when the bucket is full again]
+        self.buckets = {}
+        self.sweep_at = sweep_at
+
+
+class LocalTokenBucketThrottle(_ConstantStateThrottle):
+    """
+    Token bucket per client in process memory. Each bucket holds up to `num_requests`
+    tokens and refills at `num_requests / duration` tokens per second, so a client may
+    burst the whole allowance and then continues at the average rate.
+
+    Buckets are spread over shards with their own locks so threads rarely contend, and a
+    bucket that has refilled completely is dropped, as it is the same as a new one.
+    """
+
+    SHARDS = 16
+    # Shards sweep full buckets once they grow to this size, then whenever they double
+    SWEEP_MIN_SIZE = 1024
+
+    @classmethod
+    def reset(cls):
+        """
+        Forgets every bucket of this process.
+        """
+        cls._shards = [_BucketShard(cls.SWEEP_MIN_SIZE) for _ in range(cls.SHARDS)]
+
+    def take(self, key, capacity, duration):
+        refill_rate = capacity / duration
+        now = time.monotonic()
+        shard = self._shards[hash(key) % self.SHARDS]
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+
+            if tokens < 1:
+                bucket[0], bucket[1] = tokens, now
+                return (1 - tokens) / refill_rate
+
+            tokens -= 1
+            full_at = now + (capacity - tokens) / refill_rate
+            if bucket is None:
+                shard.buckets[key] = [tokens, now, full_at]
+                if len(shard.buckets) >= shard.sweep_at:
+                    self._sweep(shard, now)
+            else:
+                bucket[0], bucket[1], bucket[2] = tokens, now, full_at
+        return None
+
+    def _sweep(self, shard, now):
+        # Amortised O(1): runs again only once the shard has doubled
+        shard.buckets = {
+            key: bucket for key, bucket in shard.buckets.items() if bucket[2] > now
+        }
+        shard.sweep_at = max(self.SWEEP_MIN_SIZE, 2 * len(shard.buckets))
+
+
+LocalTokenBucketThrottle.reset()
+
+
+class CacheSlidingWindowThrottle(_ConstantStateThrottle):
+    """
+    Shared-cache counterpart of LocalTokenBucketThrottle. A token bucket needs a
+    read-modify-write that cache backends can't do atomically, so this is a sliding
+    window counter instead: one counter per client and fixed window, bumped with the
+    cache's atomic `incr`, with the previous window weighted by how much of it still
+    overlaps the sliding window. It allows the same average rate with two integers of
+    state and two cache round trips per request, but the allowance comes back as the
+    window slides rather than at a steady refill rate, and the count is an estimate
+    that assumes the previous window's requests were spread evenly.
+    """
+
+    cache_format = "throttle_sw_%(scope)s_%(ident)s"
+
+    def take(self, key, capacity, duration):
+        now = time.time()
+        window = int(now // duration)
+        current_key = f"{key}:{window}"
+        previous_key = f"{key}:{window - 1}"
+
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # First request of the window; `add` loses to a concurrent first request
+            if self.cache.add(current_key, 1, timeout=2 * duration):
+                current = 1
+            else:
+                current = self.cache.incr(current_key)
+        previous = self.cache.get(previous_key, 0)
+
+        overlap = 1 - (now - window * duration) / duration
+        if previous * overlap + current <= capacity:
+            return None
+
+        # Rejected requests don't use up the allowance
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        # Time until the estimate, counting the retried request, drops to the capacity
+        if current <= capacity:
+            # Within this window, once enough of the previous one has slid out
+            excess = previous * overlap + current - capacity
+            return excess / previous * duration
+        # In the next window, once enough of this one has slid out
+        counted = current - 1
+        return overlap * duration + (counted + 1 - capacity) / counted * duration
@@ -1,32 +1,62 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Read endpoints are served by the async views under ASGI (see ASYNC_READ_VIEWS)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
-    path("budget/", views.BudgetView.as_view(), name="budget"),
-    path("transactions/", views.TransactionsView.as_view(), name="transactions"),
+    path("budget/", read_views.BudgetView.as_view(), name="budget"),
+    path("transactions/", read_views.TransactionsView.as_view(), name="transactions"),
+    path(
+        "export-transactions/",
+        read_views.ExportTransactionsView.as_view(),
+        name="export_transactions",
+    ),
     path(
         "categories/",
-        views.CategoriesView.as_view(),
+        read_views.CategoriesView.as_view(),
         name="categories",
     ),
     path(
         "expenses-by-categories/",
-        views.ExpensesByCategoriesView.as_view(),
+        read_views.ExpensesByCategoriesView.as_view(),
         name="expenses_by_categories",
     ),
     path(
         "transactions-by-week/",
-        views.TransactionsByWeekView.as_view(),
+        read_views.TransactionsByWeekView.as_view(),
         name="transactions_by_week",
     ),
+    path("dashboard/", read_views.DashboardView.as_view(), name="dashboard"),
     path(
         "add-transaction/", views.AddTransactionView.as_view(), name="add_transaction"
     ),
+    path(
+        "add-transactions/",
+        views.AddTransactionsView.as_view(),
+        name="add_transactions",
+    ),
+    path(
+        "import-transactions/",
+        views.ImportTransactionsView.as_view(),
+        name="import_transactions",
+    ),
     path(
         "delete-transaction/<int:id>/",
         views.DeleteTransactionView.as_view(),
         name="delete_transaction",
     ),
+    path(
+        "delete-transactions/",
+        views.DeleteTransactionsView.as_view(),
+        name="delete_transactions",
+    ),
+    path(
+        "recategorize-transactions/",
+        views.RecategorizeTransactionsView.as_view(),
+        name="recategorize_transactions",
+    ),
     path(
         "create_user_profile/",
         views.CreateUserProfileView.as_view(),
@@ -37,4 +67,6 @@ urlpatterns = [
         views.UpdateUserBudgetLimitView.as_view(),
         name="update-user-budget-limit",
     ),
+    path("internal/pool-stats/", views.PoolStatsView.as_view(), name="pool_stats"),
+    path("internal/metrics/", views.MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,34 @@
+import datetime
+
+
+def month_bounds(day):
+    """
+    Returns the half-open date range [first day of month, first day of next month).
+
+    Filtering with `date__gte`/`date__lt` on these bounds lets the database use an index
+    on `date`, unlike `date__year`/`date__month` which compile to EXTRACT() expressions.
+
+    Args:
+        day (date): Any day within the month.
+
+    Returns:
+        tuple: The first day of the month and the first day of the following month.
+    """
+    start = day.replace(day=1)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def week_bounds(day):
+    """
+    Returns the half-open date range [Monday of the week, Monday of the next week).
+
+    Args:
+        day (date): Any day within the week.
+
+    Returns:
+        tuple: The Monday of the week and the Monday of the following week.
+    """
+    start = day - datetime.timedelta(days=day.weekday())
+    return start, start + datetime.timedelta(days=7)
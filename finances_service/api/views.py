@@ -1,21 +1,23 @@
 # Standard library imports
-# No standard library imports in this snippet.
+import datetime
+import hmac
 
 # Third-party imports
 from rest_framework.exceptions import ValidationError
-from drf_yasg.utils import swagger_auto_schema
 
 # Django imports
-# No specific Django imports apart from models and views which are application-specific.
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 
 # Django REST Framework imports
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
-
+from rest_framework.parsers import MultiPartParser
 
 # Application-specific imports
+from . import cache, db_pool, metrics
+from .conditional import conditional_get
 from .models import (
     Transaction,
     UserProfile,
@@ -25,18 +27,101 @@ from .services.TransactionService import TransactionService
 from .services.TransactionsByWeekService import TransactionsByWeekService
 from .services.ExpensesByCategoriesService import ExpensesByCategoriesService
 from .services.CategoriesService import CategoriesService
-from .schemas.swagger_schemas import (
+from .services.DashboardService import DashboardService
+from .services.TransactionImportService import TransactionImportService
+from .schemas.docs import (
+    swagger_auto_schema,
     add_transaction_request_body,  # Keep this if used in other classes within this file.
+    add_transactions_request_body,
+    add_transactions_params,
+    delete_transactions_request_body,
+    recategorize_transactions_request_body,
     transaction_query_params,  # Same as above.
     delete_transaction_params,  # Same as above.
     update_user_profile_budget_limit_schema,  # Same as above.
+    import_transactions_params,
+    export_transactions_params,
+    dashboard_query_params,
+)
+from .serializers import (
+    TransactionFilterSerializer,
+    TransactionListSerializer,
+    TransactionRecategorizeSerializer,
+    TransactionSerializer,
 )
-from .serializers import TransactionSerializer
+from .pagination import parse_limit
+
+
+def parse_transaction_filters(params):
+    """
+    Extracts the name and date range filters shared by the transaction list and export.
 
+    Args:
+        params (QueryDict): The request query parameters.
+
+    Returns:
+        tuple: The name, start date and end date filters, each None when not given.
+
+    Raises:
+        ValidationError: If a date is not in YYYY-MM-DD format.
+    """
+    name = params.get("name")
+    start_date = params.get("start_date")
+    end_date = params.get("end_date")
+    name = None if name == "null" else (name or "").strip() or None
+    start_date = None if start_date in ("null", "") else start_date
+    end_date = None if end_date in ("null", "") else end_date
+    try:
+        start_date = start_date and datetime.date.fromisoformat(start_date)
+        end_date = end_date and datetime.date.fromisoformat(end_date)
+    except ValueError:
+        raise ValidationError("Dates must be in YYYY-MM-DD format")
+    return name, start_date, end_date
+
+
+def validation_error_message(error):
+    """
+    Returns the message of a ValidationError raised with a single message, e.g. by
+    parse_transaction_filters or a cursor, as a plain string.
 
-# BaseView sets common properties for all API views.
+    Args:
+        error (ValidationError): The error.
+
+    Returns:
+        str | list | dict: The message, or the detail of the error as DRF renders it
+        when it holds several messages.
+    """
+    detail = error.detail
+    if isinstance(detail, list) and len(detail) == 1:
+        return str(detail[0])
+    return detail
+
+
+def internal_token_error(request):
+    """
+    Checks the X-Internal-Token header of a request to an internal endpoint.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        Response: A 404 while INTERNAL_API_TOKEN is not set, a 403 if the token does not
+        match, otherwise None.
+    """
+    token = request.headers.get("x-internal-token", "")
+    if not settings.INTERNAL_API_TOKEN:
+        return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not hmac.compare_digest(token, settings.INTERNAL_API_TOKEN):
+        return Response(
+            {"error": "Invalid internal token"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    return None
+
+
+# BaseView sets common properties for all API views. The throttle class comes from
+# DEFAULT_THROTTLE_CLASSES (RATE_LIMITING_BACKEND).
 class BaseView(APIView):
-    throttle_classes = [ScopedRateThrottle]
     throttle_scope = "global"
 
 
@@ -79,6 +164,7 @@ class BudgetView(BaseView):
     @swagger_auto_schema(
         security=[{"User": []}]
     )  # Documenting API endpoint security requirements
+    @conditional_get(dated=True)
     def get(self, request, *args, **kwargs):
         # Extract the user ID from the request headers
         user_id = request.headers.get("user-id")
@@ -94,7 +180,12 @@ class BudgetView(BaseView):
         user_profile_service = UserProfileService()
         try:
             # Attempt to retrieve budget information using the user ID
-            data = user_profile_service.get_user_budget(user_id)
+            data = cache.get_or_compute(
+                user_id,
+                "budget",
+                lambda: user_profile_service.get_user_budget(user_id),
+                dated=True,
+            )
             return Response(
                 data, status=status.HTTP_200_OK
             )  # Successfully retrieved budget information
@@ -111,6 +202,7 @@ class TransactionsView(BaseView):
     @swagger_auto_schema(
         security=[{"User": []}], manual_parameters=transaction_query_params
     )
+    @conditional_get()
     def get(self, request, *args, **kwargs):
         user_id = request.headers.get("user-id")
         if not user_id:
@@ -122,26 +214,43 @@ class TransactionsView(BaseView):
         try:
             # Extract query parameters directly
             params = request.query_params
-            name = params.get("name")
-            start_date = params.get("start_date")
-            end_date = params.get("end_date")
-            name = None if name == "null" else name.strip() or None
-            start_date = None if start_date == "null" else start_date
-            end_date = None if end_date == "null" else end_date
-
-            # Utilize the transaction service to retrieve user transactions
+            name, start_date, end_date = parse_transaction_filters(params)
+            cursor = params.get("cursor")
+            limit = params.get("limit")
+
             transaction_service = TransactionService()
-            transactions = transaction_service.get_user_transactions(
-                user_id, name, start_date, end_date
-            )
 
-            # Serialize the transaction data for the response
-            serializer = TransactionSerializer(transactions, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # Clients that don't ask for a page keep the legacy full list during the migration
+            if (
+                cursor is None
+                and limit is None
+                and not settings.TRANSACTIONS_PAGINATION_REQUIRED
+            ):
+                # Utilize the transaction service to retrieve user transactions
+                transactions = transaction_service.get_user_transactions(
+                    user_id, name, start_date, end_date
+                )
+
+                # Serialize the transaction data for the response
+                serializer = TransactionListSerializer(transactions)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            # Fetch a single keyset page and hand back the cursor of the next one
+            transactions, next_cursor = transaction_service.get_user_transactions_page(
+                user_id, parse_limit(limit), cursor, name, start_date, end_date
+            )
+            serializer = TransactionListSerializer(transactions)
+            return Response(
+                {"results": serializer.data, "next": next_cursor},
+                status=status.HTTP_200_OK,
+            )
 
         except ValidationError as e:
             # Handle validation errors, such as incorrect dates formats
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {"error": validation_error_message(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             # Handle unexpected exceptions
             return Response(
@@ -150,6 +259,73 @@ class TransactionsView(BaseView):
             )
 
 
+class ExportTransactionsView(BaseView):
+    """
+    View for downloading all of a user's transactions as CSV or NDJSON. The rows are
+    streamed from the database in chunks, so memory use does not grow with the number
+    of transactions. Accepts the same name and date filters as the transactions list.
+    """
+
+    CONTENT_TYPES = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson",
+    }
+
+    # Whether the export is streamed as an async iterator, set by the version served
+    # under ASGI (async_views.ExportTransactionsView)
+    asynchronous = False
+
+    @swagger_auto_schema(
+        security=[{"User": []}], manual_parameters=export_transactions_params
+    )
+    def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in self.CONTENT_TYPES:
+            return Response(
+                {"error": "file_format must be csv or ndjson"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            name, start_date, end_date = parse_transaction_filters(request.query_params)
+        except ValidationError as e:
+            return Response(
+                {"error": validation_error_message(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        transaction_service = TransactionService()
+        try:
+            content = transaction_service.export_user_transactions(
+                user_id,
+                file_format,
+                name,
+                start_date,
+                end_date,
+                asynchronous=self.asynchronous,
+            )
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = StreamingHttpResponse(
+            content, content_type=self.CONTENT_TYPES[file_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="transactions.{file_format}"'
+        )
+        return response
+
+
 class ExpensesByCategoriesView(BaseView):
     """
     View responsible for retrieving and responding with expense data categorized by categories
@@ -157,6 +333,7 @@ class ExpensesByCategoriesView(BaseView):
     """
 
     @swagger_auto_schema(security=[{"User": []}])
+    @conditional_get(dated=True)
     def get(self, request, *args, **kwargs):
         # Extract the user ID from the request headers.
         user_id = request.headers.get("user-id")
@@ -172,7 +349,12 @@ class ExpensesByCategoriesView(BaseView):
         service = ExpensesByCategoriesService()
         try:
             # Attempt to retrieve expenses data for the given user.
-            expenses_data = service.get_expenses_by_categories(user_id)
+            expenses_data = cache.get_or_compute(
+                user_id,
+                "expenses_by_categories",
+                lambda: service.get_expenses_by_categories(user_id),
+                dated=True,
+            )
             return Response(expenses_data, status=status.HTTP_200_OK)
         except UserProfile.DoesNotExist:
             # If the UserProfile is not found, return a 404 Not Found response.
@@ -196,6 +378,7 @@ class TransactionsByWeekView(BaseView):
     """
 
     @swagger_auto_schema(security=[{"User": []}])
+    @conditional_get(dated=True)
     def get(self, request, *args, **kwargs):
         # Extract the user ID from request headers
         user_id = request.headers.get("user-id")
@@ -208,7 +391,12 @@ class TransactionsByWeekView(BaseView):
         transactions_by_week_service = TransactionsByWeekService()
         try:
             # Attempt to retrieve and return the transaction summary
-            data = transactions_by_week_service.get_transactions_by_week(user_id)
+            data = cache.get_or_compute(
+                user_id,
+                "transactions_by_week",
+                lambda: transactions_by_week_service.get_transactions_by_week(user_id),
+                dated=True,
+            )
             return Response(data, status=status.HTTP_200_OK)
         except UserProfile.DoesNotExist:
             # Handle case where user profile is not found
@@ -223,6 +411,59 @@ class TransactionsByWeekView(BaseView):
             )
 
 
+class DashboardView(BaseView):
+    """
+    View returning the budget, expenses-by-categories and transactions-by-week payloads in
+    one response, built from a single read of the user's data. Each section matches the
+    response of its standalone endpoint; `sections` selects a comma-separated subset.
+    """
+
+    @swagger_auto_schema(
+        security=[{"User": []}], manual_parameters=dashboard_query_params
+    )
+    @conditional_get(dated=True)
+    def get(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        # Parse the requested sections, defaulting to all of them
+        raw_sections = request.query_params.get("sections")
+        if raw_sections:
+            sections = sorted({section.strip() for section in raw_sections.split(",")})
+        else:
+            sections = list(DashboardService.SECTIONS)
+        unknown = [name for name in sections if name not in DashboardService.SECTIONS]
+        if unknown:
+            return Response(
+                {"error": f"Unknown sections: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        dashboard_service = DashboardService()
+        try:
+            data = cache.get_or_compute(
+                user_id,
+                "dashboard:" + ",".join(sections),
+                lambda: dashboard_service.get_dashboard(user_id, sections),
+                dated=True,
+            )
+            return Response(data, status=status.HTTP_200_OK)
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            # Handle unexpected exceptions
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class AddTransactionView(BaseView):
 
     @swagger_auto_schema(
@@ -260,6 +501,138 @@ class AddTransactionView(BaseView):
             )
 
 
+class AddTransactionsView(BaseView):
+    """
+    View for adding a batch of transactions in one request, e.g. entries recorded offline.
+    The body is a JSON array of transactions as accepted by add-transaction/, at most
+    TRANSACTION_BATCH_MAX_SIZE of them.
+
+    With `mode=atomic` (default) any invalid transaction rejects the batch with a 400
+    listing the errors by index. With `mode=best_effort` the valid transactions are added
+    and the invalid ones are reported.
+    """
+
+    MODES = ("atomic", "best_effort")
+
+    @swagger_auto_schema(
+        security=[{"User": []}],
+        request_body=add_transactions_request_body,
+        manual_parameters=add_transactions_params,
+    )
+    def post(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        mode = request.query_params.get("mode", "atomic")
+        if mode not in self.MODES:
+            return Response(
+                {"error": f"mode must be one of: {', '.join(self.MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        transaction_service = TransactionService()
+        try:
+            transactions, errors = transaction_service.add_transactions(
+                user_id, request.data, atomic=mode == "atomic"
+            )
+            if errors and mode == "atomic":
+                return Response({"error": errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {
+                    "created": TransactionSerializer(transactions, many=True).data,
+                    "errors": errors,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            # Handle unexpected exceptions
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ImportTransactionsView(BaseView):
+    """
+    View for importing many transactions at once, e.g. from a bank export. The upload is
+    either the raw request body (Content-Type text/csv or application/x-ndjson) or a
+    multipart `file` field whose name ends in .csv, .ndjson or .jsonl.
+    """
+
+    CONTENT_TYPE_FORMATS = {
+        "text/csv": "csv",
+        "application/x-ndjson": "ndjson",
+        "application/ndjson": "ndjson",
+        "application/jsonl": "ndjson",
+    }
+    EXTENSION_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+    # Raw CSV/NDJSON bodies are read from request.stream, so only multipart needs a parser
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        security=[{"User": []}], manual_parameters=import_transactions_params
+    )
+    def post(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        # Pick the upload source without reading it into memory
+        content_type = request.content_type.split(";")[0].strip().lower()
+        if content_type == "multipart/form-data":
+            upload = request.FILES.get("file")
+            if upload is None:
+                return Response(
+                    {"error": "A file is required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            extension = upload.name[upload.name.rfind(".") :].lower()
+            import_format = self.EXTENSION_FORMATS.get(extension)
+            lines = upload
+        else:
+            import_format = self.CONTENT_TYPE_FORMATS.get(content_type)
+            lines = request.stream or []
+
+        if import_format is None:
+            return Response(
+                {"error": "Upload must be CSV or NDJSON"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        import_service = TransactionImportService()
+        try:
+            report = import_service.import_transactions(user_id, lines, import_format)
+            return Response(report, status=status.HTTP_200_OK)
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ValidationError as e:
+            return Response(
+                {"error": validation_error_message(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            # Handle unexpected exceptions
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class UpdateUserBudgetLimitView(BaseView):
     """
     View for updating the budget limit of a user's profile. This view expects a user ID
@@ -347,6 +720,95 @@ class DeleteTransactionView(BaseView):
         )
 
 
+class DeleteTransactionsView(BaseView):
+    """
+    View for deleting every transaction of a user that matches the filters in the JSON
+    body (ids, start_date, end_date, name, category_id). The response reports the number
+    of deleted transactions.
+    """
+
+    @swagger_auto_schema(
+        security=[{"User": []}], request_body=delete_transactions_request_body
+    )
+    def post(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        serializer = TransactionFilterSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        transaction_service = TransactionService()
+        try:
+            deleted = transaction_service.delete_transactions(
+                user_id, serializer.validated_data
+            )
+            return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            # Handle unexpected exceptions
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RecategorizeTransactionsView(BaseView):
+    """
+    View for moving every transaction of a user that matches the filters in the JSON body
+    to the category `new_category_id`. The response reports the number of transactions
+    that changed category.
+    """
+
+    @swagger_auto_schema(
+        security=[{"User": []}], request_body=recategorize_transactions_request_body
+    )
+    def post(self, request, *args, **kwargs):
+        user_id = request.headers.get("user-id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        serializer = TransactionRecategorizeSerializer(
+            data=request.data,
+            context={"category_names": CategoriesService().get_category_names()},
+        )
+        if not serializer.is_valid():
+            return Response(
+                {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = dict(serializer.validated_data)
+        category = filters.pop("new_category_id")
+        transaction_service = TransactionService()
+        try:
+            updated = transaction_service.recategorize_transactions(
+                user_id, filters, category
+            )
+            return Response({"updated": updated}, status=status.HTTP_200_OK)
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "UserProfile does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            # Handle unexpected exceptions
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class CategoriesView(BaseView):
     """
     A view that handles requests for retrieving all categories available in the system.
@@ -359,7 +821,9 @@ class CategoriesView(BaseView):
 
         # Fetch all categories using the service
         try:
-            categories = categories_service.get_all_categories()
+            categories = cache.get_or_compute(
+                None, "categories", categories_service.get_all_categories
+            )
         except Exception as e:
             # Handle unexpected exceptions
             return Response(
@@ -368,3 +832,38 @@ class CategoriesView(BaseView):
 
         # Return the list of categories with a 200 OK status
         return Response(categories, status=status.HTTP_200_OK)
+
+
+class PoolStatsView(BaseView):
+    """
+    Internal view reporting the database connection usage of the worker process that
+    serves the request. Requires the X-Internal-Token header to match INTERNAL_API_TOKEN
+    and is hidden (404) while no token is configured.
+    """
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request, *args, **kwargs):
+        error = internal_token_error(request)
+        if error is not None:
+            return error
+        return Response(db_pool.pool_stats(), status=status.HTTP_200_OK)
+
+
+class MetricsView(BaseView):
+    """
+    Internal view exporting the request metrics of all the worker processes (see
+    api/metrics.py) in the Prometheus text format. Requires the
+    X-Internal-Token header like PoolStatsView.
+    """
+
+    # Scrapes are regular and authenticated; they must not use up or hit the rate limit
+    throttle_classes = []
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request, *args, **kwargs):
+        error = internal_token_error(request)
+        if error is not None:
+            return error
+        return HttpResponse(
+            metrics.export(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,289 @@
+"""
+Compares the read endpoints served by sync views under WSGI (gunicorn threads) with the
+async views under ASGI (gunicorn + uvicorn workers).
+
+For every server mode and concurrency level the script starts the server, opens that many
+keep-alive connections and has each of them send GET requests back to back for the given
+duration, then reports throughput and latency percentiles. The load generator is a single
+asyncio process, so at high concurrency run it on a different machine (--url) when the
+numbers are close to what one CPU can drive.
+
+Usage (from the finances_service directory):
+    python benchmarks/asgi_vs_wsgi.py
+    python benchmarks/asgi_vs_wsgi.py --concurrency 50,200 --duration 10 --path /api/finances/budget/
+    python benchmarks/asgi_vs_wsgi.py --client-delay 0.2
+    python benchmarks/asgi_vs_wsgi.py --modes asgi --url http://10.0.0.2:8000
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SERVER_COMMANDS = {
+    "wsgi": lambda args: [
+        "gunicorn",
+        "finances_service.wsgi:application",
+        "--workers",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "--worker-class",
+        "gthread",
+    ],
+    "asgi": lambda args: [
+        "gunicorn",
+        "finances_service.asgi:application",
+        "--workers",
+        str(args.workers),
+        "--worker-class",
+        "uvicorn_worker.UvicornWorker",
+    ],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--concurrency", default="50,200,1000")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per run")
+    parser.add_argument("--path", default="/api/finances/dashboard/")
+    parser.add_argument("--user-id", default="benchmark-user")
+    parser.add_argument("--transactions", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--threads", type=int, default=8, help="threads per WSGI worker"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--url", help="benchmark an already running server instead of starting one"
+    )
+    parser.add_argument(
+        "--client-delay",
+        type=float,
+        default=0.0,
+        help="seconds each client pauses halfway through sending a request (slow clients)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="keep the response cache on (by default every request reads the database)",
+    )
+    return parser.parse_args()
+
+
+def server_env(args, mode):
+    env = dict(os.environ)
+    # The benchmark must not be cut short by the per-IP rate limit
+    env["RATE_LIMITING"] = "100000000/second"
+    env["ASYNC_READ_VIEWS"] = "true" if mode == "asgi" else "false"
+    if not args.cache:
+        env["FINANCES_CACHE_ENABLED"] = "false"
+    return env
+
+
+def request(base_url, method, path, user_id, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        base_url + path,
+        data=data,
+        method=method,
+        headers={"user-id": user_id, "Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(base_url, "GET", "/api/finances/categories/", "")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def seed(base_url, user_id, count):
+    """
+    Creates the benchmark user and its transactions through the API, once.
+    """
+    status, _ = request(base_url, "POST", "/api/finances/create_user_profile/", user_id)
+    if status != 201:
+        return  # Already seeded by a previous run
+    _, body = request(base_url, "GET", "/api/finances/categories/", user_id)
+    categories = [category["id"] for category in json.loads(body)]
+    if not categories:
+        sys.exit("No categories: load basic_db.sql or create some categories first.")
+    today = datetime.date.today()
+    for i in range(count):
+        request(
+            base_url,
+            "POST",
+            "/api/finances/add-transaction/",
+            user_id,
+            {
+                "name": f"Benchmark {i}",
+                "date": (today - datetime.timedelta(days=i % 28)).isoformat(),
+                "amount": f"{(i % 50) + 1}.99",
+                "type": "Expense" if i % 4 else "Income",
+                "category_id": categories[i % len(categories)],
+                "from_account": "Benchmark",
+            },
+        )
+
+
+async def connection_loop(
+    host, port, raw_request, client_delay, deadline, latencies, errors
+):
+    reader = writer = None
+    head, tail = (
+        raw_request[: len(raw_request) // 2],
+        raw_request[len(raw_request) // 2 :],
+    )
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            if client_delay:
+                # A slow client: the server has to wait for the rest of the request
+                writer.write(head)
+                await writer.drain()
+                await asyncio.sleep(client_delay)
+                writer.write(tail)
+            else:
+                writer.write(raw_request)
+            # Latency is measured from the last request byte to the last response byte
+            started = time.perf_counter()
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if not status_line.startswith(b"HTTP/1.1 200"):
+                errors.append(status_line.strip())
+                continue
+            latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(repr(e))
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(base_url, path, user_id, concurrency, duration, client_delay):
+    host, port = base_url.split("://", 1)[1].split(":")
+    raw_request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nuser-id: {user_id}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode()
+    latencies, errors = [], []
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            connection_loop(
+                host, int(port), raw_request, client_delay, deadline, latencies, errors
+            )
+            for _ in range(concurrency)
+        )
+    )
+    # Requests in flight at the deadline still complete, so use the actual elapsed time
+    return latencies, errors, time.monotonic() - started
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(mode, concurrency, elapsed, latencies, errors):
+    print(
+        f"{mode:<5} {concurrency:>6} {len(latencies):>9} "
+        f"{len(latencies) / elapsed:>9.1f} "
+        f"{statistics.median(latencies) * 1000 if latencies else float('nan'):>9.1f} "
+        f"{percentile(latencies, 0.99) * 1000:>9.1f} {len(errors):>7}",
+        flush=True,
+    )
+
+
+def main():
+    args = parse_args()
+    concurrency_levels = [int(value) for value in args.concurrency.split(",")]
+
+    # Every connection needs a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < max(concurrency_levels) * 2 + 100:
+        print(f"warning: open file limit {hard} is low for this concurrency")
+
+    if not args.url:
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--noinput", "-v0"],
+            cwd=PROJECT_DIR,
+            check=True,
+        )
+
+    print(
+        f"{'mode':<5} {'conns':>6} {'requests':>9} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    )
+    for mode in args.modes.split(","):
+        server = None
+        base_url = args.url or f"http://127.0.0.1:{args.port}"
+        if not args.url:
+            server = subprocess.Popen(
+                SERVER_COMMANDS[mode](args)
+                + ["--bind", f"127.0.0.1:{args.port}", "--log-level", "warning"],
+                cwd=PROJECT_DIR,
+                env=server_env(args, mode),
+            )
+        try:
+            wait_until_up(base_url)
+            seed(base_url, args.user_id, args.transactions)
+            for concurrency in concurrency_levels:
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(
+                        base_url,
+                        args.path,
+                        args.user_id,
+                        concurrency,
+                        args.duration,
+                        args.client_delay,
+                    )
+                )
+                report(mode, concurrency, elapsed, latencies, errors)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
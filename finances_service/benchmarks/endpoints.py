@@ -0,0 +1,787 @@
+"""
+Times every API route and every public service method on a synthetic dataset, reporting
+throughput, latency percentiles and query counts as JSON to compare between commits.
+
+The script seeds a throwaway test database with api.seeding: --users users with
+--transactions transactions each, dated over the last year with a skew towards recent
+days and spread unevenly over --categories categories named after basic_db.sql. Every
+case then runs --warmup untimed and --iterations timed times, rotating over the users,
+and once more under CaptureQueriesContext to count its queries. The read cases run
+first, so they all see the seeded dataset; the delete cases remove rows they created
+beforehand.
+
+Routes are called through Django's test client, so their timings include the middleware,
+throttling, content negotiation and rendering but not a server or the network (see
+asgi_vs_wsgi.py for those). Routes and service methods without a case are listed as
+warnings, so new ones are not silently left out of the baseline.
+
+Runs on SQLite without any other service; set SQL_ENGINE and the other SQL_* variables
+to benchmark PostgreSQL.
+
+Usage (from the finances_service directory):
+    python benchmarks/endpoints.py --output before.json
+    python benchmarks/endpoints.py --output after.json --compare before.json
+    python benchmarks/endpoints.py --users 50 --transactions 5000 --only route:
+    python benchmarks/endpoints.py --cache --async-views --only route:budget,route:dashboard
+"""
+
+import argparse
+import datetime
+import importlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import pkgutil
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+INTERNAL_TOKEN = "benchmark-token"
+# Rows created by each call of the batch cases
+BATCH_SIZE = 20
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument(
+        "--transactions", type=int, default=1000, help="transactions per user"
+    )
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the dataset")
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="timed runs per case"
+    )
+    parser.add_argument("--warmup", type=int, default=20, help="untimed runs per case")
+    parser.add_argument(
+        "--only", help="comma-separated case name prefixes, e.g. route:,service:Rollup"
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="a previous JSON report to compare with")
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the response cache enabled"
+    )
+    parser.add_argument(
+        "--async-views", action="store_true", help="route reads to the async views"
+    )
+    args = parser.parse_args()
+    if args.iterations < 2:
+        parser.error("--iterations must be at least 2")
+    return args
+
+
+def setup_django(args):
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "finances_service.settings")
+    # The benchmark client would hit the rate limit within a second
+    os.environ["RATE_LIMITING"] = "1000000000/second"
+    os.environ["INTERNAL_API_TOKEN"] = INTERNAL_TOKEN
+    # Cached reads would only time the cache; --cache measures exactly that
+    os.environ["FINANCES_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["ASYNC_READ_VIEWS"] = "true" if args.async_views else "false"
+    import django
+
+    django.setup()
+
+
+class Case:
+    """
+    One benchmarked operation. `run` is called with the iteration number; `prepare` with
+    the number of calls ahead, before any of them.
+    """
+
+    def __init__(self, name, run, write=False, prepare=None):
+        self.name = name
+        self.run = run
+        self.write = write
+        self.prepare = prepare
+
+
+class Dataset:
+    """
+    The seeded users and categories, and helpers building request data from them.
+    """
+
+    def __init__(self, seeded):
+        self.user_ids = seeded["user_ids"]
+        self.category_ids = seeded["category_ids"]
+        self.counter = itertools.count()
+
+    def user(self, i):
+        return self.user_ids[i % len(self.user_ids)]
+
+    def rows(self, user_id, count):
+        """
+        Returns `count` new transactions of a user in the API format. Every call returns
+        different names, so imports never skip them as duplicates.
+        """
+        from api.seeding import transaction_rows
+
+        n = next(self.counter)
+        return [
+            {
+                "name": f"{row['name']} #{n}-{index}",
+                "date": row["date"].isoformat(),
+                "amount": str(row["amount"]),
+                "type": row["type"],
+                "category_id": row["category_id"],
+                "from_account": row["from_account"],
+                "note": row["note"],
+            }
+            for index, row in enumerate(
+                transaction_rows([user_id], count, self.category_ids, seed=n)
+            )
+        ]
+
+    def csv(self, user_id, count):
+        import csv
+        import io
+
+        rows = self.rows(user_id, count)
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue().encode()
+
+    def day(self, i):
+        # A recent day, where most transactions are
+        return datetime.date.today() - datetime.timedelta(days=i % 30)
+
+    def pool(self, per_call):
+        """
+        Returns a `prepare` hook creating `per_call` transactions for each coming call,
+        and a function returning the IDs of call `i`, all owned by `self.user(i)`.
+        """
+        from api.services.TransactionService import TransactionService
+
+        pools = {}
+
+        def prepare(calls):
+            from django.conf import settings
+
+            pools.clear()
+            calls_by_user = {}
+            for i in range(calls):
+                calls_by_user.setdefault(self.user(i), []).append(i)
+            for user_id, indexes in calls_by_user.items():
+                ids = []
+                rows = self.rows(user_id, len(indexes) * per_call)
+                step = settings.TRANSACTION_BATCH_MAX_SIZE
+                for start in range(0, len(rows), step):
+                    created, errors = TransactionService().add_transactions(
+                        user_id, rows[start : start + step]
+                    )
+                    if errors:
+                        raise RuntimeError(errors)
+                    ids.extend(transaction.id for transaction in created)
+                for position, i in enumerate(indexes):
+                    pools[i] = ids[position * per_call : (position + 1) * per_call]
+
+        return prepare, pools.__getitem__
+
+
+def route_cases(dataset):
+    """
+    Returns the cases of the API routes, named "route:<URL name>".
+    """
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+
+    def call(method, name, expected, user_id, kwargs=None, **options):
+        response = getattr(client, method)(
+            reverse(name, kwargs=kwargs),
+            headers={"user-id": user_id, **options.pop("headers", {})},
+            **options,
+        )
+        if response.status_code != expected:
+            body = b"" if response.streaming else response.content[:500]
+            raise RuntimeError(f"{name}: {response.status_code} {body!r}")
+        if response.streaming:
+            # Streamed bodies are built while they are read
+            b"".join(response.streaming_content)
+
+    def get(name, **options):
+        return Case(
+            f"route:{name}",
+            lambda i: call("get", name, 200, dataset.user(i), **options),
+        )
+
+    def post_json(name, expected, data, **options):
+        return lambda i: call(
+            "post",
+            name,
+            expected,
+            dataset.user(i),
+            data=json.dumps(data(i)),
+            content_type="application/json",
+            **options,
+        )
+
+    prepare_delete, ids_to_delete = dataset.pool(1)
+    prepare_bulk_delete, bulk_ids_to_delete = dataset.pool(BATCH_SIZE)
+
+    return [
+        get("budget"),
+        get("transactions"),
+        Case(
+            "route:transactions[page]",
+            lambda i: call(
+                "get", "transactions", 200, dataset.user(i), data={"limit": 50}
+            ),
+        ),
+        get("export_transactions", data={"file_format": "csv"}),
+        get("categories"),
+        get("expenses_by_categories"),
+        get("transactions_by_week"),
+        get("dashboard"),
+        get("pool_stats", headers={"x-internal-token": INTERNAL_TOKEN}),
+        get("metrics", headers={"x-internal-token": INTERNAL_TOKEN}),
+        Case(
+            "route:add_transaction",
+            post_json(
+                "add_transaction", 201, lambda i: dataset.rows(dataset.user(i), 1)[0]
+            ),
+            write=True,
+        ),
+        Case(
+            "route:add_transactions",
+            post_json(
+                "add_transactions",
+                201,
+                lambda i: dataset.rows(dataset.user(i), BATCH_SIZE),
+            ),
+            write=True,
+        ),
+        Case(
+            "route:import_transactions",
+            lambda i: call(
+                "post",
+                "import_transactions",
+                200,
+                dataset.user(i),
+                data=dataset.csv(dataset.user(i), BATCH_SIZE),
+                content_type="text/csv",
+            ),
+            write=True,
+        ),
+        Case(
+            "route:delete_transaction",
+            lambda i: call(
+                "delete",
+                "delete_transaction",
+                204,
+                dataset.user(i),
+                kwargs={"id": ids_to_delete(i)[0]},
+            ),
+            write=True,
+            prepare=prepare_delete,
+        ),
+        Case(
+            "route:delete_transactions",
+            post_json(
+                "delete_transactions", 200, lambda i: {"ids": bulk_ids_to_delete(i)}
+            ),
+            write=True,
+            prepare=prepare_bulk_delete,
+        ),
+        Case(
+            "route:recategorize_transactions",
+            post_json(
+                "recategorize_transactions",
+                200,
+                lambda i: {
+                    "start_date": dataset.day(i).isoformat(),
+                    "end_date": dataset.day(i).isoformat(),
+                    "new_category_id": dataset.category_ids[
+                        i % len(dataset.category_ids)
+                    ],
+                },
+            ),
+            write=True,
+        ),
+        Case(
+            "route:create_user_profile",
+            lambda i: call(
+                "post",
+                "create_user_profile",
+                201,
+                f"benchmark-new-user-{next(dataset.counter)}",
+            ),
+            write=True,
+        ),
+        Case(
+            "route:update-user-budget-limit",
+            lambda i: call(
+                "patch",
+                "update-user-budget-limit",
+                200,
+                dataset.user(i),
+                data=json.dumps({"budget_limit": str(1000 + i % 500)}),
+                content_type="application/json",
+            ),
+            write=True,
+        ),
+    ]
+
+
+def service_cases(dataset):
+    """
+    Returns the cases of the public service methods, named "service:<Class>.<method>".
+    Async methods run through async_to_sync and lazy results are consumed, so every
+    case includes its queries.
+    """
+    from asgiref.sync import async_to_sync
+    from django.db import transaction as db_transaction
+
+    from api.models import Category, Transaction, TransactionType, UserProfile
+    from api.services.CategoriesService import CategoriesService
+    from api.services.DashboardService import DashboardService
+    from api.services.ExpensesByCategoriesService import ExpensesByCategoriesService
+    from api.services.RollupService import RollupService
+    from api.services.TransactionImportService import TransactionImportService
+    from api.services.TransactionService import TransactionService
+    from api.services.TransactionsByWeekService import TransactionsByWeekService
+    from api.services.UserProfileService import UserProfileService
+
+    user = dataset.user
+    categories = dataset.category_ids
+    category_names = list(Category.objects.values_list("name", flat=True))
+    profiles = {
+        profile.user_id: profile
+        for profile in UserProfile.objects.filter(user_id__in=dataset.user_ids)
+    }
+
+    def case(name, run, **options):
+        return Case(f"service:{name}", run, **options)
+
+    def rolled_back(run):
+        # For writes that would otherwise change the seeded totals
+        def wrapper(i):
+            with db_transaction.atomic():
+                run(i)
+                db_transaction.set_rollback(True)
+
+        return wrapper
+
+    def deltas(i):
+        return {
+            (
+                dataset.day(i),
+                categories[i % len(categories)],
+                TransactionType.EXPENSE,
+            ): (
+                Decimal("12.50"),
+                1,
+            )
+        }
+
+    def unsaved_transaction(i):
+        return Transaction(
+            owner_id=user(i),
+            date=dataset.day(i),
+            amount=Decimal("12.50"),
+            type=TransactionType.EXPENSE,
+            category_id=categories[i % len(categories)],
+        )
+
+    transactions = TransactionService()
+    prepare_delete, ids_to_delete = dataset.pool(1)
+    prepare_bulk_delete, bulk_ids_to_delete = dataset.pool(BATCH_SIZE)
+    import_service = TransactionImportService()
+    import_row = {
+        key: "" if value is None else str(value)
+        for key, value in dataset.rows(user(0), 1)[0].items()
+    }
+    rollups = RollupService()
+    expenses = ExpensesByCategoriesService()
+    week = TransactionsByWeekService()
+    profile_service = UserProfileService()
+
+    return [
+        case(
+            "CategoriesService.get_all_categories",
+            lambda i: CategoriesService().get_all_categories(),
+        ),
+        case(
+            "CategoriesService.get_category_names",
+            lambda i: CategoriesService().get_category_names(),
+        ),
+        case(
+            "CategoriesService.aget_all_categories",
+            lambda i: async_to_sync(CategoriesService().aget_all_categories)(),
+        ),
+        case(
+            "DashboardService.get_dashboard",
+            lambda i: DashboardService().get_dashboard(user(i)),
+        ),
+        case(
+            "DashboardService.aget_dashboard",
+            lambda i: async_to_sync(DashboardService().aget_dashboard)(user(i)),
+        ),
+        case(
+            "ExpensesByCategoriesService.get_expenses_by_categories",
+            lambda i: expenses.get_expenses_by_categories(user(i)),
+        ),
+        case(
+            "ExpensesByCategoriesService.aget_expenses_by_categories",
+            lambda i: async_to_sync(expenses.aget_expenses_by_categories)(user(i)),
+        ),
+        case(
+            "ExpensesByCategoriesService.build_expenses_by_categories",
+            lambda i: expenses.build_expenses_by_categories(
+                (name, Decimal("100.00")) for name in category_names
+            ),
+        ),
+        case(
+            "ExpensesByCategoriesService.generate_purple_shades",
+            lambda i: expenses.generate_purple_shades(len(category_names)),
+        ),
+        case(
+            "RollupService.expected_totals",
+            lambda i: list(rollups.expected_totals(user(i))),
+        ),
+        case("RollupService.find_drift", lambda i: rollups.find_drift(user(i))),
+        case(
+            "TransactionImportService.validate_row",
+            lambda i: import_service.validate_row(import_row, set(categories)),
+        ),
+        case(
+            "TransactionService.get_user_transactions",
+            lambda i: list(transactions.get_user_transactions(user(i))),
+        ),
+        case(
+            "TransactionService.get_user_transactions_page",
+            lambda i: transactions.get_user_transactions_page(user(i), 50),
+        ),
+        case(
+            "TransactionService.aget_user_transactions",
+            lambda i: async_to_sync(transactions.aget_user_transactions)(user(i)),
+        ),
+        case(
+            "TransactionService.aget_user_transactions_page",
+            lambda i: async_to_sync(transactions.aget_user_transactions_page)(
+                user(i), 50
+            ),
+        ),
+        case(
+            "TransactionService.export_user_transactions",
+            lambda i: "".join(transactions.export_user_transactions(user(i), "csv")),
+        ),
+        case(
+            "TransactionsByWeekService.get_transactions_by_week",
+            lambda i: week.get_transactions_by_week(user(i)),
+        ),
+        case(
+            "TransactionsByWeekService.aget_transactions_by_week",
+            lambda i: async_to_sync(week.aget_transactions_by_week)(user(i)),
+        ),
+        case(
+            "TransactionsByWeekService.build_days",
+            lambda i: week.build_days(
+                (weekday, Decimal("10.00"), Decimal("20.00")) for weekday in range(1, 8)
+            ),
+        ),
+        case(
+            "UserProfileService.get_user_budget",
+            lambda i: profile_service.get_user_budget(user(i)),
+        ),
+        case(
+            "UserProfileService.aget_user_budget",
+            lambda i: async_to_sync(profile_service.aget_user_budget)(user(i)),
+        ),
+        case(
+            "UserProfileService.build_budget",
+            lambda i: profile_service.build_budget(profiles[user(i)], Decimal("10.00")),
+        ),
+        case(
+            "RollupService.record",
+            rolled_back(lambda i: rollups.record(unsaved_transaction(i))),
+            write=True,
+        ),
+        case(
+            "RollupService.apply",
+            rolled_back(lambda i: rollups.apply(user(i), deltas(i))),
+            write=True,
+        ),
+        case(
+            "RollupService.apply_bulk",
+            rolled_back(lambda i: rollups.apply_bulk(user(i), deltas(i))),
+            write=True,
+        ),
+        case("RollupService.rebuild", lambda i: rollups.rebuild(user(i)), write=True),
+        case(
+            "RollupService.rebuild_users",
+            lambda i: rollups.rebuild_users(dataset.user_ids),
+            write=True,
+        ),
+        case(
+            "TransactionImportService.import_transactions",
+            lambda i: import_service.import_transactions(
+                user(i),
+                dataset.csv(user(i), BATCH_SIZE).splitlines(keepends=True),
+                "csv",
+            ),
+            write=True,
+        ),
+        case(
+            "TransactionService.add_transaction",
+            lambda i: transactions.add_transaction(
+                user(i), dataset.rows(user(i), 1)[0]
+            ),
+            write=True,
+        ),
+        case(
+            "TransactionService.add_transactions",
+            lambda i: transactions.add_transactions(
+                user(i), dataset.rows(user(i), BATCH_SIZE)
+            ),
+            write=True,
+        ),
+        case(
+            "TransactionService.delete_transaction",
+            lambda i: transactions.delete_transaction(ids_to_delete(i)[0], user(i)),
+            write=True,
+            prepare=prepare_delete,
+        ),
+        case(
+            "TransactionService.delete_transactions",
+            lambda i: transactions.delete_transactions(
+                user(i), {"ids": bulk_ids_to_delete(i)}
+            ),
+            write=True,
+            prepare=prepare_bulk_delete,
+        ),
+        case(
+            "TransactionService.recategorize_transactions",
+            lambda i: transactions.recategorize_transactions(
+                user(i),
+                {"start_date": dataset.day(i), "end_date": dataset.day(i)},
+                Category(id=categories[i % len(categories)]),
+            ),
+            write=True,
+        ),
+        case(
+            "UserProfileService.create_user_profile",
+            lambda i: profile_service.create_user_profile(
+                f"benchmark-new-profile-{next(dataset.counter)}"
+            ),
+            write=True,
+        ),
+        case(
+            "UserProfileService.update_user_budget_limit",
+            lambda i: profile_service.update_user_budget_limit(
+                user(i), Decimal(1000 + i % 500)
+            ),
+            write=True,
+        ),
+    ]
+
+
+def uncovered(cases):
+    """
+    Returns the routes and public service methods that no case covers.
+    """
+    import api.services
+    from api.urls import urlpatterns
+
+    names = {case.name.split("[")[0] for case in cases}
+    missing = [
+        f"route:{pattern.name}"
+        for pattern in urlpatterns
+        if f"route:{pattern.name}" not in names
+    ]
+    for module in pkgutil.iter_modules(api.services.__path__):
+        service = getattr(
+            importlib.import_module(f"api.services.{module.name}"), module.name, None
+        )
+        if service is None:
+            continue
+        for method, _ in inspect.getmembers(service, inspect.isfunction):
+            name = f"service:{module.name}.{method}"
+            if not method.startswith("_") and name not in names:
+                missing.append(name)
+    return missing
+
+
+def measure(case, iterations, warmup):
+    """
+    Runs a case and returns its statistics: throughput, latency percentiles in
+    milliseconds and the number of queries of one call.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    if case.prepare:
+        case.prepare(warmup + iterations + 1)
+    for i in range(warmup):
+        case.run(i)
+
+    samples = []
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        case.run(i)
+        samples.append(time.perf_counter() - started)
+
+    with CaptureQueriesContext(connection) as queries:
+        case.run(warmup + iterations)
+
+    percentiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / sum(samples), 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(percentiles[49] * 1000, 4),
+        "p95_ms": round(percentiles[94] * 1000, 4),
+        "p99_ms": round(percentiles[98] * 1000, 4),
+        "queries": len(queries.captured_queries),
+    }
+
+
+def git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args, seeded):
+    import django
+    from django.conf import settings
+    from django.db import connection
+
+    status = git("status", "--porcelain")
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "database": connection.vendor,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "dataset": {
+            "users": args.users,
+            "transactions_per_user": args.transactions,
+            "categories": args.categories,
+            "transactions": seeded["transactions"],
+            "seed": args.seed,
+        },
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "settings": {
+            "cache": settings.FINANCES_CACHE_ENABLED,
+            "async_read_views": settings.ASYNC_READ_VIEWS,
+            "rollups": settings.TRANSACTION_ROLLUPS_ENABLED,
+            "json_renderer": settings.JSON_RENDERER,
+        },
+    }
+
+
+def print_comparison(previous, current):
+    print(f"\n{'case':<64}{'p50 ms':>18}{'change':>9}{'ops/s':>20}{'queries':>10}")
+    for name, result in current.items():
+        old = previous.get(name)
+        if old is None:
+            print(f"{name:<64}{'new':>18}")
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        queries = f"{old['queries']}>{result['queries']}"
+        print(
+            f"{name:<64}{old['p50_ms']:>8.3f} > {result['p50_ms']:<7.3f}{change:>+8.1f}%"
+            f"{old['ops_per_sec']:>9,.0f} > {result['ops_per_sec']:<8,.0f}"
+            f"{queries if old['queries'] != result['queries'] else '':>10}"
+        )
+    for name in previous.keys() - current.keys():
+        print(f"{name:<64}{'removed':>18}")
+
+
+def main():
+    args = parse_args()
+    setup_django(args)
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from api.seeding import seed_dataset
+
+    prefixes = tuple(args.only.split(",")) if args.only else ("",)
+    previous = None
+    if args.compare:
+        compared = json.loads(Path(args.compare).read_text())
+        previous = {
+            name: result
+            for name, result in compared["results"].items()
+            if name.startswith(prefixes)
+        }
+
+    # DEBUG would record every query in connection.queries
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        started = time.perf_counter()
+        seeded = seed_dataset(
+            users=args.users,
+            transactions_per_user=args.transactions,
+            categories=args.categories,
+            seed=args.seed,
+        )
+        print(
+            f"database: {connection.vendor}, seeded {seeded['transactions']:,} "
+            f"transactions in {time.perf_counter() - started:.1f}s"
+        )
+
+        dataset = Dataset(seeded)
+        cases = route_cases(dataset) + service_cases(dataset)
+        for name in uncovered(cases):
+            print(f"warning: no benchmark case for {name}", file=sys.stderr)
+        cases = [case for case in cases if case.name.startswith(prefixes)]
+        # Reads first, so they all see the seeded dataset
+        cases.sort(key=lambda case: case.write)
+
+        print(
+            f"{'case':<64}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}"
+        )
+        results = {}
+        for case in cases:
+            result = measure(case, args.iterations, args.warmup)
+            results[case.name] = result
+            print(
+                f"{case.name:<64}{result['ops_per_sec']:>10,.0f}{result['p50_ms']:>10.3f}"
+                f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                f"{result['queries']:>9}"
+            )
+
+        report = {"meta": metadata(args, seeded), "results": results}
+        if previous is not None:
+            for key in ("database", "dataset", "settings"):
+                if compared["meta"][key] != report["meta"][key]:
+                    print(
+                        f"warning: the compared report has a different {key}",
+                        file=sys.stderr,
+                    )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if previous is not None:
+        print_comparison(previous, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares the response renderers on the output of the transactions endpoint: DRF's
+JSONRenderer (stdlib json), ORJSONRenderer and MessagePackRenderer.
+
+For every size the script creates a user with that many transactions in a throwaway test
+database (like transaction_serializers.py), builds the TransactionsView payload once and
+times rendering it. It reports the encode time, the payload size and the gzipped size.
+
+Usage (from the finances_service directory):
+    python benchmarks/renderers.py
+    python benchmarks/renderers.py --rows 100,1000 --repeat 20
+"""
+
+import argparse
+import gzip
+import time
+
+from transaction_serializers import USER_ID, seed, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", default="1000,10000,100000")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timed runs per size, the best is kept"
+    )
+    return parser.parse_args()
+
+
+def measure(renderer, data, repeat):
+    """
+    Returns the best encode time in milliseconds and the encoded payload.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = renderer.render(data, renderer.media_type, {})
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, body
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from rest_framework.renderers import JSONRenderer
+
+    from api.renderers import MessagePackRenderer, ORJSONRenderer
+    from api.serializers import TransactionListSerializer
+    from api.services.TransactionService import TransactionService
+
+    renderers = {
+        "drf_json": JSONRenderer(),
+        "orjson": ORJSONRenderer(),
+        "msgpack": MessagePackRenderer(),
+    }
+    sizes = [int(size) for size in args.rows.split(",")]
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        print(
+            f"{'rows':>8}  {'renderer':<10}{'encode ms':>11}{'rows/s':>14}"
+            f"{'bytes':>13}{'gzip bytes':>13}"
+        )
+        for rows in sizes:
+            seed(rows)
+            data = TransactionListSerializer(
+                TransactionService().get_user_transactions(USER_ID)
+            ).data
+            for name, renderer in renderers.items():
+                elapsed, body = measure(renderer, data, args.repeat)
+                print(
+                    f"{rows:>8}  {name:<10}{elapsed:>11.2f}{rows / elapsed * 1000:>14,.0f}"
+                    f"{len(body):>13,}{len(gzip.compress(body, 6)):>13,}"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
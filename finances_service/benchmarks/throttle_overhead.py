@@ -0,0 +1,108 @@
+"""
+Measures the per-request overhead of the rate limiters in api/throttling.py against DRF's
+ScopedRateThrottle.
+
+For every rate each throttle is called the way a view calls it (a new instance per
+request) for clients that already used half of their allowance, so DRF's timestamp
+history holds between half and all of the rate. The cache-backed throttles use the
+configured default cache: the in-process `locmem` cache unless CACHE_BACKEND and
+CACHE_LOCATION point to a shared one.
+
+Usage (from the finances_service directory):
+    python benchmarks/throttle_overhead.py
+    python benchmarks/throttle_overhead.py --rates 100,10000 --iterations 20000
+    CACHE_BACKEND=django.core.cache.backends.redis.RedisCache \\
+        CACHE_LOCATION=redis://localhost:6379 python benchmarks/throttle_overhead.py
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rates", default="100,1000,10000", help="requests per hour to compare"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=5000,
+        help="measured calls per throttle and rate",
+    )
+    parser.add_argument("--throttles", default="drf,local,cache")
+    return parser.parse_args()
+
+
+def setup_django():
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "finances_service.settings")
+    import django
+
+    django.setup()
+
+
+def measure(throttle_class, rate, iterations):
+    """
+    Returns the mean time of one allowed throttle check, in microseconds.
+    """
+    from django.core.cache import cache
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    scope = f"benchmark_{rate}"
+    api_settings.DEFAULT_THROTTLE_RATES[scope] = f"{rate}/hour"
+    view = type("BenchmarkView", (), {"throttle_scope": scope})()
+    factory = RequestFactory()
+    cache.clear()
+
+    # Each client sends half of its allowance unmeasured, then half measured
+    per_client = max(1, rate // 2)
+    elapsed = 0.0
+    measured = 0
+    client = 0
+    while measured < iterations:
+        client += 1
+        address = f"10.{client // 65536 % 256}.{client // 256 % 256}.{client % 256}"
+        request = Request(factory.get("/", REMOTE_ADDR=address))
+        for _ in range(per_client):
+            throttle_class().allow_request(request, view)
+
+        calls = min(per_client, iterations - measured)
+        started = time.perf_counter()
+        for _ in range(calls):
+            if not throttle_class().allow_request(request, view):
+                raise RuntimeError(f"{throttle_class.__name__} throttled the benchmark")
+        elapsed += time.perf_counter() - started
+        measured += calls
+    return elapsed / measured * 1e6
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+
+    throttles = args.throttles.split(",")
+    classes = {
+        name: import_string(settings.THROTTLE_CLASSES[name]) for name in throttles
+    }
+    rates = [int(rate) for rate in args.rates.split(",")]
+
+    print(f"cache backend: {settings.CACHES['default']['BACKEND']}")
+    print(f"{'rate/hour':>10}" + "".join(f"{name + ' (us)':>14}" for name in throttles))
+    for rate in rates:
+        row = [measure(classes[name], rate, args.iterations) for name in throttles]
+        print(f"{rate:>10}" + "".join(f"{value:>14.1f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Compares serializing a user's transaction list with DRF's TransactionSerializer and with
+the `values_list` fast path of TransactionListSerializer.
+
+For every size the script creates a user with that many transactions in a throwaway test
+database, then times building the list payload the way the transactions endpoint does:
+reading the rows and serializing them. Peak memory is measured in a separate run with
+tracemalloc, as tracing slows the code down.
+
+Serializers:
+- drf: TransactionSerializer(many=True) over get_user_transactions, as before the fast
+  path (one category query per row).
+- drf_select_related: the same with select_related("category").
+- fast: TransactionListSerializer.
+
+Usage (from the finances_service directory):
+    python benchmarks/transaction_serializers.py
+    python benchmarks/transaction_serializers.py --rows 1000,10000 --serializers drf,fast
+    SQL_ENGINE=django.db.backends.postgresql SQL_DATABASE=finances ... \
+        python benchmarks/transaction_serializers.py
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+USER_ID = "serializer-benchmark"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", default="10000,100000")
+    parser.add_argument("--serializers", default="drf,drf_select_related,fast")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed runs per size, the best is kept"
+    )
+    return parser.parse_args()
+
+
+def setup_django():
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "finances_service.settings")
+    import django
+
+    django.setup()
+
+
+def seed(count):
+    """
+    Replaces the benchmark user's transactions with `count` new ones.
+    """
+    from api.models import Category, Transaction, UserProfile
+
+    UserProfile.objects.get_or_create(user_id=USER_ID)
+    Transaction.objects.filter(owner_id=USER_ID).delete()
+    categories = list(Category.objects.all()[:10]) or [
+        Category.objects.create(name=f"Benchmark {i}") for i in range(10)
+    ]
+    today = datetime.date.today()
+    Transaction.objects.bulk_create(
+        (
+            Transaction(
+                owner_id=USER_ID,
+                name=f"Benchmark {i}",
+                date=today - datetime.timedelta(days=i % 365),
+                amount=Decimal(f"{(i % 500) + 1}.99"),
+                type="Expense" if i % 4 else "Income",
+                category=categories[i % len(categories)],
+                from_account="Benchmark",
+                note=None if i % 3 else f"Note {i}",
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def build(serializer):
+    from api.serializers import TransactionListSerializer, TransactionSerializer
+    from api.services.TransactionService import TransactionService
+
+    transactions = TransactionService().get_user_transactions(USER_ID)
+    if serializer == "fast":
+        return TransactionListSerializer(transactions).data
+    if serializer == "drf_select_related":
+        transactions = transactions.select_related("category")
+    return TransactionSerializer(transactions, many=True).data
+
+
+def measure(serializer, rows, repeat):
+    """
+    Returns the rows serialized per second (best of `repeat`) and the peak memory in MiB.
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        data = build(serializer)
+        elapsed = time.perf_counter() - started
+        if len(data) != rows:
+            raise RuntimeError(f"{serializer} returned {len(data)} rows")
+        del data
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    data = build(serializer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return rows / best, peak / 2**20
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    serializers = args.serializers.split(",")
+    sizes = [int(size) for size in args.rows.split(",")]
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"database: {connection.vendor}")
+        print(f"{'rows':>8}  {'serializer':<20}{'rows/s':>12}{'peak MiB':>12}")
+        for rows in sizes:
+            seed(rows)
+            for serializer in serializers:
+                # The per-row category queries of plain drf make its large runs very long
+                repeat = 1 if serializer == "drf" and rows > 10000 else args.repeat
+                rate, peak = measure(serializer, rows, repeat)
+                print(f"{rows:>8}  {serializer:<20}{rate:>12,.0f}{peak:>12.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
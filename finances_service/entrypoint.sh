@@ -0,0 +1,21 @@
+#!/bin/sh
+# Starts the app server selected by APP_SERVER:
+#   wsgi      - gunicorn with threaded workers (default)
+#   asgi      - gunicorn with uvicorn workers and the async read views
+#   runserver - Django's development server
+set -e
+
+cd "$(dirname "$0")"
+
+case "${APP_SERVER:-wsgi}" in
+  wsgi|asgi)
+    exec gunicorn --config gunicorn.conf.py
+    ;;
+  runserver)
+    exec python manage.py runserver "0.0.0.0:${API_PORT:-80}"
+    ;;
+  *)
+    echo "Unknown APP_SERVER \"$APP_SERVER\" (expected wsgi, asgi or runserver)" >&2
+    exit 1
+    ;;
+esac
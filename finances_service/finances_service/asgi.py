@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finances_service.settings')
+# Serve the read endpoints with the async views unless explicitly disabled
+if not os.environ.get('ASYNC_READ_VIEWS'):
+    os.environ['ASYNC_READ_VIEWS'] = 'true'
 
 application = get_asgi_application()
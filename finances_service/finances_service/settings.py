@@ -13,6 +13,16 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env(name, default=None):
+    """
+    Returns an environment variable, or `default` when it is unset or empty, since
+    .env.example lists every variable with an empty value.
+    """
+    return os.environ.get(name) or default
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,11 +35,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-d(en6je1+3iy8tmqjw)a3a+p(dn4cyw8&*wm^gdhcf=fqnv%3v"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-PYTHON_ENV = os.environ.get("PYTHON_ENV", "development")
+PYTHON_ENV = env("PYTHON_ENV", "development")
 DEBUG = PYTHON_ENV == "development"
 
 
-ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
+ALLOWED_HOSTS = env("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
 
 if PYTHON_ENV == "development":
     CORS_ALLOW_ALL_ORIGINS = True
@@ -55,13 +65,95 @@ CORS_ALLOW_CREDENTIALS = True
 
 
 # Application definition
-GLOBAL_RATE_LIMIT = os.environ.get("RATE_LIMITING", "100/hour")
+GLOBAL_RATE_LIMIT = env("RATE_LIMITING", "100/hour")
+
+# Rate limiter applied by every view (api/throttling.py):
+#   local - token buckets in process memory; the limit applies per worker process
+#   cache - sliding window counters in the default cache, shared by all workers
+#   drf   - DRF's ScopedRateThrottle (a timestamp list per client in the cache)
+# Defaults to "local" with the in-process cache and to "cache" with a shared one.
+THROTTLE_CLASSES = {
+    "local": "api.throttling.LocalTokenBucketThrottle",
+    "cache": "api.throttling.CacheSlidingWindowThrottle",
+    "drf": "rest_framework.throttling.ScopedRateThrottle",
+}
+RATE_LIMITING_BACKEND = env("RATE_LIMITING_BACKEND") or (
+    "local" if "locmem" in env("CACHE_BACKEND", "locmem").lower() else "cache"
+)
+if RATE_LIMITING_BACKEND not in THROTTLE_CLASSES:
+    raise ImproperlyConfigured(
+        f'RATE_LIMITING_BACKEND must be "local", "cache" or "drf", not "{RATE_LIMITING_BACKEND}"'
+    )
+
+# Response renderers (api/renderers.py), picked per request by the Accept header; the
+# first one answers clients that accept anything. JSON_RENDERER selects the JSON one:
+#   orjson - orjson encoding, the same bytes as DRF's renderer
+#   drf    - DRF's JSONRenderer (stdlib json)
+# MSGPACK_RENDERER_ENABLED adds application/msgpack responses.
+JSON_RENDERER_CLASSES = {
+    "orjson": "api.renderers.ORJSONRenderer",
+    "drf": "rest_framework.renderers.JSONRenderer",
+}
+JSON_RENDERER = env("JSON_RENDERER", "orjson")
+if JSON_RENDERER not in JSON_RENDERER_CLASSES:
+    raise ImproperlyConfigured(
+        f'JSON_RENDERER must be "orjson" or "drf", not "{JSON_RENDERER}"'
+    )
+MSGPACK_RENDERER_ENABLED = env("MSGPACK_RENDERER_ENABLED", "true").lower() == "true"
 
 REST_FRAMEWORK = {
-    "DEFAULT_THROTTLE_CLASSES": ["rest_framework.throttling.ScopedRateThrottle"],
+    "DEFAULT_THROTTLE_CLASSES": [THROTTLE_CLASSES[RATE_LIMITING_BACKEND]],
     "DEFAULT_THROTTLE_RATES": {"global": GLOBAL_RATE_LIMIT},
+    "DEFAULT_RENDERER_CLASSES": [JSON_RENDERER_CLASSES[JSON_RENDERER]]
+    + (["api.renderers.MessagePackRenderer"] if MSGPACK_RENDERER_ENABLED else [])
+    + ["rest_framework.renderers.BrowsableAPIRenderer"],
 }
 
+# Keyset pagination for the transactions list. Until every client sends `limit`/`cursor`,
+# requests without them keep receiving the full unpaginated list unless this is enabled.
+TRANSACTIONS_PAGINATION_REQUIRED = (
+    env("TRANSACTIONS_PAGINATION_REQUIRED", "false").lower() == "true"
+)
+TRANSACTIONS_PAGE_SIZE = int(env("TRANSACTIONS_PAGE_SIZE", "50"))
+TRANSACTIONS_PAGE_MAX_SIZE = int(env("TRANSACTIONS_PAGE_MAX_SIZE", "500"))
+
+# Bulk transaction import: rows per INSERT and the maximum rows accepted per upload
+TRANSACTION_IMPORT_BATCH_SIZE = int(env("TRANSACTION_IMPORT_BATCH_SIZE", "1000"))
+TRANSACTION_IMPORT_MAX_ROWS = int(env("TRANSACTION_IMPORT_MAX_ROWS", "200000"))
+# Invalid rows whose errors are listed in an import report; the rest are only counted
+TRANSACTION_IMPORT_MAX_ERRORS = int(env("TRANSACTION_IMPORT_MAX_ERRORS", "100"))
+
+# Maximum transactions accepted by one add-transactions (batch) request
+TRANSACTION_BATCH_MAX_SIZE = int(env("TRANSACTION_BATCH_MAX_SIZE", "500"))
+
+# Rows fetched from the database per round trip when streaming an export
+TRANSACTION_EXPORT_CHUNK_SIZE = int(env("TRANSACTION_EXPORT_CHUNK_SIZE", "2000"))
+
+# Serve the budget and chart endpoints from the TransactionRollup table instead of
+# scanning raw transactions. Rollups are maintained on every write either way.
+TRANSACTION_ROLLUPS_ENABLED = (
+    env("TRANSACTION_ROLLUPS_ENABLED", "true").lower() == "true"
+)
+
+# Route the read endpoints (budget, transactions, charts, dashboard, categories) to the
+# async views in api/async_views.py. The ASGI entry point turns this on by default.
+ASYNC_READ_VIEWS = env("ASYNC_READ_VIEWS", "false").lower() == "true"
+
+# Request metrics (api/metrics.py): the SQL query count and time, view time and render
+# time of a METRICS_SAMPLE_RATE share of the requests, sent in a Server-Timing header and
+# aggregated per route for the internal Prometheus endpoint.
+METRICS_ENABLED = env("METRICS_ENABLED", "true").lower() == "true"
+METRICS_SAMPLE_RATE = float(env("METRICS_SAMPLE_RATE", "1"))
+if not 0 <= METRICS_SAMPLE_RATE <= 1:
+    raise ImproperlyConfigured(
+        f"METRICS_SAMPLE_RATE must be between 0 and 1, not {METRICS_SAMPLE_RATE}"
+    )
+METRICS_SERVER_TIMING = env("METRICS_SERVER_TIMING", "true").lower() == "true"
+# Directory where each worker process keeps its metrics in a memory-mapped file, so the
+# metrics endpoint exports the sums of all the workers; empty keeps them in memory, per
+# process. gunicorn.conf.py sets it when it runs several workers.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -72,18 +164,28 @@ INSTALLED_APPS = [
     "corsheaders",
     "api",
     "rest_framework",
-    "drf_yasg",
 ]
 
+# Swagger UI / Redoc pages (drf_yasg). Turn off in production workers to skip importing
+# drf_yasg; the schema built by `build_openapi_schema` is still served at openapi.json.
+API_DOCS_ENABLED = env("API_DOCS_ENABLED", "true").lower() == "true"
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append("drf_yasg")
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "User": {"type": "apiKey", "name": "user-id", "in": "header"},
-    }
+    },
+    # The pages load the prebuilt schema instead of generating it on every visit
+    "SPEC_URL": "openapi-schema",
 }
+REDOC_SETTINGS = {"SPEC_URL": "openapi-schema"}
 
 MIDDLEWARE = [
+    # First, so the measured time covers the other middleware too
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "api.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -118,8 +220,8 @@ WSGI_APPLICATION = "finances_service.wsgi.application"
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 DATABASES = {
     "default": {
-        "ENGINE": os.environ.get("SQL_ENGINE", "django.db.backends.sqlite3"),
-        "NAME": os.environ.get("SQL_DATABASE", BASE_DIR / "db.sqlite3"),
+        "ENGINE": env("SQL_ENGINE", "django.db.backends.sqlite3"),
+        "NAME": env("SQL_DATABASE", BASE_DIR / "db.sqlite3"),
         "USER": os.environ.get("SQL_USER", "user"),
         "PASSWORD": os.environ.get("SQL_PASSWORD", "password"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
@@ -127,6 +229,52 @@ DATABASES = {
     }
 }
 
+# Database connection reuse, per worker process:
+#   "off"        - open a new connection for every request (Django's default)
+#   "persistent" - keep each thread's connection for SQL_CONN_MAX_AGE seconds and check
+#                  that it is still usable before reusing it
+#   "pool"       - a bounded psycopg connection pool (PostgreSQL with psycopg 3 only);
+#                  requests wait up to SQL_POOL_TIMEOUT seconds for a free connection
+SQL_POOL = env("SQL_POOL", "off").lower()
+if SQL_POOL == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(env("SQL_CONN_MAX_AGE", "60"))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif SQL_POOL == "pool":
+    if DATABASES["default"]["ENGINE"] != "django.db.backends.postgresql":
+        raise ImproperlyConfigured("SQL_POOL=pool requires the PostgreSQL backend")
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(env("SQL_POOL_MIN_SIZE", "2")),
+            "max_size": int(env("SQL_POOL_MAX_SIZE", "10")),
+            "timeout": float(env("SQL_POOL_TIMEOUT", "10")),
+            "max_idle": float(env("SQL_POOL_MAX_IDLE", "600")),
+        }
+    }
+    # Makes Django check every connection borrowed from the pool; broken ones are replaced
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif SQL_POOL != "off":
+    raise ImproperlyConfigured(f'Unknown SQL_POOL mode "{SQL_POOL}"')
+
+# Token required in the X-Internal-Token header by the internal endpoints (pool stats);
+# they are disabled while it is empty.
+INTERNAL_API_TOKEN = os.environ.get("INTERNAL_API_TOKEN", "")
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+CACHES = {
+    "default": {
+        "BACKEND": env(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": env("CACHE_LOCATION", "finances-service"),
+    }
+}
+
+# Versioned per-user cache of the read endpoints (see api/cache.py)
+FINANCES_CACHE_ENABLED = env("FINANCES_CACHE_ENABLED", "true").lower() == "true"
+FINANCES_CACHE_ALIAS = "default"
+FINANCES_CACHE_TIMEOUT = int(env("FINANCES_CACHE_TIMEOUT", "300"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -165,6 +313,12 @@ STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Written by `build_openapi_schema` and served at /api/finances/openapi.json
+OPENAPI_SCHEMA_FILE = env(
+    "OPENAPI_SCHEMA_FILE", os.path.join(STATIC_ROOT, "openapi.json")
+)
+OPENAPI_SCHEMA_MAX_AGE = int(env("OPENAPI_SCHEMA_MAX_AGE", "86400"))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
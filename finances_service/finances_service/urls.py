@@ -15,33 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-import os
 from django.urls import include, path
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Finances Service API",
-        default_version="v1",
-        description="This service allows users to manage their financial transactions and budgets, categorize transactions, and view financial analytics.",
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-    url=os.environ.get("SERVICE_URL", "http://localhost:3003"),
-)
+from api.schemas.docs import docs_urlpatterns
+
 urlpatterns = [
     path("api/finances/", include("api.urls")),
-    path(
-        "api/finances/swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path(
-        "api/finances/redoc/",
-        schema_view.with_ui("redoc", cache_timeout=0),
-        name="schema-redoc",
-    ),
-]
+] + docs_urlpatterns("api/finances/")
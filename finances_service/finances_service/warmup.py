@@ -0,0 +1,105 @@
+"""
+Warm-up steps run by the app server before a worker accepts traffic, so the first requests
+after a deploy don't pay for imports, URL resolver population, serializer field building
+and database connection setup.
+
+`warm_up_app` runs once in the gunicorn master after the app is preloaded (before fork) and
+must not touch the database; `warm_up_worker` runs in every worker after fork.
+"""
+
+import inspect
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import get_resolver, reverse
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Read endpoints requested once per worker. The user does not exist, so they run the
+# middleware, view, service and renderer code paths without returning any data.
+WARMUP_PATHS = [
+    "/api/finances/categories/",
+    "/api/finances/budget/",
+    "/api/finances/transactions/?limit=1",
+    "/api/finances/dashboard/",
+]
+WARMUP_USER_ID = "__warmup__"
+
+
+def warm_up_app():
+    """
+    Imports the views, resolves every API URL and builds the serializer fields.
+
+    Returns:
+        float: The time spent, in milliseconds.
+    """
+    started = time.perf_counter()
+
+    # Importing the URLconf imports every view module
+    import_module(settings.ROOT_URLCONF)
+    resolver = get_resolver()
+    api_urls = import_module("api.urls")
+    for pattern in api_urls.urlpatterns:
+        kwargs = {name: 1 for name in getattr(pattern.pattern, "converters", {})}
+        resolver.resolve(reverse(pattern.name, kwargs=kwargs))
+
+    # DRF builds serializer fields from the model metadata on first use
+    serializer_module = import_module("api.serializers")
+    for _, serializer_class in inspect.getmembers(serializer_module, inspect.isclass):
+        if (
+            issubclass(serializer_class, serializers.ModelSerializer)
+            and serializer_class.__module__ == serializer_module.__name__
+        ):
+            serializer_class().fields
+
+    # Nothing here should have connected, but a connection must never cross the fork
+    connections.close_all()
+    return (time.perf_counter() - started) * 1000
+
+
+def warm_up_worker():
+    """
+    Sends one request to each read endpoint and opens the database connections.
+
+    Failures are logged rather than raised, so a database outage does not stop workers
+    from booting.
+
+    Returns:
+        float: The time spent, in milliseconds.
+    """
+    started = time.perf_counter()
+    request_logger = logging.getLogger("django.request")
+    request_level = request_logger.level
+    try:
+        # The warm-up user doesn't exist; keep its 404s out of the log
+        request_logger.setLevel(logging.ERROR)
+        client = Client(HTTP_HOST=_warmup_host(), HTTP_USER_ID=WARMUP_USER_ID)
+        for path in WARMUP_PATHS:
+            client.get(path)
+
+        for connection in connections.all():
+            pool = getattr(connection, "pool", None)
+            if pool is not None:
+                # Fill the pool up to its minimum size before taking traffic
+                pool.open(wait=True)
+            connection.ensure_connection()
+            if settings.SQL_POOL != "persistent":
+                # Hand a pooled connection back; without reuse this only checked that
+                # the database is reachable.
+                connection.close()
+    except Exception:
+        logger.exception("Worker warm-up failed")
+    finally:
+        request_logger.setLevel(request_level)
+    return (time.perf_counter() - started) * 1000
+
+
+def _warmup_host():
+    # A host accepted by ALLOWED_HOSTS, so the requests reach the views
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+    return host.lstrip(".").replace("*", "localhost") or "localhost"
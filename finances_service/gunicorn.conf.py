@@ -0,0 +1,89 @@
+"""
+Gunicorn configuration for the production app server (see entrypoint.sh).
+
+APP_SERVER selects the worker type:
+    wsgi - threaded sync workers serving finances_service.wsgi (default)
+    asgi - uvicorn workers serving finances_service.asgi, with the async read views
+
+Every setting can be overridden through the environment variables below or GUNICORN_CMD_ARGS;
+like in the Django settings, an empty variable counts as unset.
+"""
+
+import glob
+import os
+import tempfile
+
+APP_SERVER = (os.environ.get("APP_SERVER") or "wsgi").lower()
+if APP_SERVER not in ("wsgi", "asgi"):
+    raise RuntimeError(f'APP_SERVER must be "wsgi" or "asgi", not "{APP_SERVER}"')
+
+# CPUs available to this process (respects container CPU sets)
+CPU_COUNT = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else 1
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get("GUNICORN_BIND") or f"0.0.0.0:{os.environ.get('API_PORT') or 80}"
+
+if APP_SERVER == "asgi":
+    wsgi_app = "finances_service.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    # One event loop per CPU handles any number of connections
+    default_workers = CPU_COUNT
+else:
+    wsgi_app = "finances_service.wsgi:application"
+    worker_class = "gthread"
+    default_workers = 2 * CPU_COUNT + 1
+workers = int(os.environ.get("GUNICORN_WORKERS") or default_workers)
+threads = int(os.environ.get("GUNICORN_THREADS") or "4")
+
+# The response cache (api/cache.py) invalidates a user's payloads by bumping a version in
+# the cache. With the default in-process locmem backend the bump only reaches the worker
+# that handled the write, and the others would keep serving stale payloads, so several
+# workers need a shared CACHE_BACKEND (see docker-compose.prod.yml) or no response cache.
+if workers > 1 and "locmem" in (os.environ.get("CACHE_BACKEND") or "locmem").lower():
+    if os.environ.get("FINANCES_CACHE_ENABLED", "").lower() == "true":
+        raise RuntimeError(
+            "FINANCES_CACHE_ENABLED=true needs a shared CACHE_BACKEND "
+            f"with {workers} workers"
+        )
+    # Read by the settings, which the preloaded app imports after this file
+    os.environ["FINANCES_CACHE_ENABLED"] = "false"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT") or "30")
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT") or "30")
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE") or "5")
+accesslog = "-"
+
+# Workers share their request metrics through files in this directory (api/metrics.py),
+# so a scrape reaching any worker exports the sums of all of them
+if workers > 1 and not os.environ.get("METRICS_DIR"):
+    os.environ["METRICS_DIR"] = os.path.join(tempfile.gettempdir(), "finances-metrics")
+
+# Load Django once in the master so workers fork with the code already imported
+preload_app = True
+
+WARMUP_ENABLED = (os.environ.get("APP_WARMUP") or "true").lower() == "true"
+
+
+def on_starting(server):
+    # Metrics start from zero with every start of the server, not with every worker
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "worker_*.db")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # The app is preloaded by now; warm the shared state once before forking
+    if WARMUP_ENABLED:
+        from finances_service.warmup import warm_up_app
+
+        server.log.info("Warmed up the app in %.0f ms", warm_up_app())
+
+
+def post_worker_init(worker):
+    # Runs in each worker before it starts accepting connections
+    if WARMUP_ENABLED:
+        from finances_service.warmup import warm_up_worker
+
+        worker.log.info("Warmed up worker in %.0f ms", warm_up_worker())